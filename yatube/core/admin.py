@@ -0,0 +1,16 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'name', 'status', 'attempts', 'run_at',
+                    'finished')
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'last_error')
+    readonly_fields = ('arguments', 'locked_by', 'locked_at', 'created',
+                       'finished')
+    empty_value_display = '-пусто-'
+
+
+admin.site.register(Job, JobAdmin)
@@ -0,0 +1,61 @@
+"""
+The user of a session, from the cache.
+
+``AuthenticationMiddleware`` resolves ``request.user`` on every request of
+a logged-in user and ``ModelBackend`` does it with a query. With
+``CachedModelBackend`` the user object is kept in
+``caches[settings.USER_CACHE_ALIAS]`` for ``USER_CACHE_TIMEOUT`` seconds,
+so together with ``cached_db`` sessions a warm request resolves its user
+without touching the database.
+
+Every save or delete of a user drops the cached copy, right away and once
+more after the commit (a read racing the write could have put the old row
+back). A password change is a save, so the session hash Django checks on
+each request is that of the current password: the other sessions of the
+user end at once, as they do without the cache.
+
+That only holds when every process of the site shares the cache, so the
+settings switch this backend and ``cached_db`` sessions on only then
+(``settings.CACHE_IS_SHARED``).
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+User = get_user_model()
+
+
+def _cache():
+    return caches[settings.USER_CACHE_ALIAS]
+
+
+def user_key(user_id):
+    return f'auth_user:{user_id}'
+
+
+def forget_user(user_id):
+    key = user_key(user_id)
+    _cache().delete(key)
+    transaction.on_commit(lambda: _cache().delete(key))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def _user_changed(sender, instance, **kwargs):
+    forget_user(instance.pk)
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        key = user_key(user_id)
+        user = _cache().get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            _cache().set(key, user, settings.USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,62 @@
+"""
+Build ``settings.CACHES`` from a single URL.
+
+    locmem://                       in-process, per worker (default)
+    file:///var/tmp/yatube_cache    shared between workers of one host
+    memcached://host:11211,host2    python-memcached
+    redis://host:6379/0             any server speaking the Redis protocol
+
+The configured backend is exposed as the ``shared`` alias, and ``default``
+is a two-tier cache over it: a small in-process LRU in front of the
+shared cache.
+"""
+from urllib.parse import parse_qs, urlparse
+
+SCHEMES = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'memcached': 'django.core.cache.backends.memcached.MemcachedCache',
+    'redis': 'core.cache.redis.RedisCache',
+}
+
+
+def parse_cache_url(url):
+    parsed = urlparse(url)
+    if parsed.scheme not in SCHEMES:
+        raise ValueError(f'Unsupported cache URL scheme: {parsed.scheme!r}')
+    options = {
+        name.upper(): values[-1]
+        for name, values in parse_qs(parsed.query).items()
+    }
+    config = {'BACKEND': SCHEMES[parsed.scheme], 'OPTIONS': options}
+    if parsed.scheme == 'locmem':
+        config['LOCATION'] = parsed.netloc or 'yatube'
+        options.setdefault('MAX_ENTRIES', 10000)
+    elif parsed.scheme == 'file':
+        config['LOCATION'] = parsed.path
+        options.setdefault('MAX_ENTRIES', 10000)
+    elif parsed.scheme == 'memcached':
+        config['LOCATION'] = parsed.netloc.split(',')
+    else:
+        config['LOCATION'] = parsed.netloc
+        options.setdefault('DB', parsed.path.strip('/') or 0)
+    return config
+
+
+def is_shared(url):
+    """Whether every process of the site sees the same cache."""
+    return urlparse(url).scheme != 'locmem'
+
+
+def cache_settings(url, l1_timeout=2, l1_max_entries=1000):
+    return {
+        'default': {
+            'BACKEND': 'core.cache.tiered.TieredCache',
+            'LOCATION': 'shared',
+            'OPTIONS': {
+                'L1_TIMEOUT': l1_timeout,
+                'L1_MAX_ENTRIES': l1_max_entries,
+            },
+        },
+        'shared': parse_cache_url(url),
+    }
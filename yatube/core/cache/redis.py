@@ -0,0 +1,218 @@
+"""
+Cache backend for servers speaking the Redis protocol (RESP2).
+
+A small dependency-free client: one socket per thread, values pickled,
+integers stored as plain numbers so that ``incr`` runs on the server.
+"""
+import pickle
+import socket
+import threading
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+
+class RedisError(Exception):
+    pass
+
+
+def _encode(*args):
+    parts = [b'*%d\r\n' % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode()
+        elif isinstance(arg, int):
+            arg = str(arg).encode()
+        parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+    return b''.join(parts)
+
+
+class Connection:
+    def __init__(self, host, port, db, timeout):
+        self._sock = socket.create_connection((host, port), timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._file = self._sock.makefile('rb')
+        if int(db):
+            self.execute('SELECT', db)
+
+    def close(self):
+        self._file.close()
+        self._sock.close()
+
+    def execute(self, *args):
+        return self.pipeline([args])[0]
+
+    def pipeline(self, commands):
+        """
+        Replies of ``commands``; raises the first error reply, but only
+        once every reply is read, so the next call gets its own.
+        """
+        self._sock.sendall(b''.join(_encode(*args) for args in commands))
+        replies = [self._read() for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+        return replies
+
+    def _read(self):
+        line = self._file.readline()
+        if not line.endswith(b'\r\n'):
+            raise ConnectionError('Connection closed by the cache server')
+        kind, payload = line[:1], line[1:-2]
+        if kind == b'+':
+            return payload.decode()
+        if kind == b'-':
+            return RedisError(payload.decode())
+        if kind == b':':
+            return int(payload)
+        if kind == b'$':
+            length = int(payload)
+            if length < 0:
+                return None
+            return self._file.read(length + 2)[:-2]
+        if kind == b'*':
+            length = int(payload)
+            if length < 0:
+                return None
+            return [self._read() for _ in range(length)]
+        # the rest of the stream can't be parsed any more
+        raise ConnectionError(f'Unknown reply type {kind!r}')
+
+
+class RedisCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, server, params):
+        super().__init__(params)
+        host, _, port = server.partition(':')
+        options = params.get('OPTIONS', {})
+        self._address = (host or '127.0.0.1', int(port or 6379))
+        self._db = options.get('DB', 0)
+        self._socket_timeout = float(options.get('SOCKET_TIMEOUT', 1))
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = Connection(*self._address, self._db,
+                                    self._socket_timeout)
+            self._local.connection = connection
+        return connection
+
+    def _pipeline(self, commands):
+        try:
+            return self._connection().pipeline(commands)
+        except (OSError, ConnectionError):
+            self.disconnect()
+            raise
+
+    def _execute(self, *args):
+        return self._pipeline([args])[0]
+
+    def _dumps(self, value):
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value
+        return pickle.dumps(value, self.pickle_protocol)
+
+    def _loads(self, data):
+        try:
+            return int(data)
+        except ValueError:
+            return pickle.loads(data)
+
+    def _expiry(self, timeout):
+        """``SET`` arguments for a Django timeout, or None to delete."""
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return ()
+        if timeout <= 0:
+            return None
+        return ('PX', int(timeout * 1000))
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        expiry = self._expiry(timeout)
+        if expiry is None:
+            return False
+        reply = self._execute('SET', key, self._dumps(value), *expiry, 'NX')
+        return reply == 'OK'
+
+    def get(self, key, default=None, version=None):
+        data = self._execute('GET', self._key(key, version))
+        return default if data is None else self._loads(data)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        expiry = self._expiry(timeout)
+        if expiry is None:
+            self._execute('DEL', key)
+        else:
+            self._execute('SET', key, self._dumps(value), *expiry)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        expiry = self._expiry(timeout)
+        if expiry is None:
+            return bool(self._execute('DEL', key))
+        if not expiry:
+            _, exists = self._pipeline([('PERSIST', key), ('EXISTS', key)])
+            return bool(exists)
+        return bool(self._execute('PEXPIRE', key, expiry[1]))
+
+    def delete(self, key, version=None):
+        self._execute('DEL', self._key(key, version))
+
+    def has_key(self, key, version=None):
+        return bool(self._execute('EXISTS', self._key(key, version)))
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        if not self._execute('EXISTS', key):
+            raise ValueError("Key '%s' not found" % key)
+        return self._execute('INCRBY', key, delta)
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        values = self._execute(
+            'MGET', *(self._key(key, version) for key in keys))
+        return {
+            key: self._loads(data)
+            for key, data in zip(keys, values) if data is not None
+        }
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expiry = self._expiry(timeout)
+        if expiry is None:
+            self.delete_many(data, version)
+            return []
+        self._pipeline([
+            ('SET', self._key(key, version), self._dumps(value), *expiry)
+            for key, value in data.items()
+        ])
+        return []
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        if keys:
+            self._execute('DEL', *keys)
+
+    def clear(self):
+        self._execute('FLUSHDB')
+
+    def close(self, **kwargs):
+        # Django closes caches after every request; the socket is kept
+        # open so that requests of one thread reuse it.
+        pass
+
+    def disconnect(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            self._local.connection = None
+            connection.close()
@@ -0,0 +1,169 @@
+"""
+In-process stand-in for a Redis server, for tests and local development.
+
+Implements only the commands ``core.cache.redis.RedisCache`` sends::
+
+    with FakeRedisServer() as server:
+        url = server.url    # redis://127.0.0.1:<port>/0
+"""
+import socketserver
+import threading
+import time
+
+
+class _Store:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.databases = {}
+
+    def db(self, number):
+        return self.databases.setdefault(number, {})
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        self.db = 0
+        while True:
+            command = self._read_command()
+            if command is None:
+                return
+            name, args = command[0].decode().upper(), command[1:]
+            method = getattr(self, f'cmd_{name.lower()}', None)
+            with self.server.store.lock:
+                if method is None:
+                    reply = RuntimeError(f"ERR unknown command '{name}'")
+                else:
+                    try:
+                        reply = method(self.server.store.db(self.db), *args)
+                    except (ValueError, TypeError) as error:
+                        reply = RuntimeError(f'ERR {error}')
+            self.wfile.write(self._encode(reply))
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        count = int(line[1:-2])
+        args = []
+        for _ in range(count):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def _encode(self, reply):
+        if reply is True:
+            return b'+OK\r\n'
+        if reply is None:
+            return b'$-1\r\n'
+        if isinstance(reply, RuntimeError):
+            return b'-%s\r\n' % str(reply).encode()
+        if isinstance(reply, int):
+            return b':%d\r\n' % reply
+        if isinstance(reply, list):
+            return b'*%d\r\n' % len(reply) + b''.join(
+                self._encode(item) for item in reply)
+        return b'$%d\r\n%s\r\n' % (len(reply), reply)
+
+    @staticmethod
+    def _alive(db, key):
+        entry = db.get(key)
+        if entry is None:
+            return None
+        value, expires = entry
+        if expires is not None and expires <= time.monotonic():
+            del db[key]
+            return None
+        return entry
+
+    def cmd_ping(self, db):
+        return b'PONG'
+
+    def cmd_select(self, db, number):
+        self.db = int(number)
+        return True
+
+    def cmd_get(self, db, key):
+        entry = self._alive(db, key)
+        return None if entry is None else entry[0]
+
+    def cmd_mget(self, db, *keys):
+        return [self.cmd_get(db, key) for key in keys]
+
+    def cmd_set(self, db, key, value, *options):
+        options = [option.upper() for option in options]
+        expires = None
+        if b'EX' in options:
+            seconds = int(options[options.index(b'EX') + 1])
+            expires = time.monotonic() + seconds
+        if b'PX' in options:
+            milliseconds = int(options[options.index(b'PX') + 1])
+            expires = time.monotonic() + milliseconds / 1000
+        if b'NX' in options and self._alive(db, key) is not None:
+            return None
+        db[key] = (value, expires)
+        return True
+
+    def cmd_del(self, db, *keys):
+        return sum(
+            db.pop(key, None) is not None
+            for key in keys if self._alive(db, key) is not None
+        )
+
+    def cmd_exists(self, db, *keys):
+        return sum(self._alive(db, key) is not None for key in keys)
+
+    def cmd_incrby(self, db, key, delta):
+        entry = self._alive(db, key)
+        value, expires = entry if entry is not None else (b'0', None)
+        value = int(value) + int(delta)
+        db[key] = (str(value).encode(), expires)
+        return value
+
+    def cmd_pexpire(self, db, key, milliseconds):
+        entry = self._alive(db, key)
+        if entry is None:
+            return 0
+        db[key] = (entry[0], time.monotonic() + int(milliseconds) / 1000)
+        return 1
+
+    def cmd_persist(self, db, key):
+        entry = self._alive(db, key)
+        if entry is None or entry[1] is None:
+            return 0
+        db[key] = (entry[0], None)
+        return 1
+
+    def cmd_flushdb(self, db):
+        db.clear()
+        return True
+
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0):
+        super().__init__((host, port), _Handler)
+        self.store = _Store()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address
+        return f'redis://{host}:{port}/0'
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever,
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,159 @@
+"""
+Two-tier cache: a small in-process LRU (L1) in front of a shared cache (L2).
+
+L1 answers repeated reads of hot keys (feed generations, post cards,
+thumbnail records) without a network round trip. Its entries live for
+``L1_TIMEOUT`` seconds at most, which bounds how long one worker may miss
+a write made by another one; writes made through this process update
+both tiers at once.
+"""
+import pickle
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from .. import instrumentation
+
+# L1 stores are shared by all threads of the process, keyed by L2 alias
+_stores = {}
+_locks = {}
+
+_MISSING = object()
+
+
+class TieredCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._l2_alias = location
+        self._l1_timeout = float(options.get('L1_TIMEOUT', 2))
+        self._l1_max_entries = int(options.get('L1_MAX_ENTRIES', 1000))
+        self._l1 = _stores.setdefault(location, OrderedDict())
+        self._lock = _locks.setdefault(location, Lock())
+
+    @property
+    def l2(self):
+        return caches[self._l2_alias]
+
+    def _l1_timeout_for(self, timeout):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.l2.default_timeout
+        if timeout is None:
+            return self._l1_timeout
+        return min(timeout, self._l1_timeout)
+
+    def _remember(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        ttl = self._l1_timeout_for(timeout)
+        if ttl <= 0:
+            return
+        pickled = pickle.dumps(value, self.pickle_protocol)
+        with self._lock:
+            self._l1[key] = (time.monotonic() + ttl, pickled)
+            self._l1.move_to_end(key)
+            while len(self._l1) > self._l1_max_entries:
+                self._l1.popitem(last=False)
+
+    def _recall(self, key, version=None):
+        key = self.make_key(key, version=version)
+        with self._lock:
+            entry = self._l1.get(key)
+            if entry is None:
+                return _MISSING
+            expires, pickled = entry
+            if expires < time.monotonic():
+                del self._l1[key]
+                return _MISSING
+            self._l1.move_to_end(key)
+        return pickle.loads(pickled)
+
+    def _forget(self, keys, version=None):
+        with self._lock:
+            for key in keys:
+                self._l1.pop(self.make_key(key, version=version), None)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.l2.add(key, value, timeout, version)
+        if added:
+            self._remember(key, value, timeout, version)
+        return added
+
+    def get(self, key, default=None, version=None):
+        value = self._recall(key, version)
+        if value is not _MISSING:
+            instrumentation.count('cache_hit')
+            return value
+        value = self.l2.get(key, _MISSING, version)
+        if value is _MISSING:
+            instrumentation.count('cache_miss')
+            return default
+        instrumentation.count('cache_hit')
+        self._remember(key, value, version=version)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.l2.set(key, value, timeout, version)
+        self._remember(key, value, timeout, version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self._forget([key], version)
+        return self.l2.touch(key, timeout, version)
+
+    def delete(self, key, version=None):
+        self._forget([key], version)
+        self.l2.delete(key, version)
+
+    def has_key(self, key, version=None):
+        if self._recall(key, version) is not _MISSING:
+            return True
+        return self.l2.has_key(key, version)
+
+    def incr(self, key, delta=1, version=None):
+        self._forget([key], version)
+        value = self.l2.incr(key, delta, version)
+        self._remember(key, value, version=version)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = {}
+        missing = []
+        for key in keys:
+            value = self._recall(key, version)
+            if value is _MISSING:
+                missing.append(key)
+            else:
+                found[key] = value
+        if missing:
+            fetched = self.l2.get_many(missing, version)
+            for key, value in fetched.items():
+                self._remember(key, value, version=version)
+            found.update(fetched)
+        instrumentation.count('cache_hit', len(found))
+        instrumentation.count('cache_miss', len(keys) - len(found))
+        return found
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.l2.set_many(data, timeout, version)
+        for key, value in data.items():
+            if key not in failed:
+                self._remember(key, value, timeout, version)
+        return failed
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self._forget(keys, version)
+        self.l2.delete_many(keys, version)
+
+    def clear(self):
+        with self._lock:
+            self._l1.clear()
+        self.l2.clear()
+
+    def close(self, **kwargs):
+        self.l2.close(**kwargs)
@@ -0,0 +1,63 @@
+"""
+SQLite backend applying ``OPTIONS['PRAGMAS']`` to every new connection.
+
+With ``CONN_HEALTH_CHECKS`` a connection kept between requests
+(``CONN_MAX_AGE``) is checked once per request before it is used again and
+replaced if it stopped working, like Django 4.1 does.
+"""
+import re
+
+from django.db.backends.sqlite3 import base
+
+_NAME = re.compile(r'^[a-z_]+$')
+
+
+def apply_pragmas(connection, pragmas):
+    """Run ``PRAGMA name = value`` on a DB-API connection."""
+    for name, value in pragmas.items():
+        if not _NAME.match(name):
+            raise ValueError(f'Invalid pragma name: {name!r}')
+        connection.execute(f'PRAGMA {name} = {value}')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_check_done = False
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('PRAGMAS', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        apply_pragmas(connection,
+                      self.settings_dict['OPTIONS'].get('PRAGMAS', {}))
+        return connection
+
+    def connect(self):
+        super().connect()
+        # a fresh connection needs no check
+        self.health_check_done = True
+
+    def is_usable(self):
+        try:
+            self.connection.execute('SELECT 1')
+        except base.Database.Error:
+            return False
+        return True
+
+    def ensure_connection(self):
+        if (self.connection is not None and not self.health_check_done
+                and not self.in_atomic_block
+                and self.settings_dict.get('CONN_HEALTH_CHECKS')):
+            self.health_check_done = True
+            if not self.is_usable():
+                self.close()
+        super().ensure_connection()
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        # runs when a request starts and ends: check again before reuse
+        self.health_check_done = False
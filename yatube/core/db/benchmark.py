@@ -0,0 +1,155 @@
+"""
+Read/write concurrency of the SQLite profiles of ``core.db.config``.
+
+Reader threads page through an author's posts, writer threads insert a
+post per transaction, all against one database file for ``duration``
+seconds. Each thread behaves the way Django does under the profile: with
+``CONN_MAX_AGE`` it keeps one connection with the profile's pragmas,
+otherwise it opens a connection per request.
+"""
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from .backends.sqlite3.base import apply_pragmas
+from .config import PROFILES
+
+SCHEMA = (
+    'CREATE TABLE post (id INTEGER PRIMARY KEY, author INTEGER NOT NULL, '
+    'text TEXT NOT NULL, pub_date REAL NOT NULL)',
+    'CREATE INDEX post_author_date ON post (author, pub_date DESC)',
+)
+READ = ('SELECT id, text, pub_date FROM post WHERE author = ? '
+        'ORDER BY pub_date DESC LIMIT 10')
+WRITE = 'INSERT INTO post (author, text, pub_date) VALUES (?, ?, ?)'
+AUTHORS = 200
+TEXT = 'Синтетический текст поста для замера конкурентного доступа. ' * 4
+
+
+class Connections:
+    """Connections of one thread, opened the way the profile says."""
+    def __init__(self, path, profile):
+        settings = PROFILES[profile]
+        options = dict(settings.get('OPTIONS', {}))
+        self.pragmas = options.pop('PRAGMAS', {})
+        self.path = path
+        self.persistent = bool(settings.get('CONN_MAX_AGE'))
+        self.connection = None
+
+    def _open(self):
+        # Django's default timeout, autocommit like Django's connections
+        connection = sqlite3.connect(self.path, timeout=5,
+                                     isolation_level=None)
+        apply_pragmas(connection, self.pragmas)
+        return connection
+
+    def get(self):
+        if self.connection is None:
+            self.connection = self._open()
+        return self.connection
+
+    def release(self):
+        if not self.persistent and self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def _prepare(path, profile, rows):
+    connection = sqlite3.connect(path, isolation_level=None)
+    apply_pragmas(connection, Connections(path, profile).pragmas)
+    for statement in SCHEMA:
+        connection.execute(statement)
+    rng = random.Random(0)
+    now = time.time()
+    connection.execute('BEGIN')
+    connection.executemany(WRITE, (
+        (rng.randrange(AUTHORS), TEXT, now - number)
+        for number in range(rows)
+    ))
+    connection.execute('COMMIT')
+    connection.close()
+
+
+def _read(connection, rng):
+    connection.execute(READ, (rng.randrange(AUTHORS),)).fetchall()
+
+
+def _write(connection, rng):
+    connection.execute('BEGIN')
+    try:
+        connection.execute(WRITE, (rng.randrange(AUTHORS), TEXT, time.time()))
+    except sqlite3.Error:
+        connection.execute('ROLLBACK')
+        raise
+    connection.execute('COMMIT')
+
+
+def _worker(path, profile, operation, seed, start, deadline, results):
+    rng = random.Random(seed)
+    connections = Connections(path, profile)
+    latencies, errors = [], 0
+    start.wait()
+    while time.perf_counter() < deadline[0]:
+        started = time.perf_counter()
+        try:
+            operation(connections.get(), rng)
+        except sqlite3.OperationalError:
+            errors += 1
+        else:
+            latencies.append(time.perf_counter() - started)
+        finally:
+            connections.release()
+    if connections.connection is not None:
+        connections.connection.close()
+    results.append((operation.__name__.strip('_'), latencies, errors))
+
+
+def _summary(latencies, errors, duration):
+    if not latencies:
+        return {'ops_per_s': 0, 'p50_ms': None, 'p95_ms': None,
+                'errors': errors}
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return {
+        'ops_per_s': round(len(latencies) / duration, 1),
+        'p50_ms': round(statistics.median(ordered) * 1000, 3),
+        'p95_ms': round(p95 * 1000, 3),
+        'errors': errors,
+    }
+
+
+def run(profile, readers=4, writers=2, duration=5.0, rows=20000):
+    """``{'read': summary, 'write': summary}`` of one profile."""
+    directory = tempfile.mkdtemp(prefix='yatube-sqlite-')
+    path = os.path.join(directory, 'bench.sqlite3')
+    try:
+        _prepare(path, profile, rows)
+        start = threading.Barrier(readers + writers + 1)
+        deadline = [0]
+        results = []
+        threads = [
+            threading.Thread(target=_worker, args=(
+                path, profile, operation, number, start, deadline, results))
+            for number, operation in enumerate(
+                [_read] * readers + [_write] * writers)
+        ]
+        for thread in threads:
+            thread.start()
+        deadline[0] = time.perf_counter() + duration
+        start.wait()
+        for thread in threads:
+            thread.join()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    report = {}
+    for kind in ('read', 'write'):
+        latencies = [value for name, values, _ in results if name == kind
+                     for value in values]
+        errors = sum(count for name, _, count in results if name == kind)
+        report[kind] = _summary(latencies, errors, duration)
+    return report
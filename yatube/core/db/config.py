@@ -0,0 +1,58 @@
+"""
+``settings.DATABASES`` profiles for SQLite.
+
+    default      what ``startproject`` gives: rollback journal, full fsync
+                 on every commit, a new connection for every request
+    production   WAL, fsync at checkpoints only, memory-mapped reads, a
+                 bigger page cache, waiting on locks instead of failing,
+                 connections kept between requests and checked before reuse
+
+Replicas (see ``core.db.router``) get the profile of the primary.
+"""
+import copy
+
+PRODUCTION_PRAGMAS = {
+    # readers keep reading their snapshot while a writer commits
+    'journal_mode': 'wal',
+    # in WAL mode a power loss may lose the last commits but never
+    # corrupts the database
+    'synchronous': 'normal',
+    'mmap_size': 256 * 1024 * 1024,
+    # negative values are KiB rather than pages
+    'cache_size': -64 * 1024,
+    # milliseconds a writer waits for another one before "database is locked"
+    'busy_timeout': 5000,
+    'temp_store': 'memory',
+}
+
+PROFILES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+    },
+    'production': {
+        'ENGINE': 'core.db.backends.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {'PRAGMAS': PRODUCTION_PRAGMAS},
+    },
+}
+
+
+def database_settings(name, profile='production', replicas=()):
+    """
+    ``DATABASES`` with the primary as ``default`` and the files of
+    ``replicas`` as ``replica1``, ``replica2``...
+    """
+    if profile not in PROFILES:
+        raise ValueError(f'Unknown database profile: {profile!r}')
+    databases = {
+        'default': {'NAME': name, **copy.deepcopy(PROFILES[profile])},
+    }
+    for number, replica in enumerate(replicas, 1):
+        databases[f'replica{number}'] = {
+            'NAME': replica,
+            **copy.deepcopy(PROFILES[profile]),
+            # tests run against the test copy of the primary
+            'TEST': {'MIRROR': 'default'},
+        }
+    return databases
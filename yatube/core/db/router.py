@@ -0,0 +1,98 @@
+"""
+Read replicas: reads go to the aliases of ``settings.DATABASE_REPLICAS``,
+writes to ``default``.
+
+A replica lags behind the primary, so whoever has just written must keep
+reading the primary until the replica catches up (read-your-writes). The
+first object of ``settings.REPLICA_PIN_MODELS`` a request saves or deletes
+pins the rest of the request to the primary, and ``PrimaryPinMiddleware``
+sets a cookie that pins the user's next requests for
+``REPLICA_PIN_SECONDS``: the redirect after a new post, comment or follow
+reads what was written. Bookkeeping rows written on the side (sessions,
+jobs, counters, search terms) pin nothing. Without replicas everything is
+``default``.
+"""
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+_state = threading.local()
+
+
+def is_pinned():
+    return getattr(_state, 'pinned', False)
+
+
+@contextmanager
+def use_primary():
+    """Send the reads of the block to the primary."""
+    previous = is_pinned()
+    _state.pinned = True
+    try:
+        yield
+    finally:
+        _state.pinned = previous
+
+
+# db_for_write is also asked where unsaved objects would go, so writes are
+# told by the signals of the models saved
+@receiver(post_save)
+@receiver(post_delete)
+@receiver(m2m_changed)
+def _wrote(sender, **kwargs):
+    if sender._meta.label in settings.REPLICA_PIN_MODELS:
+        _state.pinned = _state.wrote = True
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or is_pinned():
+            return DEFAULT_DB_ALIAS
+        # reads inside a transaction must see its writes
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db in replicas:
+            # related objects come from the snapshot their owner came from
+            return instance._state.db
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the rows of the primary
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # replicas get the schema by replication
+        return db not in settings.DATABASE_REPLICAS
+
+
+class PrimaryPinMiddleware:
+    """Pins the requests of a user who has just written to the primary."""
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        cookie = settings.REPLICA_PIN_COOKIE
+        _state.pinned = cookie in request.COOKIES
+        _state.wrote = False
+        try:
+            response = self.get_response(request)
+            if _state.wrote and settings.DATABASE_REPLICAS:
+                response.set_cookie(
+                    cookie, '1', max_age=settings.REPLICA_PIN_SECONDS,
+                    httponly=True, samesite='Lax')
+        finally:
+            _state.pinned = _state.wrote = False
+        return response
@@ -0,0 +1,52 @@
+"""
+A local SQLite replica for tests.
+
+``sqlite_replica()`` registers a second database file as a replica of
+``default`` and returns a ``Replica``; until ``sync()`` copies the primary
+into it with the SQLite backup API, the replica lags like a real one.
+The backup waits for the primary's transaction to end, so tests using it
+are ``TransactionTestCase``.
+"""
+import os
+import shutil
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import override_settings
+
+
+class Replica:
+    def __init__(self, alias, path):
+        self.alias = alias
+        self.path = path
+
+    def sync(self):
+        """Bring the replica up to the committed state of the primary."""
+        connections[self.alias].close()
+        primary = connections[DEFAULT_DB_ALIAS]
+        primary.ensure_connection()
+        target = sqlite3.connect(self.path)
+        try:
+            primary.connection.backup(target)
+        finally:
+            target.close()
+
+
+@contextmanager
+def sqlite_replica(alias='replica'):
+    directory = tempfile.mkdtemp()
+    replica = Replica(alias, os.path.join(directory, 'replica.sqlite3'))
+    connections.databases[alias] = {
+        **connections.databases[DEFAULT_DB_ALIAS], 'NAME': replica.path,
+    }
+    try:
+        replica.sync()
+        with override_settings(DATABASE_REPLICAS=[alias]):
+            yield replica
+    finally:
+        connections[alias].close()
+        del connections[alias]
+        del connections.databases[alias]
+        shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,83 @@
+"""
+Per-request instrumentation.
+
+While ``InstrumentationMiddleware`` handles a sampled request it binds a
+``Collector`` to the thread. SQL queries, cache lookups, template
+rendering and thumbnail generation report into whatever collector is
+bound, and do nothing more than a thread-local lookup when there is
+none, so unsampled requests and background work pay next to nothing.
+"""
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from threading import local
+
+_state = local()
+
+
+class Collector:
+    """Counts and total durations of what one request did."""
+    def __init__(self):
+        self.counts = defaultdict(int)
+        self.seconds = defaultdict(float)
+        self.active = set()
+
+    def add(self, name, seconds=0.0, count=1):
+        self.counts[name] += count
+        self.seconds[name] += seconds
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        """``connection.execute_wrapper`` hook timing every query."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.add('db', time.perf_counter() - started)
+
+
+def current():
+    """The collector of the request being handled, if it is sampled."""
+    return getattr(_state, 'collector', None)
+
+
+@contextmanager
+def collecting(collector):
+    previous = current()
+    _state.collector = collector
+    try:
+        yield collector
+    finally:
+        _state.collector = previous
+
+
+def count(name, amount=1):
+    collector = current()
+    if collector is not None and amount:
+        collector.add(name, count=amount)
+
+
+@contextmanager
+def timed(name, histogram=None):
+    """
+    Add the time spent in the block to the current collector under
+    ``name``, and observe it in ``histogram`` even outside requests.
+    Nested blocks of the same name are counted once, by the outermost.
+    """
+    collector = current()
+    if collector is not None and name in collector.active:
+        collector = None
+    if collector is None and histogram is None:
+        yield
+        return
+    if collector is not None:
+        collector.active.add(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        if collector is not None:
+            collector.active.discard(name)
+            collector.add(name, elapsed)
+        if histogram is not None:
+            histogram.observe(elapsed)
@@ -0,0 +1,111 @@
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import Collector, collecting, metrics
+
+logger = logging.getLogger('yatube.requests')
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    return match.view_name
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+def server_timing(collector, total):
+    """``Server-Timing`` header value for a finished request."""
+    counts, seconds = collector.counts, collector.seconds
+    entries = [
+        f'db;dur={_ms(seconds["db"])};desc="{counts["db"]} queries"',
+        f'cache;desc="{counts["cache_hit"]} hits, '
+        f'{counts["cache_miss"]} misses"',
+    ]
+    if counts['template']:
+        entries.append(f'template;dur={_ms(seconds["template"])}')
+    if counts['thumbnail']:
+        entries.append(f'thumbnail;dur={_ms(seconds["thumbnail"])}')
+    entries.append(f'total;dur={_ms(total)}')
+    return ', '.join(entries)
+
+
+class InstrumentationMiddleware:
+    """
+    Times every request; for a ``settings.INSTRUMENTATION_SAMPLE_RATE``
+    share of them also counts queries, cache lookups and template time,
+    reports them in ``Server-Timing`` and a JSON log line of the
+    ``yatube.requests`` logger, and feeds the ``/metrics`` histograms.
+    Should come first in ``MIDDLEWARE`` to see the whole request.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = settings.INSTRUMENTATION_SAMPLE_RATE
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            started = time.perf_counter()
+            response = self.get_response(request)
+            self._count(request, response, time.perf_counter() - started)
+            return response
+
+        collector = Collector()
+        started = time.perf_counter()
+        with collecting(collector), ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(collector.execute_wrapper))
+            response = self.get_response(request)
+        total = time.perf_counter() - started
+        view = self._count(request, response, total)
+        self._observe(view, collector)
+        response['Server-Timing'] = server_timing(collector, total)
+        self._log(request, response, view, collector, total)
+        return response
+
+    def _count(self, request, response, total):
+        view = _view_name(request)
+        metrics.REQUESTS.inc(view=view, method=request.method,
+                             status=response.status_code)
+        metrics.REQUEST_SECONDS.observe(total, view=view)
+        return view
+
+    def _observe(self, view, collector):
+        counts, seconds = collector.counts, collector.seconds
+        metrics.DB_QUERIES.observe(counts['db'], view=view)
+        metrics.DB_SECONDS.observe(seconds['db'], view=view)
+        metrics.CACHE_LOOKUPS.inc(counts['cache_hit'], view=view,
+                                  result='hit')
+        metrics.CACHE_LOOKUPS.inc(counts['cache_miss'], view=view,
+                                  result='miss')
+        if counts['template']:
+            metrics.TEMPLATE_SECONDS.observe(seconds['template'], view=view)
+
+    def _log(self, request, response, view, collector, total):
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        counts, seconds = collector.counts, collector.seconds
+        record = {
+            'view': view,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': _ms(total),
+            'db_queries': counts['db'],
+            'db_ms': _ms(seconds['db']),
+            'cache_hits': counts['cache_hit'],
+            'cache_misses': counts['cache_miss'],
+            'template_ms': _ms(seconds['template']),
+            'thumbnail_ms': _ms(seconds['thumbnail']),
+        }
+        logger.info(json.dumps(record, ensure_ascii=False),
+                    extra={'instrumentation': record})
@@ -0,0 +1,199 @@
+"""
+Slow and repeated query detection.
+
+``QueryDetector`` hooks into ``connection.execute_wrapper`` and groups the
+SQL it sees by fingerprint: the statement with literals and placeholders
+replaced by ``?`` and ``IN`` lists collapsed. A fingerprint seen more than
+``repeat_threshold`` times is reported as an N+1, a statement slower than
+``slow_ms`` as a slow query; both with the project code line and the
+template line that issued them.
+
+It is opt-in: ``QueryDetectorMiddleware`` is active only with
+``settings.QUERY_DETECTOR_ENABLED``, and ``core.pytest_plugin`` runs it
+around every test.
+"""
+import logging
+import os
+import re
+import sys
+import time
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('yatube.queries')
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%s|\?')
+_IN_LIST = re.compile(r'\bIN \(\?(?:, \?)*\)', re.IGNORECASE)
+_SPACE = re.compile(r'\s+')
+# transaction control repeats by nature and says nothing about data access
+_TRANSACTION = re.compile(r'(BEGIN|COMMIT|ROLLBACK|SAVEPOINT|RELEASE)\b',
+                          re.IGNORECASE)
+
+# the instrumentation wraps project code, it never issues queries itself
+_INSTRUMENTATION_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def fingerprint(sql):
+    """``sql`` with every value replaced by ``?``."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _SPACE.sub(' ', sql).strip()
+    return _IN_LIST.sub('IN (...)', sql)
+
+
+def _template_line(frame):
+    node = frame.f_locals.get('self')
+    token = getattr(node, 'token', None)
+    origin = getattr(node, 'origin', None)
+    if token is None or origin is None:
+        return None
+    return f'{origin.template_name or origin.name}:{token.lineno}'
+
+
+def _project_root():
+    # the repository, so that tests next to the project count as well
+    return os.path.dirname(os.path.abspath(settings.BASE_DIR))
+
+
+def _is_project_file(filename, root):
+    filename = os.path.abspath(filename)
+    return (filename.startswith(root + os.sep)
+            and not filename.startswith(_INSTRUMENTATION_DIR + os.sep)
+            and 'site-packages' not in filename)
+
+
+def origin():
+    """
+    ``(code, template)``: the innermost project line and template line on
+    the stack, either ``None`` when there is none.
+    """
+    code = template = None
+    root = _project_root()
+    frame = sys._getframe(1)
+    while frame is not None and (code is None or template is None):
+        if template is None and frame.f_code.co_name == 'render_annotated':
+            template = _template_line(frame)
+        filename = frame.f_code.co_filename
+        if code is None and _is_project_file(filename, root):
+            code = (f'{os.path.relpath(filename, root)}:{frame.f_lineno} '
+                    f'in {frame.f_code.co_name}')
+        frame = frame.f_back
+    return code, template
+
+
+@dataclass
+class QueryGroup:
+    fingerprint: str
+    count: int = 0
+    seconds: float = 0.0
+    code: str = None
+    template: str = None
+
+
+@dataclass
+class SlowQuery:
+    sql: str
+    seconds: float
+    code: str = None
+    template: str = None
+
+
+@dataclass
+class QueryDetector:
+    repeat_threshold: int = None
+    slow_ms: float = None
+    groups: dict = field(default_factory=dict)
+    slow: list = field(default_factory=list)
+    findings: list = field(default_factory=list)
+
+    def __post_init__(self):
+        if self.repeat_threshold is None:
+            self.repeat_threshold = settings.QUERY_DETECTOR_REPEAT_THRESHOLD
+        if self.slow_ms is None:
+            self.slow_ms = settings.QUERY_DETECTOR_SLOW_MS
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.record(sql, time.perf_counter() - started)
+
+    def record(self, sql, seconds):
+        if _TRANSACTION.match(sql.lstrip()):
+            return
+        key = fingerprint(sql)
+        group = self.groups.get(key)
+        if group is None:
+            group = self.groups[key] = QueryGroup(key)
+        group.count += 1
+        group.seconds += seconds
+        # the second run is the first one that may be a loop
+        if group.count == 2:
+            group.code, group.template = origin()
+        if seconds * 1000 >= self.slow_ms:
+            self.slow.append(SlowQuery(sql, seconds, *origin()))
+
+    @contextmanager
+    def watch(self):
+        """Record the queries of every database alias in the block."""
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(self.execute_wrapper))
+            yield self
+
+    def repeated(self):
+        """Query groups that look like N+1s, the most frequent first."""
+        return sorted(
+            (group for group in self.groups.values()
+             if group.count > self.repeat_threshold),
+            key=lambda group: -group.count,
+        )
+
+    def checkpoint(self):
+        """
+        Close a unit of work, e.g. a request: keep its N+1s in
+        ``findings`` and count the next unit from zero.
+        """
+        self.findings += self.repeated()
+        self.groups = {}
+
+    def report(self, label):
+        """Log every finding under ``label``; returns their number."""
+        repeated = self.repeated()
+        for group in repeated:
+            logger.warning(
+                'N+1 in %s: %d× %s (%s; %s)', label, group.count,
+                group.fingerprint, group.code or '?', group.template or '-',
+            )
+        for query in self.slow:
+            logger.warning(
+                'Slow query in %s: %.1f ms %s (%s; %s)', label,
+                query.seconds * 1000, query.sql, query.code or '?',
+                query.template or '-',
+            )
+        return len(repeated) + len(self.slow)
+
+
+class QueryDetectorMiddleware:
+    """Report the N+1s and slow queries of every request."""
+    def __init__(self, get_response):
+        if not settings.QUERY_DETECTOR_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with QueryDetector().watch() as detector:
+            response = self.get_response(request)
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else request.path
+        detector.report(f'{request.method} {view}')
+        return response
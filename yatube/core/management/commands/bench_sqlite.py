@@ -0,0 +1,53 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from core.db import benchmark
+from core.db.config import PROFILES
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает профили SQLite: сколько чтений и записей в секунду '
+            'выдерживает база при одновременной работе потоков')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', nargs='+', choices=list(PROFILES),
+                            default=list(PROFILES),
+                            help='Какие профили замерить')
+        parser.add_argument('--readers', type=int, default=4,
+                            help='Потоков, читающих ленты')
+        parser.add_argument('--writers', type=int, default=2,
+                            help='Потоков, публикующих посты')
+        parser.add_argument('--duration', type=float, default=5.0,
+                            help='Секунд на замер одного профиля')
+        parser.add_argument('--rows', type=int, default=20000,
+                            help='Постов в базе перед замером')
+        parser.add_argument('--output',
+                            help='Куда записать результаты в JSON')
+
+    def handle(self, *args, **options):
+        report = {}
+        self.stdout.write(
+            f'{"профиль":<12}{"операция":<10}{"в сек":>10}{"p50, мс":>10}'
+            f'{"p95, мс":>10}{"ошибки":>8}'
+        )
+        for profile in options['profiles']:
+            report[profile] = benchmark.run(
+                profile,
+                readers=options['readers'],
+                writers=options['writers'],
+                duration=options['duration'],
+                rows=options['rows'],
+            )
+            for kind, result in report[profile].items():
+                self.stdout.write(
+                    f'{profile:<12}{kind:<10}{result["ops_per_s"]:>10}'
+                    f'{result["p50_ms"]!s:>10}{result["p95_ms"]!s:>10}'
+                    f'{result["errors"]:>8}'
+                )
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(
+                f'Результаты записаны в {options["output"]}'
+            ))
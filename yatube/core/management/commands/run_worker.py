@@ -0,0 +1,40 @@
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.tasks.worker import POOLS, Worker
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди в базе данных'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int,
+                            default=settings.TASKS_CONCURRENCY,
+                            help='Сколько задач выполнять одновременно')
+        parser.add_argument('--pool', choices=POOLS, default='thread',
+                            help='В потоках или в отдельных процессах')
+        parser.add_argument('--poll-interval', type=float,
+                            default=settings.TASKS_POLL_INTERVAL,
+                            help='Как часто, в секундах, проверять очередь')
+        parser.add_argument('--burst', action='store_true',
+                            help='Выйти, когда в очереди не останется '
+                                 'задач, которые пора выполнять')
+
+    def handle(self, *args, **options):
+        worker = Worker(
+            concurrency=options['concurrency'],
+            pool=options['pool'],
+            poll_interval=options['poll_interval'],
+            burst=options['burst'],
+        )
+        # finish the jobs at hand before exiting
+        signal.signal(signal.SIGTERM, worker.stop)
+        signal.signal(signal.SIGINT, worker.stop)
+        self.stdout.write(
+            f'Воркер {worker.name}: {worker.concurrency} '
+            f'({worker.pool}), Ctrl+C - остановить'
+        )
+        worker.run()
+        self.stdout.write(self.style.SUCCESS('Воркер остановлен'))
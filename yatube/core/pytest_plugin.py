@@ -0,0 +1,119 @@
+"""
+Pytest plugin failing tests that introduce N+1 queries.
+
+Enabled with ``--detect-n-plus-one`` (or ``detect_n_plus_one = true`` in
+the ini file), it runs every test body under ``QueryDetector``; every
+request the test makes is counted on its own. Repeated query fingerprints
+listed in the ``n_plus_one_baseline`` file are known and tolerated;
+``--n-plus-one-record`` appends the ones found instead of failing, and
+``@pytest.mark.allow_n_plus_one`` exempts a single test.
+"""
+import os
+
+import pytest
+
+BASELINE_HEADER = ('# Known N+1 query fingerprints, one per line; '
+                   'see core/pytest_plugin.py\n')
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('n-plus-one', 'N+1 query detection')
+    group.addoption('--detect-n-plus-one', action='store_true', default=None,
+                    help='fail tests repeating a query too many times')
+    group.addoption('--n-plus-one-threshold', type=int, default=None,
+                    help='repetitions allowed, QUERY_DETECTOR_REPEAT_'
+                         'THRESHOLD by default')
+    group.addoption('--n-plus-one-record', action='store_true',
+                    help='add the N+1s found to the baseline instead of '
+                         'failing')
+    parser.addini('detect_n_plus_one', 'enable N+1 detection', type='bool',
+                  default=False)
+    parser.addini('n_plus_one_baseline', 'file of known N+1 fingerprints')
+
+
+def _enabled(config):
+    option = config.getoption('detect_n_plus_one')
+    if option is not None:
+        return option
+    return config.getini('detect_n_plus_one')
+
+
+def _baseline_path(config):
+    path = config.getini('n_plus_one_baseline')
+    return os.path.join(str(config.rootdir), path) if path else None
+
+
+def _load_baseline(path):
+    if not path or not os.path.exists(path):
+        return set()
+    with open(path, encoding='utf-8') as file:
+        return {
+            line.strip() for line in file
+            if line.strip() and not line.startswith('#')
+        }
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        'markers', 'allow_n_plus_one: do not check the test for N+1 queries'
+    )
+    config._n_plus_one_baseline = _load_baseline(_baseline_path(config))
+    config._n_plus_one_recorded = set()
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    config = item.config
+    if not _enabled(config) or item.get_closest_marker('allow_n_plus_one'):
+        yield
+        return
+    from django.core.signals import request_finished, request_started
+
+    from core.instrumentation.queries import QueryDetector
+
+    detector = QueryDetector(
+        repeat_threshold=config.getoption('n_plus_one_threshold'))
+
+    def checkpoint(**kwargs):
+        detector.checkpoint()
+
+    request_started.connect(checkpoint)
+    request_finished.connect(checkpoint)
+    try:
+        with detector.watch():
+            outcome = yield
+    finally:
+        request_started.disconnect(checkpoint)
+        request_finished.disconnect(checkpoint)
+    if outcome.excinfo is not None:
+        return
+    detector.checkpoint()
+    new = [
+        group for group in detector.findings
+        if group.fingerprint not in config._n_plus_one_baseline
+    ]
+    if not new:
+        return
+    if config.getoption('n_plus_one_record'):
+        config._n_plus_one_recorded.update(group.fingerprint for group in new)
+        return
+    pytest.fail('\n'.join(
+        ['New N+1 queries:'] + [
+            f'  {group.count}× {group.fingerprint}\n'
+            f'    at {group.code or "?"}, template {group.template or "-"}'
+            for group in new
+        ]
+    ), pytrace=False)
+
+
+def pytest_unconfigure(config):
+    recorded = getattr(config, '_n_plus_one_recorded', None)
+    path = _baseline_path(config)
+    if not recorded or not path:
+        return
+    new_file = not os.path.exists(path)
+    with open(path, 'a', encoding='utf-8') as file:
+        if new_file:
+            file.write(BASELINE_HEADER)
+        for fingerprint in sorted(recorded - config._n_plus_one_baseline):
+            file.write(fingerprint + '\n')
@@ -0,0 +1,92 @@
+"""
+Durable background tasks.
+
+A function decorated with ``@task`` stays an ordinary function, while its
+``delay(*args, **kwargs)`` stores a ``core.models.Job`` row instead of
+calling it; a ``run_worker`` process picks the row up (see
+``core.tasks.worker``). The row is written in the caller's transaction:
+work enqueued by a request that rolls back never runs, work enqueued by
+one that commits survives a restart of the site and of the worker.
+Arguments go through JSON, so tasks take primary keys, not model
+instances.
+
+A failing job is tried again up to ``retries`` times, ``backoff``,
+``2 * backoff``, ``4 * backoff``... seconds later. A task with ``every``
+is periodic: it takes no arguments and always has one pending job, due
+``every`` seconds after the previous run ended. Tasks live in the
+``tasks`` modules of the installed apps, imported when Django starts.
+
+With ``settings.TASKS_EAGER`` ``delay`` calls the task in place, for
+tests and for running the site without a worker.
+"""
+import json
+from datetime import timedelta
+from functools import update_wrapper
+
+from django.conf import settings
+from django.utils import timezone
+
+registry = {}
+
+
+class Task:
+    def __init__(self, func, retries=0, backoff=None, every=None):
+        update_wrapper(self, func)
+        self.func = func
+        self.name = f'{func.__module__}.{func.__qualname__}'
+        self.retries = retries
+        self.backoff = backoff
+        if isinstance(every, (int, float)):
+            every = timedelta(seconds=every)
+        self.every = every
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def __repr__(self):
+        return f'<Task {self.name}>'
+
+    @property
+    def periodic_key(self):
+        return f'periodic:{self.name}'
+
+    def retry_delay(self, attempt):
+        """Seconds to wait after the ``attempt``-th failure."""
+        backoff = self.backoff
+        if backoff is None:
+            backoff = settings.TASKS_RETRY_BACKOFF
+        return backoff * 2 ** (attempt - 1)
+
+    def enqueue(self, args=(), kwargs=None, run_at=None, unique_key=None):
+        from core.models import Job
+        return Job.objects.create(
+            name=self.name,
+            arguments=json.dumps([list(args), kwargs or {}]),
+            run_at=run_at or timezone.now(),
+            max_attempts=self.retries + 1,
+            unique_key=unique_key,
+        )
+
+    def delay(self, *args, **kwargs):
+        """Queue a call; returns the ``Job``, or ``None`` when eager."""
+        if settings.TASKS_EAGER:
+            # the same round trip a queued call makes
+            args, kwargs = json.loads(json.dumps([args, kwargs]))
+            self.func(*args, **kwargs)
+            return None
+        return self.enqueue(args, kwargs)
+
+
+def task(func=None, *, retries=0, backoff=None, every=None):
+    """
+    Make ``func`` a task: ``@task`` or ``@task(retries=3, backoff=10)``,
+    ``@task(every=timedelta(hours=1))`` for a periodic one.
+    """
+    def decorator(func):
+        registered = Task(func, retries=retries, backoff=backoff,
+                          every=every)
+        registry[registered.name] = registered
+        return registered
+    if func is not None:
+        return decorator(func)
+    return decorator
@@ -0,0 +1,237 @@
+"""
+Worker side of ``core.tasks``.
+
+The queue is the ``Job`` table. A worker polls it for due jobs and claims
+each one with an ``UPDATE ... WHERE status = 'queued'``, so of several
+workers polling the same database exactly one gets a job, then runs the
+jobs in a pool of threads or of processes. Every job ends ``done``,
+queued again for a retry, or ``failed`` with the traceback kept in
+``last_error``.
+
+Once a minute the worker also requeues the jobs of workers that died
+holding them (claimed longer than ``TASKS_LEASE`` seconds ago), gives
+every periodic task its pending job and deletes ``done`` jobs older than
+``TASKS_KEEP_DONE`` seconds.
+"""
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import (FIRST_COMPLETED, ProcessPoolExecutor,
+                                ThreadPoolExecutor, wait)
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.db import (IntegrityError, OperationalError, connections,
+                       transaction)
+from django.db.models import F
+from django.utils import timezone
+
+from core.db.router import use_primary
+from core.models import Job
+
+from . import registry
+
+logger = logging.getLogger(__name__)
+
+MAINTENANCE_INTERVAL = 60
+POOLS = ('thread', 'process')
+LOCKED_RETRIES = 5
+
+
+def _persist(operation, *args, **kwargs):
+    """
+    Run a statement of the queue's own bookkeeping, waiting out the short
+    "database is locked" moments of SQLite under concurrent writers.
+    """
+    for attempt in range(LOCKED_RETRIES):
+        try:
+            return operation(*args, **kwargs)
+        except OperationalError:
+            if attempt == LOCKED_RETRIES - 1:
+                raise
+            time.sleep(0.05 * 2 ** attempt)
+
+
+def claim(worker, limit):
+    """Primary keys of up to ``limit`` due jobs now owned by ``worker``."""
+    now = timezone.now()
+    due = _persist(list, Job.objects.filter(
+        status=Job.QUEUED, run_at__lte=now
+    ).order_by('run_at', 'pk').values_list('pk', flat=True)[:limit])
+    claimed = []
+    for pk in due:
+        taken = _persist(
+            Job.objects.filter(pk=pk, status=Job.QUEUED, run_at__lte=now)
+            .update, status=Job.RUNNING, locked_by=worker, locked_at=now,
+            attempts=F('attempts') + 1)
+        if taken:
+            claimed.append(pk)
+    return claimed
+
+
+def _record(job, task, error):
+    now = timezone.now()
+    changes = {'locked_by': '', 'locked_at': None, 'last_error': error}
+    if error and task is not None and job.attempts < job.max_attempts:
+        delay = task.retry_delay(job.attempts)
+        logger.warning('Task %s (job %s) failed, attempt %s of %s, '
+                       'retrying in %ss:\n%s', job.name, job.pk,
+                       job.attempts, job.max_attempts, delay, error)
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.QUEUED, run_at=now + timedelta(seconds=delay),
+            **changes)
+        return
+    if error:
+        logger.error('Task %s (job %s) failed:\n%s', job.name, job.pk, error)
+    with transaction.atomic():
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.FAILED if error else Job.DONE, finished=now,
+            unique_key=None, **changes)
+        if task is not None and task.every:
+            task.enqueue(run_at=now + task.every,
+                         unique_key=task.periodic_key)
+
+
+def execute(pk):
+    """Run a claimed job and record how it went."""
+    with use_primary():
+        job = _persist(Job.objects.get, pk=pk)
+        task = registry.get(job.name)
+        error = ''
+        try:
+            if task is None:
+                raise LookupError(f'Unknown task {job.name}')
+            args, kwargs = json.loads(job.arguments)
+            task(*args, **kwargs)
+        except Exception:
+            error = traceback.format_exc()
+        _persist(_record, job, task, error)
+
+
+def _execute_in_pool(pk):
+    try:
+        execute(pk)
+    finally:
+        connections.close_all()
+
+
+def drain(worker='inline'):
+    """Run every due job in the calling thread; returns how many ran."""
+    total = 0
+    while True:
+        claimed = claim(worker, 1)
+        if not claimed:
+            return total
+        execute(claimed[0])
+        total += 1
+
+
+def schedule_periodic():
+    """Give every periodic task without a pending job one due now."""
+    for task in registry.values():
+        if not task.every:
+            continue
+        if Job.objects.filter(unique_key=task.periodic_key).exists():
+            continue
+        try:
+            with transaction.atomic():
+                task.enqueue(unique_key=task.periodic_key)
+        except IntegrityError:
+            # another worker got there first
+            pass
+
+
+def requeue_stale():
+    """Hand the jobs of dead workers to the living; returns how many."""
+    now = timezone.now()
+    stale = Job.objects.filter(
+        status=Job.RUNNING,
+        locked_at__lt=now - timedelta(seconds=settings.TASKS_LEASE))
+    requeued = stale.filter(attempts__lt=F('max_attempts')).update(
+        status=Job.QUEUED, run_at=now, locked_by='', locked_at=None)
+    stale.update(status=Job.FAILED, finished=now, unique_key=None,
+                 locked_by='', locked_at=None,
+                 last_error='The worker running the job has gone')
+    return requeued
+
+
+def maintain():
+    with use_primary():
+        requeue_stale()
+        schedule_periodic()
+        Job.objects.filter(
+            status=Job.DONE,
+            finished__lt=timezone.now() - timedelta(
+                seconds=settings.TASKS_KEEP_DONE)
+        ).delete()
+
+
+class Worker:
+    """Polls the queue and runs jobs until stopped."""
+    def __init__(self, concurrency=None, pool='thread', poll_interval=None,
+                 burst=False):
+        if pool not in POOLS:
+            raise ValueError(f'Unknown pool {pool!r}')
+        self.concurrency = concurrency or settings.TASKS_CONCURRENCY
+        self.pool = pool
+        self.poll_interval = poll_interval or settings.TASKS_POLL_INTERVAL
+        self.burst = burst
+        self.name = f'{socket.gethostname()}:{os.getpid()}'
+        self.stopping = threading.Event()
+
+    def stop(self, *args):
+        """Take no more jobs; those running are finished first."""
+        self.stopping.set()
+
+    def _executor(self):
+        if self.pool == 'process':
+            # spawned, not forked: a child sets Django up afresh instead
+            # of inheriting the database connections of the parent
+            return ProcessPoolExecutor(
+                self.concurrency, initializer=django.setup,
+                mp_context=multiprocessing.get_context('spawn'))
+        return ThreadPoolExecutor(self.concurrency,
+                                  thread_name_prefix='tasks')
+
+    @staticmethod
+    def _collect(futures):
+        running = set()
+        for future in futures:
+            if not future.done():
+                running.add(future)
+            elif future.exception() is not None:
+                logger.error('Task worker failed',
+                             exc_info=future.exception())
+        return running
+
+    def run(self):
+        running = set()
+        maintained = None
+        with self._executor() as executor:
+            while not self.stopping.is_set():
+                now = time.monotonic()
+                if maintained is None or (
+                        now - maintained >= MAINTENANCE_INTERVAL):
+                    _persist(maintain)
+                    maintained = now
+                running = self._collect(running)
+                free = self.concurrency - len(running)
+                with use_primary():
+                    claimed = claim(self.name, free) if free else []
+                running.update(executor.submit(_execute_in_pool, pk)
+                               for pk in claimed)
+                if claimed:
+                    continue
+                if self.burst and not running:
+                    break
+                if running:
+                    wait(running, self.poll_interval, FIRST_COMPLETED)
+                else:
+                    self.stopping.wait(self.poll_interval)
+        connections.close_all()
@@ -0,0 +1,60 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..auth import user_key
+
+User = get_user_model()
+
+
+@override_settings(
+    SESSION_ENGINE='django.contrib.sessions.backends.cached_db',
+    AUTHENTICATION_BACKENDS=['core.auth.CachedModelBackend'],
+)
+class CachedUserTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='leo',
+                                             password='old-secret-1')
+        self.client = Client()
+        self.client.login(username='leo', password='old-secret-1')
+        self.cache = caches['shared']
+
+    def get_user(self, client):
+        response = client.get(reverse('about:author'))
+        return response.wsgi_request.user
+
+    def test_warm_request_makes_no_queries(self):
+        """Тест для проверки, что сессия и пользователь берутся из кэша."""
+        self.get_user(self.client)
+        with self.assertNumQueries(0):
+            user = self.get_user(self.client)
+        self.assertEqual(user, self.user)
+        self.assertIsNotNone(self.cache.get(user_key(self.user.pk)))
+
+    def test_save_drops_cached_user(self):
+        """Тест для проверки сброса пользователя в кэше при сохранении."""
+        self.get_user(self.client)
+        self.user.first_name = 'Лев'
+        self.user.save()
+        self.assertIsNone(self.cache.get(user_key(self.user.pk)))
+        self.assertEqual(self.get_user(self.client).first_name, 'Лев')
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertFalse(self.get_user(self.client).is_authenticated)
+
+    def test_password_change_ends_other_sessions(self):
+        """Тест для проверки выхода других сессий после смены пароля."""
+        other = Client()
+        other.login(username='leo', password='old-secret-1')
+        self.assertTrue(self.get_user(other).is_authenticated)
+        response = self.client.post(reverse('users:password_change'), {
+            'old_password': 'old-secret-1',
+            'new_password1': 'new-secret-2',
+            'new_password2': 'new-secret-2',
+        })
+        self.assertRedirects(response, reverse('users:password_change_done'))
+        self.assertTrue(self.get_user(self.client).is_authenticated)
+        self.assertFalse(self.get_user(other).is_authenticated)
@@ -0,0 +1,148 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+from ..cache.config import cache_settings, is_shared, parse_cache_url
+from ..cache.redis import RedisCache, RedisError
+from ..cache.testing import FakeRedisServer
+
+User = get_user_model()
+
+
+class CacheConfigTest(TestCase):
+    def test_parse_cache_url(self):
+        """Тест для проверки разбора URL кэша из окружения."""
+        cases = {
+            'locmem://': ('LocMemCache', 'yatube'),
+            'file:///tmp/yatube': ('FileBasedCache', '/tmp/yatube'),
+            'memcached://a:11211,b:11211': ('MemcachedCache',
+                                            ['a:11211', 'b:11211']),
+            'redis://127.0.0.1:6379/2': ('RedisCache', '127.0.0.1:6379'),
+        }
+        for url, (backend, location) in cases.items():
+            with self.subTest(url=url):
+                config = parse_cache_url(url)
+                self.assertTrue(config['BACKEND'].endswith(backend))
+                self.assertEqual(config['LOCATION'], location)
+        self.assertEqual(parse_cache_url('redis://h:1/2')['OPTIONS']['DB'],
+                         '2')
+        with self.assertRaises(ValueError):
+            parse_cache_url('ftp://example.com')
+        # от него зависит, держать ли сессии и пользователей в кэше
+        self.assertFalse(is_shared('locmem://'))
+        self.assertTrue(is_shared('redis://127.0.0.1:6379/0'))
+
+
+class RedisCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = FakeRedisServer().start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.cache = RedisCache(
+            '%s:%s' % self.server.server_address, {'OPTIONS': {'DB': 1}}
+        )
+        self.cache.clear()
+
+    def tearDown(self):
+        self.cache.disconnect()
+
+    def test_basic_operations(self):
+        """Тест для проверки основных операций с кэшем по протоколу
+        Redis."""
+        self.cache.set('text', {'a': 1})
+        self.assertEqual(self.cache.get('text'), {'a': 1})
+        self.assertFalse(self.cache.add('text', 'other'))
+        self.assertTrue(self.cache.add('new', 'value'))
+        self.assertEqual(self.cache.get_many(['text', 'new', 'none']),
+                         {'text': {'a': 1}, 'new': 'value'})
+        self.cache.delete_many(['text', 'new'])
+        self.assertIsNone(self.cache.get('text'))
+        self.assertEqual(self.cache.get('none', 'default'), 'default')
+
+    def test_incr_and_expiry(self):
+        """Тест для проверки счетчиков и истечения записей."""
+        self.cache.set('counter', 1)
+        self.assertEqual(self.cache.incr('counter', 5), 6)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+        self.cache.set('short', 'value', 0.05)
+        time.sleep(0.1)
+        self.assertFalse(self.cache.has_key('short'))
+        self.cache.set('gone', 'value', 0)
+        self.assertIsNone(self.cache.get('gone'))
+
+    def test_error_in_pipeline(self):
+        """Тест для проверки, что ошибка посреди конвейера не сдвигает
+        ответы следующих команд."""
+        self.cache.set_many({'text': 'value', 'counter': 1})
+        text = self.cache.make_key('text')
+        counter = self.cache.make_key('counter')
+        with self.assertRaisesRegex(RedisError, '^ERR'):
+            self.cache._pipeline([('INCRBY', counter, 1),
+                                  ('INCRBY', text, 1),
+                                  ('INCRBY', counter, 1)])
+        self.assertEqual(self.cache.get('counter'), 3)
+        self.assertEqual(self.cache.get('text'), 'value')
+
+
+class TieredCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = FakeRedisServer().start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.settings = override_settings(
+            CACHES=cache_settings(self.server.url, l1_timeout=60))
+        self.settings.enable()
+        caches['default'].clear()
+
+    def tearDown(self):
+        caches['default'].clear()
+        self.settings.disable()
+
+    def test_l1_serves_hot_keys(self):
+        """Тест для проверки чтения горячих ключей из памяти процесса."""
+        cache = caches['default']
+        cache.set('key', 'value')
+        caches['shared'].set('key', 'changed elsewhere')
+        self.assertEqual(cache.get('key'), 'value')
+        cache.delete('key')
+        caches['shared'].set('key', 'changed elsewhere')
+        self.assertEqual(cache.get('key'), 'changed elsewhere')
+
+    def test_l1_follows_own_writes(self):
+        """Тест для проверки согласованности уровней после записи."""
+        cache = caches['default']
+        cache.set('counter', 1)
+        self.assertEqual(cache.incr('counter'), 2)
+        self.assertEqual(cache.get('counter'), 2)
+        self.assertEqual(caches['shared'].get('counter'), 2)
+
+    def test_feed_is_cached_in_shared_server(self):
+        """Тест для проверки работы ленты с общим кэшем."""
+        user = User.objects.create_user(username='leo')
+        Post.objects.create(text='Тестовый пост', author=user)
+        client = Client()
+        response = client.get(reverse('posts:index'))
+        self.assertContains(response, 'Тестовый пост')
+        with self.assertNumQueries(0):
+            cached = client.get(reverse('posts:index'))
+        self.assertEqual(response.content, cached.content)
@@ -0,0 +1,80 @@
+import os
+import shutil
+import tempfile
+
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase
+
+from ..db import benchmark
+from ..db.config import PRODUCTION_PRAGMAS, database_settings
+
+
+class DatabaseProfileTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'db.sqlite3')
+        self.connections = ConnectionHandler(
+            database_settings(self.path, 'production'))
+        self.connection = self.connections['default']
+
+    def tearDown(self):
+        self.connection.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def pragma(self, name):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_profiles(self):
+        """Тест для проверки профилей настроек базы."""
+        default = database_settings('db.sqlite3', 'default')['default']
+        self.assertEqual(default['ENGINE'], 'django.db.backends.sqlite3')
+        self.assertNotIn('CONN_MAX_AGE', default)
+        production = database_settings('db.sqlite3')['default']
+        self.assertEqual(production['CONN_MAX_AGE'], 600)
+        # профили не делят изменяемые словари
+        production['OPTIONS']['PRAGMAS']['cache_size'] = 0
+        self.assertNotEqual(PRODUCTION_PRAGMAS['cache_size'], 0)
+        with self.assertRaises(ValueError):
+            database_settings('db.sqlite3', 'fast')
+        databases = database_settings('db.sqlite3', replicas=['r.sqlite3'])
+        self.assertEqual(list(databases), ['default', 'replica1'])
+        self.assertEqual(databases['replica1']['TEST'], {'MIRROR': 'default'})
+
+    def test_pragmas_applied(self):
+        """Тест для проверки настроек SQLite у нового соединения."""
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('cache_size'), -64 * 1024)
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+        self.assertEqual(self.pragma('foreign_keys'), 1)
+
+    def test_health_check(self):
+        """Тест для проверки замены сломанного соединения перед
+        запросом."""
+        self.pragma('user_version')
+        raw = self.connection.connection
+        # соединение переживает запрос
+        self.connection.close_if_unusable_or_obsolete()
+        self.pragma('user_version')
+        self.assertIs(self.connection.connection, raw)
+
+        self.connection.close_if_unusable_or_obsolete()
+        raw.close()
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        self.assertIsNot(self.connection.connection, raw)
+
+
+class SqliteBenchmarkTest(SimpleTestCase):
+    def test_run(self):
+        """Тест для проверки замера конкурентного чтения и записи."""
+        for profile in ('default', 'production'):
+            with self.subTest(profile=profile):
+                report = benchmark.run(profile, readers=2, writers=1,
+                                       duration=0.2, rows=100)
+                self.assertEqual(set(report), {'read', 'write'})
+                self.assertGreater(report['read']['ops_per_s'], 0)
+                self.assertGreater(report['write']['ops_per_s'], 0)
+                self.assertLessEqual(report['read']['p50_ms'],
+                                     report['read']['p95_ms'])
@@ -0,0 +1,118 @@
+import json
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+from .. import instrumentation
+from ..instrumentation import metrics
+
+User = get_user_model()
+
+
+class MetricsTest(TestCase):
+    def test_histogram_exposition(self):
+        """Тест для проверки вывода гистограммы в формате Prometheus."""
+        histogram = metrics.Histogram('test_seconds', 'Test.', ('view',),
+                                      buckets=(0.1, 1))
+        metrics.REGISTRY.remove(histogram)
+        histogram.observe(0.05, view='a"b')
+        histogram.observe(0.5, view='a"b')
+        histogram.observe(2, view='a"b')
+        self.assertEqual(histogram.render(), [
+            '# HELP test_seconds Test.',
+            '# TYPE test_seconds histogram',
+            'test_seconds_bucket{view="a\\"b",le="0.1"} 1',
+            'test_seconds_bucket{view="a\\"b",le="1"} 2',
+            'test_seconds_bucket{view="a\\"b",le="+Inf"} 3',
+            'test_seconds_sum{view="a\\"b"} 2.55',
+            'test_seconds_count{view="a\\"b"} 3',
+        ])
+        with self.assertRaises(ValueError):
+            histogram.observe(1, other='x')
+
+    def test_nested_timing_counted_once(self):
+        """Тест для проверки, что вложенные замеры учитываются один раз."""
+        collector = instrumentation.Collector()
+        with instrumentation.collecting(collector):
+            with instrumentation.timed('template'):
+                with instrumentation.timed('template'):
+                    pass
+            instrumentation.count('cache_hit', 2)
+        instrumentation.count('cache_hit')
+        self.assertEqual(collector.counts['template'], 1)
+        self.assertEqual(collector.counts['cache_hit'], 2)
+        self.assertIsNone(instrumentation.current())
+
+
+@override_settings(INSTRUMENTATION_SAMPLE_RATE=1)
+class InstrumentationMiddlewareTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_server_timing_header(self):
+        """Тест для проверки заголовка Server-Timing с запросами к БД,
+        кэшем и рендером шаблонов."""
+        response = self.client.get(reverse('posts:index'))
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+        self.assertRegex(timing, r'cache;desc="\d+ hits, [1-9]\d* misses"')
+        self.assertRegex(timing, r'template;dur=[\d.]+')
+        self.assertRegex(timing, r'total;dur=[\d.]+$')
+
+    def test_structured_log(self):
+        """Тест для проверки строки журнала с метриками запроса."""
+        with self.assertLogs('yatube.requests', 'INFO') as logs:
+            self.client.get(reverse('posts:profile', args=['auth']))
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'posts:profile')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['db_queries'], 0)
+        self.assertEqual(logs.records[0].instrumentation, record)
+
+    def test_metrics_endpoint(self):
+        """Тест для проверки гистограмм на странице /metrics."""
+        before = metrics.DB_QUERIES.count(view='posts:index')
+        self.client.get(reverse('posts:index'))
+        self.assertEqual(metrics.DB_QUERIES.count(view='posts:index'),
+                         before + 1)
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        body = response.content.decode()
+        self.assertIn('# TYPE yatube_db_queries histogram', body)
+        self.assertIn('yatube_request_duration_seconds_count'
+                      '{view="posts:index"}', body)
+        self.assertIn('yatube_cache_lookups_total'
+                      '{view="posts:index",result="miss"}', body)
+
+    def test_metrics_allowed_ips(self):
+        """Тест для проверки, что /metrics закрыт для чужих адресов."""
+        response = self.client.get(reverse('metrics'),
+                                   REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 403)
+        with override_settings(METRICS_ALLOWED_IPS=None):
+            response = self.client.get(reverse('metrics'),
+                                       REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(INSTRUMENTATION_SAMPLE_RATE=0)
+    def test_unsampled_request(self):
+        """Тест для проверки, что без выборки считается только
+        длительность."""
+        before = metrics.REQUEST_SECONDS.count(view='posts:index')
+        with mock.patch('core.instrumentation.middleware.logger') as logger:
+            response = self.client.get(reverse('posts:index'))
+        self.assertNotIn('Server-Timing', response)
+        logger.info.assert_not_called()
+        self.assertEqual(metrics.REQUEST_SECONDS.count(view='posts:index'),
+                         before + 1)
@@ -0,0 +1,80 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.template import engines
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Post
+
+from ..instrumentation.queries import QueryDetector, fingerprint
+
+User = get_user_model()
+
+
+class QueryDetectorTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+        for number in range(4):
+            author = User.objects.create_user(username=f'reader{number}')
+            Comment.objects.create(post=cls.post, author=author,
+                                   text='Комментарий')
+
+    def test_fingerprint(self):
+        """Тест для проверки нормализации SQL."""
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE a = 'x''y' AND b = 42\n"
+                        "  AND c IN (%s, %s, %s) LIMIT 21"),
+            'SELECT * FROM t WHERE a = ? AND b = ? AND c IN (...) LIMIT ?',
+        )
+        self.assertEqual(fingerprint('SELECT t1.id FROM t1'),
+                         'SELECT t1.id FROM t1')
+
+    def test_repeated_query_in_template(self):
+        """Тест для проверки, что N+1 находится вместе со строкой шаблона
+        и кода."""
+        template = engines['django'].from_string(
+            '{% for comment in comments %}\n'
+            '{{ comment.author.username }}\n'
+            '{% endfor %}'
+        )
+        with QueryDetector(repeat_threshold=3).watch() as detector:
+            template.render({'comments': Comment.objects.all()})
+        repeated = detector.repeated()
+        self.assertEqual(len(repeated), 1)
+        self.assertEqual(repeated[0].count, 4)
+        self.assertIn('FROM "auth_user"', repeated[0].fingerprint)
+        self.assertTrue(repeated[0].template.endswith(':2'))
+        self.assertIn('core/tests/test_queries.py', repeated[0].code)
+
+        with QueryDetector(repeat_threshold=3).watch() as detector:
+            template.render({'comments': Comment.objects.for_page('detail')})
+        self.assertEqual(detector.repeated(), [])
+
+    def test_slow_query(self):
+        """Тест для проверки журналирования медленных запросов."""
+        with QueryDetector(slow_ms=0).watch() as detector:
+            list(Post.objects.all())
+        self.assertEqual(len(detector.slow), 1)
+        with self.assertLogs('yatube.queries', 'WARNING') as logs:
+            self.assertEqual(detector.report('test'), 1)
+        self.assertIn('Slow query in test', logs.output[0])
+
+    @override_settings(QUERY_DETECTOR_ENABLED=True,
+                       QUERY_DETECTOR_REPEAT_THRESHOLD=1)
+    def test_middleware(self):
+        """Тест для проверки, что страницы поста и профиля не делают
+        запросов в цикле."""
+        client = Client()
+        client.force_login(self.user)
+        with mock.patch('core.instrumentation.queries.logger') as logger:
+            client.get(reverse('posts:post_detail', args=[self.post.pk]))
+            client.get(reverse('posts:profile', args=['auth']))
+        logger.warning.assert_not_called()
+
+        with override_settings(QUERY_DETECTOR_SLOW_MS=0):
+            with self.assertLogs('yatube.queries', 'WARNING') as logs:
+                Client().get(reverse('posts:profile', args=['auth']))
+        self.assertIn('Slow query in GET posts:profile', logs.output[0])
@@ -0,0 +1,84 @@
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.test import (Client, SimpleTestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+
+from posts.models import Post
+
+from ..db import router
+from ..db.testing import sqlite_replica
+from ..models import Job
+
+User = get_user_model()
+
+
+class ReplicaRouterTest(SimpleTestCase):
+    @override_settings(DATABASE_REPLICAS=['replica1', 'replica2'])
+    def test_routing(self):
+        """Тест для проверки, что чтения идут в реплики, а записи - в
+        основную базу."""
+        routing = router.ReplicaRouter()
+        router._state.pinned = False
+        self.addCleanup(setattr, router._state, 'pinned', False)
+        self.assertIn(routing.db_for_read(Post), ['replica1', 'replica2'])
+        post = Post(author=User(pk=1))
+        post._state.db = 'replica2'
+        self.assertEqual(routing.db_for_read(User, instance=post), 'replica2')
+        with router.use_primary():
+            self.assertEqual(routing.db_for_read(Post), 'default')
+        self.assertNotEqual(routing.db_for_read(Post), 'default')
+        self.assertEqual(routing.db_for_write(Post), 'default')
+        self.assertNotEqual(routing.db_for_read(Post), 'default')
+        # служебные записи к основной базе не привязывают
+        for model in (Session, Job):
+            router._wrote(sender=model)
+            self.assertNotEqual(routing.db_for_read(Post), 'default')
+        # после записи поста чтения остаются в основной базе
+        router._wrote(sender=Post)
+        self.assertEqual(routing.db_for_read(Post), 'default')
+        self.assertFalse(routing.allow_migrate('replica1', 'posts'))
+        self.assertTrue(routing.allow_migrate('default', 'posts'))
+
+
+class ReadYourWritesTest(TransactionTestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='auth')
+        self.reader = User.objects.create_user(username='reader')
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_read_your_writes(self):
+        """Тест для проверки, что автор сразу видит свой комментарий,
+        а остальные - после того, как его получит реплика."""
+        with sqlite_replica() as replica:
+            response = self.author_client.post(
+                reverse('posts:post_create'), {'text': 'Новый пост'},
+                follow=True)
+            self.assertContains(response, 'Новый пост')
+            self.assertIn('pin_primary', response.client.cookies)
+            new = Post.objects.using('default').latest('pk')
+            self.author_client.post(
+                reverse('posts:add_comment', args=[new.pk]),
+                {'text': 'Комментарий'})
+            url = reverse('posts:post_comments', args=[new.pk])
+
+            self.assertContains(self.author_client.get(url), 'Комментарий')
+            response = self.reader_client.get(url)
+            self.assertNotContains(response, 'Комментарий')
+            self.assertNotIn('pin_primary', response.cookies)
+            # страницы с валидаторами всегда читаются из основной базы
+            response = self.reader_client.get(
+                reverse('posts:post_detail', args=[new.pk]))
+            self.assertContains(response, 'Комментарий')
+
+            replica.sync()
+            self.assertContains(self.reader_client.get(url), 'Комментарий')
+
+    def test_no_replicas(self):
+        """Тест для проверки, что без реплик метка не ставится."""
+        response = self.author_client.post(
+            reverse('posts:post_create'), {'text': 'Новый пост'})
+        self.assertNotIn('pin_primary', response.cookies)
@@ -0,0 +1,158 @@
+import re
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.core import mail
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from users.tasks import send_password_reset
+
+from ..models import Job
+from ..tasks import registry, task
+from ..tasks.worker import (Worker, drain, requeue_stale,
+                            schedule_periodic)
+
+User = get_user_model()
+
+calls = []
+
+
+@task(retries=2, backoff=10)
+def flaky(value, fail=0):
+    calls.append(value)
+    if len(calls) <= fail:
+        raise ValueError('сбой')
+
+
+@task(every=timedelta(minutes=5))
+def tick():
+    calls.append('tick')
+
+
+class TestTasksMixin:
+    def setUp(self):
+        calls.clear()
+        # по расписанию - только задача теста, без настоящих задач сайта
+        patcher = mock.patch.dict(registry, {
+            name: registered for name, registered in registry.items()
+            if not registered.every or registered is tick
+        }, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class TaskQueueTest(TestTasksMixin, TestCase):
+    def test_delay_queues_job(self):
+        """Тест для проверки, что задача выполняется воркером, а не сразу."""
+        job = flaky.delay('a')
+        self.assertEqual((job.status, job.max_attempts), (Job.QUEUED, 3))
+        self.assertEqual(calls, [])
+        self.assertEqual(drain(), 1)
+        self.assertEqual(calls, ['a'])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.DONE, 1))
+        self.assertIsNotNone(job.finished)
+        with override_settings(TASKS_EAGER=True):
+            self.assertIsNone(flaky.delay('b'))
+        self.assertEqual(calls, ['a', 'b'])
+
+    def test_retries_with_backoff(self):
+        """Тест для проверки повторов упавшей задачи с растущей паузой."""
+        job = flaky.delay('a', fail=3)
+        for attempt, delay in ((1, 10), (2, 20)):
+            started = timezone.now()
+            with self.assertLogs('core.tasks.worker', 'WARNING'):
+                self.assertEqual(drain(), 1)
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts),
+                             (Job.QUEUED, attempt))
+            self.assertGreaterEqual(job.run_at,
+                                    started + timedelta(seconds=delay))
+            self.assertIn('ValueError: сбой', job.last_error)
+            # пауза ещё не прошла
+            self.assertEqual(drain(), 0)
+            Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        with self.assertLogs('core.tasks.worker', 'ERROR'):
+            drain()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 3))
+        self.assertEqual(calls, ['a', 'a', 'a'])
+
+    def test_periodic(self):
+        """Тест для проверки единственной ожидающей задачи по расписанию."""
+        schedule_periodic()
+        schedule_periodic()
+        job = Job.objects.get(name=tick.name)
+        drain()
+        self.assertEqual(calls.count('tick'), 1)
+        following = Job.objects.get(name=tick.name, status=Job.QUEUED)
+        self.assertEqual(following.unique_key, job.unique_key)
+        self.assertGreaterEqual(following.run_at - timezone.now(),
+                                timedelta(minutes=4))
+        schedule_periodic()
+        self.assertEqual(
+            Job.objects.filter(name=tick.name, status=Job.QUEUED).count(), 1)
+
+    def test_requeue_stale(self):
+        """Тест для проверки возврата в очередь задач пропавшего воркера."""
+        job = flaky.delay('a')
+        long_ago = timezone.now() - timedelta(hours=1)
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.RUNNING, attempts=1, locked_by='dead:1',
+            locked_at=long_ago)
+        self.assertEqual(requeue_stale(), 1)
+        self.assertEqual(drain(), 1)
+        self.assertEqual(calls, ['a'])
+
+    def test_password_reset_mail_is_queued(self):
+        """Тест для проверки отправки письма сброса пароля воркером."""
+        user = User.objects.create_user(username='leo',
+                                        email='leo@example.com',
+                                        password='secret')
+        response = self.client.post(reverse('users:password_reset'),
+                                    {'email': 'leo@example.com'})
+        self.assertRedirects(response, reverse('users:password_reset_done'))
+        self.assertEqual(mail.outbox, [])
+        job = Job.objects.get()
+        self.assertEqual(job.name, send_password_reset.name)
+        # ссылка со своим токеном появляется только в воркере
+        self.assertNotIn('/auth/reset/', job.arguments)
+        drain()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['leo@example.com'])
+        uid, token = re.search(r'/auth/reset/([^/]+)/([^/]+)/',
+                               mail.outbox[0].body).groups()
+        self.assertEqual(uid, urlsafe_base64_encode(force_bytes(user.pk)))
+        self.assertTrue(default_token_generator.check_token(user, token))
+
+    def test_password_reset_skips_deactivated_user(self):
+        """Тест для проверки, что выключенному пользователю письма нет."""
+        user = User.objects.create_user(username='leo',
+                                        email='leo@example.com',
+                                        password='secret')
+        self.client.post(reverse('users:password_reset'),
+                         {'email': 'leo@example.com'})
+        user.is_active = False
+        user.save()
+        drain()
+        self.assertEqual(mail.outbox, [])
+
+
+class WorkerTest(TestTasksMixin, TransactionTestCase):
+    def test_thread_pool(self):
+        """Тест для проверки выполнения очереди пулом потоков."""
+        for value in range(6):
+            flaky.delay(value)
+        Worker(concurrency=3, poll_interval=0.01, burst=True).run()
+        # вместе с задачами по расписанию, которым как раз пора
+        self.assertIn('tick', calls)
+        self.assertEqual(sorted(value for value in calls if value != 'tick'),
+                         list(range(6)))
+        self.assertEqual(
+            Job.objects.filter(name=flaky.name, status=Job.DONE).count(), 6)
@@ -1,5 +1,9 @@
+from django.conf import settings
 from django.contrib import admin
+from django.contrib.admin.views.main import ORDER_VAR
+from django.db.models import Case, IntegerField, When
 
+from . import search
 from .models import Group, Post
 
 
@@ -11,10 +15,25 @@ class PostAdmin(admin.ModelAdmin):
         'author',
         'group')
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return super().get_search_results(
+                request, queryset, search_term)
+        ids = search.search_ids(search_term, settings.SEARCH_ADMIN_LIMIT)
+        queryset = queryset.filter(pk__in=ids)
+        if ids and ORDER_VAR not in request.GET:
+            # best matches first, unless a column has been sorted on
+            queryset = queryset.order_by(Case(
+                *(When(pk=pk, then=rank) for rank, pk in enumerate(ids)),
+                output_field=IntegerField(),
+            ))
+        return queryset, False
+
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group)
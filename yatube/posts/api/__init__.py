@@ -0,0 +1,8 @@
+"""
+Read-only JSON API, version 1, mounted at ``/api/v1/``.
+
+It serves the querysets of the HTML views: lists are keyset paginated
+(``?cursor=``, ``?limit=``), every response answers conditional GETs from
+the feed cache generations, and feeds are cached whole like their pages.
+``?fields=id,text`` picks the fields of the objects returned.
+"""
@@ -0,0 +1,90 @@
+"""How models look in the API: field names and their getters."""
+from operator import attrgetter
+
+from django.core.files.storage import default_storage
+
+from ..counters import user_counters
+
+
+class ApiError(ValueError):
+    """A bad request parameter, answered with 400."""
+    pass
+
+
+class Resource:
+    def __init__(self, fields):
+        self.fields = fields
+
+    def fieldset(self, names=None):
+        """``(name, getter)`` pairs of ``fields=a,b``, all by default."""
+        if not names:
+            return list(self.fields.items())
+        fieldset = []
+        for name in names.split(','):
+            name = name.strip()
+            if name not in self.fields:
+                raise ApiError(f'Неизвестное поле: {name}')
+            fieldset.append((name, self.fields[name]))
+        return fieldset
+
+    def serialize(self, instance, fieldset):
+        return {name: getter(instance) for name, getter in fieldset}
+
+
+def _date(name):
+    getter = attrgetter(name)
+    return lambda instance: getter(instance).isoformat()
+
+
+def _counter(name):
+    return lambda user: getattr(user_counters(user), name)
+
+
+def _image_variants(post):
+    """The resized copies of the post's image, none until they are built."""
+    manifest = post.image_manifest
+    if manifest is None:
+        return []
+    return [
+        {'url': default_storage.url(name), 'width': width,
+         'type': variant['type']}
+        for variant in manifest['formats']
+        for name, width in variant['files']
+    ]
+
+
+POST = Resource({
+    'id': attrgetter('pk'),
+    'text': attrgetter('text'),
+    'pub_date': _date('pub_date'),
+    'author': attrgetter('author.username'),
+    'group': lambda post: post.group.slug if post.group_id else None,
+    # the stored image is the one ``uploads.ingest`` has already stripped
+    'image': lambda post: post.image.url if post.image else None,
+    'image_variants': _image_variants,
+    'comments_count': attrgetter('comments_count'),
+})
+
+COMMENT = Resource({
+    'id': attrgetter('pk'),
+    'post': attrgetter('post_id'),
+    'author': attrgetter('author.username'),
+    'text': attrgetter('text'),
+    'created': _date('created'),
+})
+
+GROUP = Resource({
+    'id': attrgetter('pk'),
+    'slug': attrgetter('slug'),
+    'title': attrgetter('title'),
+    'description': attrgetter('description'),
+    'posts_count': attrgetter('posts_count'),
+})
+
+PROFILE = Resource({
+    'username': attrgetter('username'),
+    'full_name': lambda user: user.get_full_name(),
+    'posts_count': _counter('posts_count'),
+    'followers_count': _counter('followers_count'),
+    'following_count': _counter('following_count'),
+})
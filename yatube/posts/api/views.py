@@ -0,0 +1,157 @@
+from functools import wraps
+from http import HTTPStatus
+
+from django.conf import settings
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+
+from ..feed_cache import POSTS, SITE, cache_feed, condition
+from ..models import Comment, Group, Post, User
+from ..timeline import follow_feed as user_follow_feed
+from ..utilites import CursorPaginator
+from .resources import COMMENT, GROUP, POST, PROFILE, ApiError
+
+FEED_ORDERING = ('-pub_date', '-id')
+
+
+def _json(data, status=HTTPStatus.OK):
+    return JsonResponse(data, status=status, json_dumps_params={
+        'ensure_ascii': False, 'separators': (',', ':'),
+    })
+
+
+def _error(status, detail):
+    return _json({'detail': detail}, status=status)
+
+
+def api_view(view):
+    """GET only; errors as JSON rather than HTML pages."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            response = _error(HTTPStatus.METHOD_NOT_ALLOWED,
+                              'Метод не поддерживается')
+            response['Allow'] = 'GET, HEAD'
+            return response
+        try:
+            return view(request, *args, **kwargs)
+        except Http404:
+            return _error(HTTPStatus.NOT_FOUND, 'Не найдено')
+        except ApiError as error:
+            return _error(HTTPStatus.BAD_REQUEST, str(error))
+    return wrapper
+
+
+def authenticated(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return _error(HTTPStatus.UNAUTHORIZED, 'Нужно войти')
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def _page_size(request):
+    limit = request.GET.get('limit')
+    if limit is None:
+        return settings.API_PAGE_SIZE
+    if not limit.isdigit() or not 0 < int(limit) <= settings.API_MAX_PAGE_SIZE:
+        raise ApiError(
+            f'limit должен быть от 1 до {settings.API_MAX_PAGE_SIZE}')
+    return int(limit)
+
+
+def _link(request, cursor):
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query['cursor'] = cursor
+    return f'{request.path}?{query.urlencode()}'
+
+
+def _list(request, queryset, resource, ordering=FEED_ORDERING):
+    fieldset = resource.fieldset(request.GET.get('fields'))
+    paginator = CursorPaginator(queryset, _page_size(request), ordering)
+    page = paginator.get_page(request.GET.get('cursor'))
+    return _json({
+        'results': [resource.serialize(obj, fieldset) for obj in page],
+        'next': _link(request, page.next_cursor),
+        'previous': _link(request, page.previous_cursor),
+    })
+
+
+def _detail(request, instance, resource):
+    fieldset = resource.fieldset(request.GET.get('fields'))
+    return _json(resource.serialize(instance, fieldset))
+
+
+@api_view
+@cache_feed(POSTS, SITE)
+def post_list(request):
+    return _list(request, Post.objects.for_page('feed'), POST)
+
+
+@api_view
+@condition(SITE, 'post:{post_id}')
+def post_detail(request, post_id):
+    post = get_object_or_404(Post.objects.for_page('feed'), pk=post_id)
+    return _detail(request, post, POST)
+
+
+@api_view
+@condition(SITE, 'post:{post_id}')
+def comment_list(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    comments = Comment.objects.filter(post_id=post_id).for_page('detail')
+    return _list(request, comments, COMMENT, ordering=('created', 'id'))
+
+
+@api_view
+@condition(SITE, 'post:{post_id}')
+def comment_detail(request, post_id, comment_id):
+    comment = get_object_or_404(
+        Comment.objects.for_page('detail'), pk=comment_id, post_id=post_id)
+    return _detail(request, comment, COMMENT)
+
+
+@api_view
+@condition(POSTS, SITE)
+def group_list(request):
+    return _list(request, Group.objects.all(), GROUP, ordering=('id',))
+
+
+@api_view
+@condition(SITE, 'group:{slug}')
+def group_detail(request, slug):
+    return _detail(request, get_object_or_404(Group, slug=slug), GROUP)
+
+
+@api_view
+@cache_feed(SITE, 'group:{slug}')
+def group_post_list(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return _list(request, group.posts.for_page('group'), POST)
+
+
+@api_view
+@condition(SITE, 'author:{username}')
+def profile_detail(request, username):
+    author = get_object_or_404(
+        User.objects.select_related('counters'), username=username)
+    return _detail(request, author, PROFILE)
+
+
+@api_view
+@cache_feed(SITE, 'author:{username}')
+def profile_post_list(request, username):
+    author = get_object_or_404(User, username=username)
+    return _list(request, author.posts.for_page('profile'), POST)
+
+
+@api_view
+@authenticated
+@cache_feed(POSTS, SITE, 'follow:{user}')
+def follow_feed(request):
+    return _list(request, user_follow_feed(request.user).for_page('feed'),
+                 POST)
@@ -0,0 +1,50 @@
+"""
+Performance harness for the posts app.
+
+``manage.py bench`` seeds a synthetic dataset (``dataset.seed``) into
+throwaway databases and drives every posts route through the WSGI stack
+(``runner.run``), writing latency percentiles, query counts and
+allocations per route to a JSON file that can be diffed between commits.
+"""
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.db import connections
+from django.test.utils import (override_settings, setup_databases,
+                               setup_test_environment, teardown_databases,
+                               teardown_test_environment)
+
+from .dataset import Dataset, DatasetConfig, seed
+from .runner import compare, routes, run
+
+__all__ = ['Dataset', 'DatasetConfig', 'compare', 'isolated_environment',
+           'routes', 'run', 'seed']
+
+
+@contextmanager
+def isolated_environment():
+    """
+    Test databases, a temporary ``MEDIA_ROOT`` and an empty cache.
+
+    SQLite test databases are put in files rather than in memory, so the
+    numbers include real I/O.
+    """
+    directory = tempfile.mkdtemp(prefix='yatube-bench-')
+    for connection in connections.all():
+        if connection.vendor == 'sqlite':
+            connection.settings_dict['TEST']['NAME'] = os.path.join(
+                directory, f'{connection.alias}.sqlite3')
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        with override_settings(MEDIA_ROOT=os.path.join(directory, 'media')):
+            cache.clear()
+            yield
+    finally:
+        cache.clear()
+        teardown_databases(old_config, verbosity=0)
+        teardown_test_environment()
+        shutil.rmtree(directory, ignore_errors=True)
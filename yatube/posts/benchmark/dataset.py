@@ -0,0 +1,144 @@
+"""
+Synthetic YaTube dataset with realistic skew.
+
+Authorship, group membership, followers and comments follow Zipf-like
+distributions: a handful of popular authors write most of the posts and
+gather most of the followers, the long tail barely posts at all. Rows are
+inserted with ``bulk_create``; counters, timelines and the search index
+are then rebuilt the same way their management commands do it.
+"""
+import random
+from dataclasses import asdict, dataclass
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+
+from .. import counters, search, timeline
+from ..models import Comment, Follow, Group, Post, User, UserCounters
+
+WORDS = (
+    'книга море город дорога утро вечер лес река дом сад окно поезд '
+    'письмо песня друг работа отпуск погода кофе музыка фильм собака '
+    'кошка горы снег солнце дождь ветер небо поле мост парк'
+).split()
+
+
+@dataclass
+class DatasetConfig:
+    users: int = 200
+    groups: int = 10
+    posts: int = 5000
+    follows_per_user: int = 10
+    comments: int = 10000
+    skew: float = 1.1
+    seed: int = 42
+    batch_size: int = 500
+
+
+@dataclass
+class Dataset:
+    """Handles on the seeded rows the benchmark routes need."""
+    config: DatasetConfig
+    reader: User
+    author: User
+    group: Group
+    post: Post
+
+    def describe(self):
+        return asdict(self.config)
+
+
+def _zipf_weights(count, skew):
+    return [1 / (rank + 1) ** skew for rank in range(count)]
+
+
+def _text(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def seed(config=None):
+    config = config or DatasetConfig()
+    rng = random.Random(config.seed)
+    password = make_password('benchmark')
+    User.objects.bulk_create(
+        (User(username=f'user{i}', first_name=f'Имя{i}',
+              last_name=f'Фамилия{i}', password=password)
+         for i in range(config.users)),
+        batch_size=config.batch_size,
+    )
+    # bulk_create does not return primary keys on every backend
+    users = list(User.objects.filter(
+        username__in=[f'user{i}' for i in range(config.users)]
+    ).order_by('pk'))
+    UserCounters.objects.bulk_create(
+        (UserCounters(user=user) for user in users),
+        batch_size=config.batch_size,
+    )
+    Group.objects.bulk_create(
+        (Group(title=f'Группа {i}', slug=f'group-{i}',
+               description=_text(rng, 12))
+         for i in range(config.groups)),
+        batch_size=config.batch_size,
+    )
+    groups = list(Group.objects.filter(
+        slug__in=[f'group-{i}' for i in range(config.groups)]
+    ).order_by('pk'))
+    user_weights = _zipf_weights(len(users), config.skew)
+    group_weights = _zipf_weights(len(groups), config.skew)
+
+    authors = rng.choices(users, user_weights, k=config.posts)
+    post_groups = rng.choices(groups + [None],
+                              group_weights + [sum(group_weights)],
+                              k=config.posts)
+    Post.objects.bulk_create(
+        (Post(author=author, group=group,
+              text=_text(rng, rng.randint(5, 60)))
+         for author, group in zip(authors, post_groups)),
+        batch_size=config.batch_size,
+    )
+    # bulk_create stamps every row with the same auto_now_add date
+    posts = list(Post.objects.order_by('pk').only('pk'))
+    now = timezone.now()
+    for age, post in enumerate(reversed(posts)):
+        post.pub_date = now - timedelta(minutes=17 * age)
+    Post.objects.bulk_update(posts, ['pub_date'],
+                             batch_size=config.batch_size)
+
+    follows = []
+    wanted = min(config.follows_per_user, len(users) - 1)
+    for user in users:
+        followed = set()
+        while len(followed) < wanted:
+            author = rng.choices(users, user_weights)[0]
+            if author.pk != user.pk:
+                followed.add(author.pk)
+        follows += [(user.pk, author_id) for author_id in sorted(followed)]
+    Follow.objects.bulk_create(
+        (Follow(user_id=user_id, author_id=author_id)
+         for user_id, author_id in follows),
+        batch_size=config.batch_size,
+    )
+
+    post_weights = _zipf_weights(len(posts), config.skew)
+    commented = rng.choices(posts, post_weights, k=config.comments)
+    Comment.objects.bulk_create(
+        (Comment(post_id=post.pk, author=rng.choice(users),
+                 text=_text(rng, rng.randint(3, 20)))
+         for post in commented),
+        batch_size=config.batch_size,
+    )
+
+    counters.rebuild(batch_size=config.batch_size)
+    timeline.rebuild()
+    search.rebuild(batch_size=config.batch_size)
+
+    return Dataset(
+        config=config,
+        # a long-tail reader following mostly popular authors
+        reader=users[-1],
+        author=users[0],
+        group=groups[0],
+        # the most commented post
+        post=Post.objects.get(pk=posts[0].pk),
+    )
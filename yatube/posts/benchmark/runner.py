@@ -0,0 +1,232 @@
+"""
+Drive every route of ``posts/urls.py`` and measure it.
+
+Requests go through ``django.test.Client``, i.e. the full WSGI handler
+with all middleware. Each route is requested ``iterations`` times after
+``warmup`` unmeasured requests; latency percentiles and the number of SQL
+queries come from that pass. Allocations are measured in a separate,
+shorter pass under ``tracemalloc``, which would otherwise skew latency.
+``session_floor`` counts the queries a logged-in request makes before any
+view runs, to load its session and its user.
+"""
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import django
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from .. import urls
+
+
+UNCACHED_AUTH = {
+    'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+    'AUTHENTICATION_BACKENDS': ['django.contrib.auth.backends.ModelBackend'],
+}
+CACHED_AUTH = {
+    'SESSION_ENGINE': 'django.contrib.sessions.backends.cached_db',
+    'AUTHENTICATION_BACKENDS': ['core.auth.CachedModelBackend'],
+}
+
+
+def _routes(dataset):
+    """``{url name: (method, path, data, client)}`` for every route."""
+    author = dataset.author.username
+    post_id = dataset.post.pk
+    return {
+        'index': ('get', reverse('posts:index'), None, 'anonymous'),
+        'index_feed': ('get', reverse('posts:index_feed'), None,
+                       'anonymous'),
+        'group_feed': ('get', reverse('posts:group_feed',
+                                      args=[dataset.group.slug]),
+                       None, 'anonymous'),
+        'author_feed': ('get', reverse('posts:author_feed', args=[author]),
+                        None, 'anonymous'),
+        'profile': ('get', reverse('posts:profile', args=[author]),
+                    None, 'anonymous'),
+        'post_detail': ('get', reverse('posts:post_detail',
+                                       args=[post_id]), None, 'anonymous'),
+        # keyset pages cost the same, the first one stands for them all
+        'post_comments': ('get', reverse('posts:post_comments',
+                                         args=[post_id]), None, 'anonymous'),
+        'group_posts': ('get', reverse('posts:group_posts',
+                                       args=[dataset.group.slug]),
+                        None, 'anonymous'),
+        'search': ('get', reverse('posts:search'), {'q': 'книги море'},
+                   'anonymous'),
+        'post_create': ('get', reverse('posts:post_create'), None, 'reader'),
+        'post_edit': ('get', reverse('posts:post_edit', args=[post_id]),
+                      None, 'author'),
+        'follow_index': ('get', reverse('posts:follow_index'), None, 'reader'),
+        'profile_follow': ('get', reverse('posts:profile_follow',
+                                          args=[author]), None, 'reader'),
+        'profile_unfollow': ('get', reverse('posts:profile_unfollow',
+                                            args=[author]), None, 'reader'),
+        'add_comment': ('post', reverse('posts:add_comment',
+                                        args=[post_id]),
+                        {'text': 'Комментарий из бенчмарка'}, 'reader'),
+    }
+
+
+def routes(dataset):
+    """Request specs, checked to cover every route of ``posts.urls``."""
+    specs = _routes(dataset)
+    missing = {
+        pattern.name for pattern in urls.urlpatterns
+    } - set(specs)
+    if missing:
+        raise LookupError(
+            'No benchmark request for routes: ' + ', '.join(sorted(missing)))
+    return specs
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(1, round(fraction * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _request(clients, spec):
+    method, path, data, client = spec
+    return getattr(clients[client], method)(path, data)
+
+
+def measure_route(clients, spec, iterations, warmup=3, cold=False,
+                  allocation_iterations=5):
+    for _ in range(warmup):
+        _request(clients, spec)
+    timings = []
+    queries = []
+    status = None
+    for _ in range(iterations):
+        if cold:
+            cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = _request(clients, spec)
+            timings.append((time.perf_counter() - started) * 1000)
+        queries.append(len(captured))
+        status = response.status_code
+
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _ in range(allocation_iterations):
+            if cold:
+                cache.clear()
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            _request(clients, spec)
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'method': spec[0].upper(),
+        'path': spec[1],
+        'status': status,
+        'iterations': iterations,
+        'p50_ms': round(percentile(timings, 0.50), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'p99_ms': round(percentile(timings, 0.99), 3),
+        'mean_ms': round(statistics.mean(timings), 3),
+        'queries': round(statistics.mean(queries), 2),
+        'max_queries': max(queries),
+        'alloc_peak_kb': round(statistics.median(peaks) / 1024, 1),
+    }
+
+
+def _resolve_user(request):
+    return HttpResponse(request.user.pk)
+
+
+def auth_queries(client):
+    """Queries of the session and auth middleware for ``client``."""
+    request = RequestFactory().get('/')
+    request.COOKIES.update(
+        {name: morsel.value for name, morsel in client.cookies.items()})
+    handler = SessionMiddleware(AuthenticationMiddleware(_resolve_user))
+    with CaptureQueriesContext(connection) as captured:
+        handler(request)
+    return len(captured)
+
+
+def session_floor(user):
+    """
+    ``uncached``: the stock ``db`` sessions and ``ModelBackend``; ``cold``
+    and ``warm``: ``cached_db`` sessions and ``core.auth`` with an empty
+    and a filled cache, as configured with a shared cache.
+    """
+    with override_settings(**UNCACHED_AUTH):
+        client = Client()
+        client.force_login(user)
+        uncached = auth_queries(client)
+    with override_settings(**CACHED_AUTH):
+        client = Client()
+        client.force_login(user)
+        cache.clear()
+        cold = auth_queries(client)
+        warm = auth_queries(client)
+    return {'uncached': uncached, 'cold': cold, 'warm': warm}
+
+
+def run(dataset, iterations=50, warmup=3, cold=False, only=None,
+        allocation_iterations=5):
+    """Benchmark the routes and return a JSON-serializable report."""
+    specs = routes(dataset)
+    if only:
+        specs = {name: spec for name, spec in specs.items() if name in only}
+    clients = {'anonymous': Client(), 'author': Client(), 'reader': Client()}
+    clients['author'].force_login(dataset.post.author)
+    clients['reader'].force_login(dataset.reader)
+    results = {
+        name: measure_route(clients, spec, iterations, warmup, cold,
+                            allocation_iterations)
+        for name, spec in specs.items()
+    }
+    floor = session_floor(dataset.reader)
+    return {
+        'meta': {
+            'commit': _git_commit(),
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'cold_cache': cold,
+            'dataset': dataset.describe(),
+        },
+        'routes': results,
+        'session_queries': floor,
+    }
+
+
+def compare(baseline, current, metric='p95_ms'):
+    """``{route: (before, after, after / before)}`` for a metric."""
+    changes = {}
+    for name, result in current['routes'].items():
+        before = baseline.get('routes', {}).get(name, {}).get(metric)
+        after = result[metric]
+        ratio = after / before if before else None
+        changes[name] = (before, after, ratio)
+    return changes
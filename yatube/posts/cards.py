@@ -0,0 +1,29 @@
+"""
+Rendered post cards, cached per post and card template version.
+
+The cached HTML depends on the post itself, its group and its author's
+name, so saving any of them drops the affected cards.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+CARD_TEMPLATE = 'posts/includes/post_card.html'
+
+
+def card_key(post_id):
+    return f'post_card:{settings.POST_CARD_VERSION}:{post_id}'
+
+
+def render_card(post):
+    key = card_key(post.pk)
+    html = cache.get(key)
+    if html is None:
+        html = render_to_string(CARD_TEMPLATE, {'post': post})
+        cache.set(key, html, settings.POST_CARD_TIMEOUT)
+    return mark_safe(html)
+
+
+def invalidate_cards(post_ids):
+    cache.delete_many([card_key(post_id) for post_id in post_ids])
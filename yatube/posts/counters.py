@@ -0,0 +1,118 @@
+"""
+Denormalized counters kept next to the rows they describe.
+
+Signals in ``posts.signals`` move the counters by one on every create and
+delete; ``rebuild`` recomputes them in bulk from the source tables. A user
+saved without signals (``bulk_create``) has no ``UserCounters`` row: it is
+made from the real numbers on the first increment, and until then
+``user_counters`` reads zeros.
+"""
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Group, Post, User, UserCounters
+
+
+def bump(model, pk, field, delta):
+    """Atomically move ``field`` of the row by ``delta``, never below 0."""
+    if pk is None:
+        return
+    queryset = model.objects.filter(pk=pk)
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    updated = queryset.update(**{field: F(field) + delta})
+    # a decrement can wait: the row is counted afresh when it is made
+    if not updated and delta > 0 and model is UserCounters:
+        _create_user_counters(pk)
+
+
+def _create_user_counters(user_id):
+    if UserCounters.objects.filter(pk=user_id).exists():
+        return
+    UserCounters.objects.bulk_create([UserCounters(user_id=user_id, **{
+        field: source.objects.filter(**{fk: user_id}).count()
+        for field, (source, fk) in COUNTERS[UserCounters].items()
+    })], ignore_conflicts=True)
+
+
+def user_counters(user):
+    """The counters of ``user``, zeros while the row is missing."""
+    try:
+        return user.counters
+    except UserCounters.DoesNotExist:
+        return UserCounters(user_id=user.pk)
+
+
+def _count(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total'),
+            output_field=IntegerField()
+        ),
+        0
+    )
+
+
+# model -> {counter field: (source model, foreign key on the source)}
+COUNTERS = {
+    UserCounters: {
+        'posts_count': (Post, 'author'),
+        'followers_count': (Follow, 'author'),
+        'following_count': (Follow, 'user'),
+    },
+    Group: {
+        'posts_count': (Post, 'group'),
+    },
+    Post: {
+        'comments_count': (Comment, 'post'),
+    },
+}
+
+
+def rebuild(check_only=False, batch_size=1000):
+    """
+    Compare every counter with the real number of rows and fix the wrong
+    ones, unless ``check_only``. Returns ``{model: number of bad rows}``.
+    """
+    missing = User.objects.filter(counters__isnull=True).values_list(
+        'pk', flat=True)
+    report = {model: 0 for model in COUNTERS}
+    report[UserCounters] = missing.count()
+    if report[UserCounters] and not check_only:
+        # Django 2.2 does not cap an explicit batch size by the backend
+        # limits, so let it pick one
+        UserCounters.objects.bulk_create(
+            (UserCounters(user_id=pk) for pk in missing.iterator()),
+            ignore_conflicts=True
+        )
+    for model, counters in COUNTERS.items():
+        actual = {
+            f'actual_{field}': _count(source, fk)
+            for field, (source, fk) in counters.items()
+        }
+        broken = []
+        rows = model.objects.annotate(**actual).order_by('pk')
+        for row in rows.iterator(chunk_size=batch_size):
+            stale = False
+            for field in counters:
+                value = getattr(row, f'actual_{field}')
+                if getattr(row, field) != value:
+                    setattr(row, field, value)
+                    stale = True
+            if not stale:
+                continue
+            report[model] += 1
+            if check_only:
+                # only counted, so that a check keeps no rows either
+                continue
+            broken.append(row)
+            if len(broken) >= batch_size:
+                model.objects.bulk_update(broken, list(counters))
+                broken = []
+        if broken:
+            model.objects.bulk_update(broken, list(counters))
+    return report
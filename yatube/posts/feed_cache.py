@@ -0,0 +1,255 @@
+"""
+Long-lived cache of rendered feed pages.
+
+Every page depends on a few *scopes* (``posts``, ``group:<slug>``,
+``author:<username>``...). Each scope has a generation number in the
+cache which signals bump whenever the underlying rows change; the
+generations are part of the page key, so a bump makes stale pages
+unreachable at once and no TTL is needed for correctness.
+
+Recomputation is protected against stampedes twice: when a page is
+missing only the holder of a short lock renders it while the other
+requests wait for the result, and live entries are refreshed a little
+before they expire with probabilistic early expiration (XFetch).
+
+Pages are rendered from the primary database, cached or not: a page built
+from a lagging replica right after a bump would stay stale under the new
+generation, or be answered with its validators. For
+the same reason a bump made inside a transaction is made again once it
+commits: a page rendered in between, from the rows not yet committed,
+would otherwise be kept under the new generation.
+
+A generation is the time of the last change of its scope, so the
+generations of a page also make its ``ETag`` and ``Last-Modified``:
+conditional GETs are answered with 304 from the generations alone, before
+the view renders anything or runs its queries. ``condition`` does only
+that, for pages not worth caching whole.
+"""
+import hashlib
+import math
+import random
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from core.db.router import use_primary
+
+from .models import Group
+
+# scopes bumped on rare site-wide changes: group edits, author renames
+SITE = 'site'
+POSTS = 'posts'
+
+
+def _generation_key(scope):
+    return f'feed_gen:{scope}'
+
+
+def _new_generation():
+    # never repeats a generation even if the counter was evicted
+    return time.time_ns()
+
+
+def generations(scopes):
+    keys = [_generation_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            generation = _new_generation()
+            if not cache.add(key, generation,
+                             settings.FEED_GENERATION_TIMEOUT):
+                # another request started the scope first
+                generation = cache.get(key) or generation
+            found[key] = generation
+    return [found[key] for key in keys]
+
+
+def _set_generations(scopes):
+    # a fresh timestamp rather than incr(): it is the Last-Modified of the
+    # pages of the scope
+    generation = _new_generation()
+    cache.set_many(
+        {_generation_key(scope): generation for scope in scopes},
+        settings.FEED_GENERATION_TIMEOUT)
+
+
+def bump(*scopes):
+    _set_generations(scopes)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _set_generations(scopes))
+
+
+def bump_post(post, group_ids=None):
+    """Bump the scopes of every feed showing ``post``."""
+    if group_ids is None:
+        group_ids = {post.group_id}
+    slugs = Group.objects.filter(
+        pk__in=[pk for pk in group_ids if pk is not None]
+    ).values_list('slug', flat=True)
+    bump(
+        POSTS,
+        f'post:{post.pk}',
+        f'author:{post.author.username}',
+        # the post count on the pages of the author's posts
+        f'posts_of:{post.author_id}',
+        *(f'group:{slug}' for slug in slugs)
+    )
+
+
+def _validators(request, view_name, scopes):
+    """``(etag, last_modified)`` of a page of the view."""
+    found = generations(scopes)
+    tag = '.'.join(str(generation) for generation in found)
+    page = f'{view_name}:{request.user.pk or 0}:{request.get_full_path()}'
+    etag = hashlib.md5(f'{page}:{tag}'.encode()).hexdigest()
+    return quote_etag(etag), max(found) // 10 ** 9
+
+
+def _conditional(request, view_name, names):
+    """
+    ``(etag, last_modified, response)``, the response being a 304 when
+    the client's copy is current.
+    """
+    etag, last_modified = _validators(request, view_name, names)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        _add_validators(request, response, etag, last_modified)
+    return etag, last_modified, response
+
+
+def _add_validators(request, response, etag, last_modified):
+    if response.status_code not in (200, 304):
+        return response
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    # revalidate every time, keep personal pages out of shared caches
+    patch_cache_control(response, no_cache=True,
+                        private=request.user.is_authenticated)
+    return response
+
+
+def _expired_early(entry):
+    """XFetch: the longer a page takes to build, the earlier it refreshes."""
+    jitter = -entry['delta'] * settings.FEED_CACHE_BETA * math.log(
+        random.random() or 1e-12)
+    return time.time() + jitter >= entry['expires']
+
+
+def _render(view, request, args, kwargs, key):
+    started = time.monotonic()
+    with use_primary():
+        response = view(request, *args, **kwargs)
+    if response.status_code != 200 or response.streaming:
+        return response
+    timeout = settings.FEED_CACHE_TIMEOUT
+    cache.set(key, {
+        'content': response.content,
+        'content_type': response['Content-Type'],
+        'delta': time.monotonic() - started,
+        'expires': time.time() + timeout,
+    }, timeout)
+    return response
+
+
+def _respond(entry):
+    return HttpResponse(entry['content'], content_type=entry['content_type'])
+
+
+def _wait_for(key):
+    deadline = time.monotonic() + settings.FEED_CACHE_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+    return None
+
+
+def _scope_names(scopes, request, values):
+    return [scope.format(user=request.user.pk, **values) for scope in scopes]
+
+
+def _cached(view, request, args, kwargs, key):
+    lock = key + ':lock'
+    entry = cache.get(key)
+    if entry is not None and not _expired_early(entry):
+        return _respond(entry)
+    locked = cache.add(lock, 1, settings.FEED_CACHE_LOCK_WAIT)
+    if not locked:
+        # somebody else is rendering this page right now
+        entry = entry or _wait_for(key)
+        if entry is not None:
+            return _respond(entry)
+    try:
+        return _render(view, request, args, kwargs, key)
+    finally:
+        if locked:
+            cache.delete(lock)
+
+
+def cache_feed(*scopes):
+    """
+    Cache GET responses of a feed view under the generations of ``scopes``.
+
+    Scopes are format strings filled with the view kwargs and ``user``
+    (the id of the current user), e.g. ``'group:{slug}'``.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return view(request, *args, **kwargs)
+            names = _scope_names(scopes, request, kwargs)
+            etag, last_modified, response = _conditional(
+                request, view.__name__, names)
+            if response is not None:
+                return response
+            key = f'feed:{view.__name__}:{etag}'
+            response = _cached(view, request, args, kwargs, key)
+            return _add_validators(request, response, etag, last_modified)
+        return wrapper
+    return decorator
+
+
+def _answer(view, request, args, kwargs, scopes, lookup):
+    values = dict(kwargs)
+    if lookup is not None:
+        extra = lookup(**kwargs)
+        if extra is None:
+            return view(request, *args, **kwargs)
+        values.update(extra)
+    names = _scope_names(scopes, request, values)
+    etag, last_modified, response = _conditional(
+        request, view.__name__, names)
+    if response is not None:
+        return response
+    response = view(request, *args, **kwargs)
+    return _add_validators(request, response, etag, last_modified)
+
+
+def condition(*scopes, lookup=None):
+    """
+    Answer conditional GETs of a view from the generations of ``scopes``.
+
+    ``lookup(**kwargs)`` may give more values for the scopes, e.g. the
+    author of a post; when it returns ``None`` the view runs as usual.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return view(request, *args, **kwargs)
+            # the validators are read before the body, which must be at
+            # least as new as they are: a lagging replica would not promise
+            # that, nor find the object a lookup is after
+            with use_primary():
+                return _answer(view, request, args, kwargs, scopes, lookup)
+        return wrapper
+    return decorator
@@ -0,0 +1,96 @@
+"""Atom feeds of the site, of a group and of an author."""
+from django.contrib.syndication.views import Feed
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.text import Truncator
+
+from . import syndication
+from .feed_cache import POSTS, SITE, cache_feed
+from .models import Group, Post, User
+
+
+class PostFeed(Feed):
+    """Feed of ``syndication`` entries."""
+    feed_type = Atom1Feed
+
+    def item_title(self, item):
+        return Truncator(item['text']).chars(60)
+
+    def item_description(self, item):
+        return item['text']
+
+    def item_link(self, item):
+        return reverse('posts:post_detail', args=[item['id']])
+
+    def item_pubdate(self, item):
+        return item['pub_date']
+
+    def item_author_name(self, item):
+        return item['author_name']
+
+    def item_author_link(self, item):
+        return reverse('posts:profile', args=[item['author']])
+
+    def item_categories(self, item):
+        return [item['group']] if item['group'] else []
+
+
+class IndexFeed(PostFeed):
+    title = 'Последние обновления на сайте'
+
+    def link(self):
+        return reverse('posts:index')
+
+    def items(self):
+        return syndication.entries(syndication.index_scopes(),
+                                   Post.objects.for_page('feed'))
+
+
+class GroupFeed(PostFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, group):
+        return f'Записи группы {group.title}'
+
+    def subtitle(self, group):
+        return group.description
+
+    def link(self, group):
+        return reverse('posts:group_posts', args=[group.slug])
+
+    def items(self, group):
+        return syndication.entries(syndication.group_scopes(group.slug),
+                                   group.posts.for_page('group'))
+
+
+class AuthorFeed(PostFeed):
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, author):
+        return f'Посты пользователя {author.get_full_name() or author}'
+
+    def link(self, author):
+        return reverse('posts:profile', args=[author.username])
+
+    def items(self, author):
+        return syndication.entries(
+            syndication.author_scopes(author.username),
+            author.posts.for_page('profile'))
+
+
+@cache_feed(POSTS, SITE)
+def index_feed(request):
+    return IndexFeed()(request)
+
+
+@cache_feed(SITE, 'group:{slug}')
+def group_feed(request, slug):
+    return GroupFeed()(request, slug=slug)
+
+
+@cache_feed(SITE, 'author:{username}')
+def author_feed(request, username):
+    return AuthorFeed()(request, username=username)
@@ -1,6 +1,7 @@
 from django import forms
 
 from .models import Comment, Post
+from .uploads import ingest
 
 
 class PostForm(forms.ModelForm):
@@ -8,6 +9,25 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ('text', 'group', 'image')
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.upload_error = None
+        image = self.files.get('image')
+        if getattr(image, 'upload_error', None):
+            # don't let ImageField try to decode what the upload
+            # handler has already turned down
+            self.upload_error = image.upload_error
+            self.files = self.files.copy()
+            del self.files['image']
+
+    def clean_image(self):
+        if self.upload_error:
+            raise forms.ValidationError(self.upload_error)
+        image = self.cleaned_data['image']
+        if getattr(image, 'image_info', None):
+            image = ingest(image)
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
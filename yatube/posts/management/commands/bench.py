@@ -0,0 +1,92 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.benchmark import (DatasetConfig, compare, isolated_environment,
+                             run, seed)
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный тест: заполняет временную базу синтетическими '
+            'данными и замеряет все адреса приложения posts')
+
+    def add_arguments(self, parser):
+        defaults = DatasetConfig()
+        for field in ('users', 'groups', 'posts', 'follows_per_user',
+                      'comments', 'seed'):
+            parser.add_argument(
+                '--' + field.replace('_', '-'),
+                type=int,
+                default=getattr(defaults, field),
+                help=f'Набор данных: {field} (по умолчанию '
+                     f'{getattr(defaults, field)})',
+            )
+        parser.add_argument(
+            '--skew',
+            type=float,
+            default=defaults.skew,
+            help='Показатель распределения Ципфа для популярности',
+        )
+        parser.add_argument('--iterations', type=int, default=50,
+                            help='Замеряемых запросов на адрес')
+        parser.add_argument('--warmup', type=int, default=3,
+                            help='Незамеряемых запросов перед замером')
+        parser.add_argument('--cold', action='store_true',
+                            help='Очищать кэш перед каждым запросом')
+        parser.add_argument('--routes',
+                            help='Через запятую: замерить только эти адреса')
+        parser.add_argument('--output', default='bench.json',
+                            help='Куда записать результаты в JSON')
+        parser.add_argument('--compare', metavar='BASELINE',
+                            help='JSON прошлого запуска для сравнения p95')
+
+    def handle(self, *args, **options):
+        config = DatasetConfig(
+            users=options['users'],
+            groups=options['groups'],
+            posts=options['posts'],
+            follows_per_user=options['follows_per_user'],
+            comments=options['comments'],
+            skew=options['skew'],
+            seed=options['seed'],
+        )
+        only = options['routes'] and options['routes'].split(',')
+        with isolated_environment():
+            self.stdout.write('Заполняю базу...')
+            dataset = seed(config)
+            self.stdout.write('Замеряю адреса...')
+            try:
+                report = run(dataset, options['iterations'],
+                             options['warmup'], options['cold'], only)
+            except LookupError as error:
+                raise CommandError(error)
+        with open(options['output'], 'w') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+
+        self.stdout.write(
+            f'{"адрес":<18}{"p50":>9}{"p95":>9}{"p99":>9}'
+            f'{"запросы":>9}{"КБ":>9}'
+        )
+        for name, result in report['routes'].items():
+            self.stdout.write(
+                f'{name:<18}{result["p50_ms"]:>9.2f}{result["p95_ms"]:>9.2f}'
+                f'{result["p99_ms"]:>9.2f}{result["queries"]:>9}'
+                f'{result["alloc_peak_kb"]:>9}'
+            )
+        floor = report['session_queries']
+        self.stdout.write(
+            'Запросов на сессию и пользователя: без кэша '
+            f'{floor["uncached"]}, холодный кэш {floor["cold"]}, '
+            f'тёплый {floor["warm"]}'
+        )
+        if options['compare']:
+            with open(options['compare']) as file:
+                baseline = json.load(file)
+            self.stdout.write('p95, мс: было -> стало')
+            for name, (before, after, ratio) in compare(
+                    baseline, report).items():
+                change = f'{ratio:.2f}x' if ratio else 'новый'
+                self.stdout.write(f'{name:<18}{before} -> {after} ({change})')
+        self.stdout.write(self.style.SUCCESS(
+            f'Результаты записаны в {options["output"]}'
+        ))
@@ -0,0 +1,58 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = ('Выгружает пользователей, группы, посты, комментарии и '
+            'подписки в NDJSON или CSV, не держа их в памяти')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output',
+            help='Файл NDJSON ("-" - стандартный вывод) или папка для CSV',
+        )
+        parser.add_argument(
+            '--format',
+            choices=transfer.FORMATS,
+            default='ndjson',
+            help='Формат выгрузки',
+        )
+        parser.add_argument(
+            '--models',
+            nargs='+',
+            choices=list(transfer.MODELS),
+            help='Выгрузить только эти модели',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Сколько строк читать из базы за один запрос',
+        )
+
+    def handle(self, *args, **options):
+        output = options['output']
+        to_stdout = output == '-'
+        # при выводе в stdout прогресс не должен попадать в данные
+        progress = transfer.Progress(
+            self.stderr.write if to_stdout else self.stdout.write)
+        arguments = {
+            'names': options['models'],
+            'batch_size': options['batch_size'],
+            'progress': progress,
+        }
+        if options['format'] == 'csv':
+            report = transfer.export_csv(output, **arguments)
+        elif to_stdout:
+            report = transfer.export_ndjson(sys.stdout, **arguments)
+        else:
+            with open(output, 'w', encoding='utf-8') as file:
+                report = transfer.export_ndjson(file, **arguments)
+        progress.flush()
+        total = sum(report.values())
+        (self.stderr if to_stdout else self.stdout).write(self.style.SUCCESS(
+            f'Выгружено записей: {total}'
+        ))
@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.media import collect
+
+
+class Command(BaseCommand):
+    help = ('Удаляет картинки, на которые не ссылается ни один пост, '
+            'вместе с их миниатюрами')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только посчитать файлы, ничего не удаляя',
+        )
+        parser.add_argument(
+            '--grace',
+            type=int,
+            default=settings.MEDIA_GC_GRACE,
+            help='Не трогать файлы моложе стольких секунд',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Сколько записей читать из базы за один запрос',
+        )
+
+    def handle(self, *args, **options):
+        report = collect(
+            grace=options['grace'],
+            dry_run=options['dry_run'],
+            batch_size=options['batch_size']
+        )
+        for kind, total in report.items():
+            self.stdout.write(f'{kind}: {total}')
+        total = sum(report.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Можно удалить файлов: {total}' if options['dry_run']
+            else f'Удалено файлов: {total}'
+        ))
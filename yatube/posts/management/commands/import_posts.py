@@ -0,0 +1,72 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = ('Загружает пользователей, группы, посты, комментарии и '
+            'подписки из NDJSON или CSV, выгруженных export_posts')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'input',
+            help='Файл NDJSON ("-" - стандартный ввод) или папка с CSV',
+        )
+        parser.add_argument(
+            '--format',
+            choices=transfer.FORMATS,
+            default='ndjson',
+            help='Формат загружаемых данных',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Сколько строк вставлять одним запросом',
+        )
+        parser.add_argument(
+            '--commit-every',
+            type=int,
+            default=50000,
+            help='Сколько записей загружать в одной транзакции',
+        )
+        parser.add_argument(
+            '--ignore-conflicts',
+            action='store_true',
+            help='Пропускать записи, которые уже есть в базе',
+        )
+
+    def _load(self, records, options, progress):
+        return transfer.load(
+            records,
+            batch_size=options['batch_size'],
+            commit_every=options['commit_every'],
+            progress=progress,
+            ignore_conflicts=options['ignore_conflicts'],
+        )
+
+    def handle(self, *args, **options):
+        source = options['input']
+        progress = transfer.Progress(self.stdout.write)
+        try:
+            if options['format'] == 'csv':
+                report = self._load(
+                    transfer.read_csv(source), options, progress)
+            elif source == '-':
+                report = self._load(
+                    transfer.read_ndjson(sys.stdin), options, progress)
+            else:
+                with open(source, encoding='utf-8') as file:
+                    report = self._load(
+                        transfer.read_ndjson(file), options, progress)
+        except (transfer.TransferError, IntegrityError, OSError) as error:
+            raise CommandError(error)
+        progress.flush()
+        self.stdout.write('Пересчет счетчиков, лент и поискового индекса')
+        transfer.finish(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено записей: {sum(report.values())}'
+        ))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import pregenerate
+
+
+class Command(BaseCommand):
+    help = 'Готовит миниатюры картинок всех постов'
+
+    def handle(self, *args, **options):
+        total = 0
+        post_ids = (Post.objects.exclude(image='')
+                    .values_list('pk', flat=True))
+        for post_id in post_ids.iterator():
+            pregenerate(post_id)
+            total += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Готовы миниатюры постов: {total}'
+        ))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.counters import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики постов, комментариев и подписок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить счетчики, ничего не исправляя',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько строк обновлять за один запрос',
+        )
+
+    def handle(self, *args, **options):
+        report = rebuild(
+            check_only=options['check'],
+            batch_size=options['batch_size']
+        )
+        for model, broken in report.items():
+            self.stdout.write(f'{model._meta.label}: {broken}')
+        total = sum(report.values())
+        if options['check'] and total:
+            raise CommandError(f'Неверных счетчиков: {total}')
+        self.stdout.write(self.style.SUCCESS(
+            'Счетчики в порядке' if not total
+            else f'Исправлено счетчиков: {total}'
+        ))
@@ -0,0 +1,174 @@
+"""
+Reference counting and garbage collection of post media.
+
+Post signals ``acquire`` the image a post starts pointing to and
+``release`` the one it stops pointing to, so identical uploads shared by
+several posts live as long as any of them. ``collect`` removes, in bulk,
+images nobody references any more together with their thumbnails and
+responsive variants, plus files no post accounts for at all (thumbnails
+of old geometries, uploads left over from before the counting started).
+Files younger than ``grace`` seconds are never touched: they may belong to
+an upload whose post has not been saved yet.
+"""
+import os
+import posixpath
+import time
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from sorl.thumbnail import default as sorl
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+
+from .counters import bump
+from .models import MediaFile, Post
+from .thumbnails import thumbnail_name
+
+UPLOAD_DIR = Post._meta.get_field('image').upload_to.rstrip('/')
+VARIANTS_DIR = 'variants'
+
+
+def image_storage():
+    return Post._meta.get_field('image').storage
+
+
+def acquire(name):
+    if name:
+        MediaFile.objects.get_or_create(name=name)
+        bump(MediaFile, name, 'refcount', 1)
+
+
+def release(name):
+    if name:
+        bump(MediaFile, name, 'refcount', -1)
+
+
+def recount():
+    """Set every reference count to the number of posts using the file."""
+    used = Post.objects.exclude(image='').order_by().values_list(
+        'image', flat=True).distinct()
+    MediaFile.objects.bulk_create(
+        (MediaFile(name=name) for name in used.iterator()),
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+    MediaFile.objects.update(refcount=Coalesce(
+        Subquery(
+            Post.objects.filter(image=OuterRef('name')).order_by()
+            .values('image').annotate(total=Count('pk')).values('total'),
+            output_field=IntegerField(),
+        ),
+        0,
+    ))
+
+
+def _walk(storage, path):
+    """Every file name under ``path`` in ``storage``."""
+    if not storage.exists(path):
+        return
+    directories, files = storage.listdir(path)
+    for name in files:
+        yield posixpath.join(path, name)
+    for directory in directories:
+        yield from _walk(storage, posixpath.join(path, directory))
+
+
+def _is_old(storage, name, grace):
+    try:
+        modified = os.path.getmtime(storage.path(name))
+    except FileNotFoundError:
+        return False
+    return modified <= time.time() - grace
+
+
+def _variants_dir(image_name):
+    stem = os.path.splitext(os.path.basename(image_name))[0]
+    return posixpath.join(VARIANTS_DIR, stem)
+
+
+def _live_images():
+    return set(
+        Post.objects.exclude(image='').order_by()
+        .values_list('image', flat=True).distinct()
+    )
+
+
+def _delete_image(name, dry_run):
+    """Remove an image with its thumbnails and variants."""
+    storage = image_storage()
+    if dry_run:
+        return
+    # the kvstore knows the thumbnails of every geometry ever rendered
+    sorl.backend.delete(ImageFile(name, storage), delete_file=True)
+    for variant in _walk(default_storage, _variants_dir(name)):
+        default_storage.delete(variant)
+
+
+def _collect_dead(grace, dry_run, batch_size):
+    storage = image_storage()
+    deleted = 0
+    dead = (MediaFile.objects.filter(refcount=0)
+            .values_list('name', flat=True))
+    for name in dead.iterator(batch_size):
+        if storage.exists(name) and not _is_old(storage, name, grace):
+            continue
+        # the row may have been acquired again since it was read
+        if not dry_run and not MediaFile.objects.filter(
+                name=name, refcount=0).delete()[0]:
+            continue
+        _delete_image(name, dry_run)
+        deleted += 1
+    return deleted
+
+
+def _collect_orphans(live, grace, dry_run):
+    storage = image_storage()
+    deleted = 0
+    for name in _walk(storage, UPLOAD_DIR):
+        if name in live or not _is_old(storage, name, grace):
+            continue
+        if not MediaFile.objects.filter(name=name,
+                                        refcount__gt=0).exists():
+            _delete_image(name, dry_run)
+            deleted += 1
+    return deleted
+
+
+def _sweep(path, keep, grace, dry_run):
+    """Delete old files under ``path`` for which ``keep`` is false."""
+    deleted = 0
+    for name in _walk(default_storage, path):
+        if keep(name) or not _is_old(default_storage, name, grace):
+            continue
+        if not dry_run:
+            default_storage.delete(name)
+        deleted += 1
+    return deleted
+
+
+def collect(grace=None, dry_run=False, batch_size=500):
+    """
+    Delete unreferenced media. Returns ``{kind: number of files}`` for
+    ``images``, ``orphans``, ``thumbnails`` and ``variants``.
+    """
+    if grace is None:
+        grace = settings.MEDIA_GC_GRACE
+    report = {'images': _collect_dead(grace, dry_run, batch_size)}
+    live = _live_images()
+    report['orphans'] = _collect_orphans(live, grace, dry_run)
+    thumbnails = {
+        thumbnail_name(ImageFile(name, image_storage()), alias)
+        for name in live for alias in settings.THUMBNAIL_GEOMETRIES
+    }
+    report['thumbnails'] = _sweep(
+        sorl_settings.THUMBNAIL_PREFIX.rstrip('/'),
+        thumbnails.__contains__, grace, dry_run
+    )
+    variants = {_variants_dir(name) for name in live}
+    report['variants'] = _sweep(
+        VARIANTS_DIR,
+        lambda name: posixpath.dirname(name) in variants, grace, dry_run
+    )
+    return report
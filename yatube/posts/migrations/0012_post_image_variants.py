@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-17 00:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_variants',
+            field=models.TextField(blank=True, editable=False, help_text='JSON-описание уменьшенных копий картинки', verbose_name='Варианты картинки'),
+        ),
+    ]
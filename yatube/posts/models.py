@@ -1,21 +1,91 @@
+import json
+
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
+
+from .storage import ContentAddressedStorage
 
 User = get_user_model()
 
 
+class AtomicSaveMixin:
+    """ Runs save() and its post_save counter updates in one transaction """
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+
+class RelatedProfileQuerySet(models.QuerySet):
+    """ QuerySet that joins the relations a given page renders """
+    related = {}
+
+    def for_page(self, page):
+        return self.select_related(*self.related[page])
+
+
+class PostQuerySet(RelatedProfileQuerySet):
+    related = {
+        'feed': ('author', 'group'),
+        # author.posts and group.posts already know their author/group
+        'profile': ('group',),
+        'group': ('author',),
+        'detail': ('author__counters', 'group'),
+    }
+
+
+class CommentQuerySet(RelatedProfileQuerySet):
+    related = {
+        'detail': ('author',),
+    }
+
+
+class UserCounters(models.Model):
+    """ Class for keeping denormalized user counters """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='counters',
+        verbose_name='Пользователь'
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число постов'
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число подписчиков'
+    )
+    following_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число подписок'
+    )
+
+    class Meta:
+        indexes = [
+            # the few popular authors the follow feed merges in on read
+            models.Index(fields=['followers_count'],
+                         name='counters_followers_idx'),
+        ]
+
+
 class Group(models.Model):
     """ Class for adding groups on site """
     title = models.CharField(max_length=200, verbose_name='Название группы')
     slug = models.SlugField(unique=True, verbose_name='Вэб адрес')
     description = models.TextField(max_length=600,
                                    verbose_name='Описание группы')
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число постов'
+    )
 
     def __str__(self):
         return self.title
 
 
-class Follow(models.Model):
+class Follow(AtomicSaveMixin, models.Model):
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -39,9 +109,14 @@ class Follow(models.Model):
                 check=~models.Q(user=models.F('author')),
                 name='non_self_follow')
         ]
+        indexes = [
+            # followers of an author, without touching the table
+            models.Index(fields=['author', 'user'],
+                         name='follow_author_user_idx'),
+        ]
 
 
-class Post(models.Model):
+class Post(AtomicSaveMixin, models.Model):
     """ Class for making posts with given attributes"""
     text = models.TextField(
         verbose_name="Текст поста",
@@ -69,19 +144,57 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True
     )
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число комментариев'
+    )
+    image_variants = models.TextField(
+        blank=True,
+        editable=False,
+        verbose_name='Варианты картинки',
+        help_text='JSON-описание уменьшенных копий картинки'
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-pub_date']
+        # feeds read the newest posts first, the keyset paginator breaks
+        # ties by id
+        indexes = [
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_author_date_idx'),
+            models.Index(fields=['group', '-pub_date', '-id'],
+                         name='post_group_date_idx'),
+            models.Index(fields=['-pub_date', '-id'],
+                         name='post_date_idx'),
+        ]
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
     def __str__(self):
         return self.text[:15]
 
+    @property
+    def image_manifest(self):
+        """Variants of the current image, ``None`` until they are built."""
+        if not self.image or not self.image_variants:
+            return None
+        try:
+            manifest = json.loads(self.image_variants)
+        except ValueError:
+            return None
+        if (not isinstance(manifest, dict)
+                or manifest.get('source') != self.image.name):
+            return None
+        return manifest
 
-class Comment(models.Model):
+
+class Comment(AtomicSaveMixin, models.Model):
     """ Class for making comments for posts with given attributes"""
     post = models.ForeignKey(
         Post,
@@ -106,3 +219,78 @@ class Comment(models.Model):
         auto_now_add=True,
         verbose_name='Дата публикации'
     )
+
+    objects = CommentQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['created']
+        indexes = [
+            models.Index(fields=['post', 'created'],
+                         name='comment_post_created_idx'),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """ Materialized follow feed: one row per follower and post """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Подписчик'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                name='unique_timeline_entry',
+                fields=['user', 'post'],
+            ),
+        ]
+
+
+class SearchTerm(models.Model):
+    """ Posting of the portable inverted search index """
+    TERM_LENGTH = 64
+
+    term = models.CharField(max_length=TERM_LENGTH, verbose_name='Основа')
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='search_terms',
+        verbose_name='Пост'
+    )
+    frequency = models.PositiveIntegerField(verbose_name='Частота')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                name='unique_search_term',
+                fields=['term', 'post'],
+            ),
+        ]
+
+
+class MediaFile(models.Model):
+    """ Reference count of a content-addressed media file """
+    name = models.CharField(
+        max_length=255,
+        primary_key=True,
+        verbose_name='Файл'
+    )
+    refcount = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число ссылок'
+    )
+
+    class Meta:
+        verbose_name = 'Медиафайл'
+        verbose_name_plural = 'Медиафайлы'
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,91 @@
+"""
+Full-text search over posts.
+
+The backend is chosen by ``settings.SEARCH_BACKEND``: ``'fts5'``,
+``'inverted'`` or ``'auto'`` (FTS5 when its table exists, the portable
+inverted index otherwise). The index is kept up to date by the post
+signals; ``manage.py rebuild_search_index`` refills it from scratch.
+"""
+from urllib.parse import urlencode
+
+from django.conf import settings
+
+from ..models import Post
+from ..utilites import (CursorPage, InvalidCursor, decode_position,
+                        encode_position)
+from .backends import Fts5Backend, InvertedIndexBackend, tokenize
+
+BACKENDS = {
+    backend.name: backend for backend in (Fts5Backend, InvertedIndexBackend)
+}
+
+__all__ = ['get_backend', 'index_post', 'rebuild', 'remove_post',
+           'search_ids', 'search_posts', 'tokenize']
+
+
+def get_backend():
+    name = settings.SEARCH_BACKEND
+    if name == 'auto':
+        name = 'fts5' if Fts5Backend.available() else 'inverted'
+    return BACKENDS[name]()
+
+
+def index_post(post):
+    get_backend().index(post)
+
+
+def remove_post(post_id):
+    get_backend().remove(post_id)
+
+
+def rebuild(batch_size=1000):
+    """Refill the index of the current backend, return the post count."""
+    backend = get_backend()
+    backend.clear()
+    total = 0
+    for post in Post.objects.only('pk', 'text').iterator(batch_size):
+        backend.index(post)
+        total += 1
+    return total
+
+
+def search_ids(query, limit):
+    """Ids of the ``limit`` best matching posts, best first."""
+    return [
+        post_id for post_id, score in get_backend().search(query, limit=limit)
+    ]
+
+
+def search_posts(query, cursor=None, per_page=None):
+    """
+    One page of posts matching ``query``, best matches first.
+
+    Pages follow each other by the ``(score, id)`` of the last result,
+    so going deep into the results costs the same as the first page.
+    """
+    per_page = per_page or settings.COUNT_OF_POSTS
+    after = None
+    if cursor:
+        try:
+            position, _ = decode_position(cursor)
+            score, post_id = float(position[0]), int(position[1])
+        except (InvalidCursor, IndexError, TypeError, ValueError):
+            pass
+        else:
+            after = (score, post_id)
+    hits = get_backend().search(query, after=after, limit=per_page + 1)
+    next_cursor = None
+    if len(hits) > per_page:
+        hits = hits[:per_page]
+        post_id, score = hits[-1]
+        next_cursor = encode_position([score, post_id])
+    posts = Post.objects.for_page('feed').in_bulk(
+        [post_id for post_id, score in hits]
+    )
+    page = CursorPage(
+        [posts[post_id] for post_id, score in hits if post_id in posts],
+        None,
+        next_cursor=next_cursor,
+    )
+    page.query_string = urlencode({'q': query})
+    return page
@@ -0,0 +1,143 @@
+"""
+Ranked full-text search over post texts.
+
+``Fts5Backend`` keeps stemmed texts in an SQLite FTS5 table and ranks with
+BM25. ``InvertedIndexBackend`` works on any database: it keeps postings in
+``SearchTerm`` and ranks with TF-IDF. Both return ``(post_id, score)``
+pairs ordered by ascending score, where a smaller score is a better match,
+and both page through the results by the ``(score, post_id)`` keyset.
+"""
+import math
+import re
+from collections import Counter
+
+from django.db import connection
+from django.db.models import (Case, Count, ExpressionWrapper, F, FloatField,
+                              Q, Sum, Value, When)
+
+from ..models import Post, SearchTerm
+from .stemmer import stem
+
+FTS_TABLE = 'posts_post_fts'
+
+# whether the FTS5 table exists, per database file
+_fts_tables = {}
+
+WORD = re.compile(r'\w+')
+
+
+def tokenize(text):
+    return [stem(word) for word in WORD.findall(text.lower())]
+
+
+class Fts5Backend:
+    name = 'fts5'
+
+    @staticmethod
+    def available():
+        if connection.vendor != 'sqlite':
+            return False
+        name = connection.settings_dict['NAME']
+        if name not in _fts_tables:
+            _fts_tables[name] = (
+                FTS_TABLE in connection.introspection.table_names()
+            )
+        return _fts_tables[name]
+
+    def index(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                           [post.pk])
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, content) VALUES (%s, %s)',
+                [post.pk, ' '.join(tokenize(post.text))]
+            )
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                           [post_id])
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+
+    def search(self, query, after=None, limit=10):
+        terms = tokenize(query)
+        if not terms:
+            return []
+        match = ' '.join('"%s"' % term for term in terms)
+        sql = (
+            f'SELECT rowid, score FROM ('
+            f'SELECT rowid, bm25({FTS_TABLE}) AS score FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s)'
+        )
+        params = [match]
+        if after is not None:
+            sql += ' WHERE score > %s OR (score = %s AND rowid > %s)'
+            params += [after[0], after[0], after[1]]
+        sql += ' ORDER BY score, rowid LIMIT %s'
+        params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [(post_id, score) for post_id, score in cursor.fetchall()]
+
+
+class InvertedIndexBackend:
+    name = 'inverted'
+
+    @staticmethod
+    def available():
+        return True
+
+    def index(self, post):
+        SearchTerm.objects.filter(post=post).delete()
+        SearchTerm.objects.bulk_create(
+            SearchTerm(term=term[:SearchTerm.TERM_LENGTH], post=post,
+                       frequency=frequency)
+            for term, frequency in Counter(tokenize(post.text)).items()
+        )
+
+    def remove(self, post_id):
+        SearchTerm.objects.filter(post_id=post_id).delete()
+
+    def clear(self):
+        SearchTerm.objects.all().delete()
+
+    def search(self, query, after=None, limit=10):
+        terms = list(dict.fromkeys(
+            term[:SearchTerm.TERM_LENGTH] for term in tokenize(query)
+        ))
+        if not terms:
+            return []
+        documents = Post.objects.count() or 1
+        frequencies = dict(
+            SearchTerm.objects.filter(term__in=terms).values_list('term')
+            .annotate(documents=Count('post'))
+        )
+        if len(frequencies) < len(terms):
+            return []
+        # negative TF-IDF, so that smaller is better as with BM25
+        weight = Sum(Case(
+            *(When(term=term, then=ExpressionWrapper(
+                F('frequency') * Value(
+                    -math.log(1 + documents / frequencies[term])),
+                output_field=FloatField()))
+              for term in terms),
+            output_field=FloatField()
+        ))
+        results = (
+            SearchTerm.objects.filter(term__in=terms)
+            .values('post_id')
+            .annotate(matched=Count('term'), score=weight)
+            .filter(matched=len(terms))
+        )
+        if after is not None:
+            results = results.filter(
+                Q(score__gt=after[0])
+                | Q(score=after[0], post_id__gt=after[1])
+            )
+        return list(
+            results.order_by('score', 'post_id')
+            .values_list('post_id', 'score')[:limit]
+        )
@@ -0,0 +1,111 @@
+"""
+Snowball stemmer for Russian.
+
+A direct transcription of the algorithm from
+https://snowballstem.org/algorithms/russian/stemmer.html
+Words without Cyrillic vowels are returned lowercased and unchanged.
+"""
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND = (
+    (('в', 'вши', 'вшись'), True),
+    (('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'), False),
+)
+ADJECTIVE = (
+    (('ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+      'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+      'ая', 'яя', 'ою', 'ею'), False),
+)
+PARTICIPLE = (
+    (('ем', 'нн', 'вш', 'ющ', 'щ'), True),
+    (('ивш', 'ывш', 'ующ'), False),
+)
+REFLEXIVE = (
+    (('ся', 'сь'), False),
+)
+VERB = (
+    (('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет',
+      'ют', 'ны', 'ть', 'ешь', 'нно'), True),
+    (('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй',
+      'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют',
+      'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'), False),
+)
+NOUN = (
+    (('а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии',
+      'и', 'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам',
+      'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия',
+      'ья', 'я'), False),
+)
+SUPERLATIVE = (
+    (('ейше', 'ейш'), False),
+)
+DERIVATIONAL = ('ость', 'ост')
+
+
+def _remove(rv, groups):
+    """Strip the longest matching ending; None if nothing matched."""
+    best = None
+    for endings, after_a_ya in groups:
+        for ending in endings:
+            if not rv.endswith(ending):
+                continue
+            rest = rv[:-len(ending)]
+            if after_a_ya and not rest.endswith(('а', 'я')):
+                continue
+            if best is None or len(ending) > len(rv) - len(best):
+                best = rest
+    return best
+
+
+def _region_after_vowel_pair(word, start=0):
+    """Start of R1 (or of R2, when given the start of R1)."""
+    for i in range(start + 1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            return i + 1
+    return len(word)
+
+
+def _strip_ending(rv):
+    """Step 1: the perfective gerund, or an adjectival, verb or noun."""
+    stripped = _remove(rv, PERFECTIVE_GERUND)
+    if stripped is not None:
+        return stripped
+    rv = _remove(rv, REFLEXIVE) or rv
+    adjective = _remove(rv, ADJECTIVE)
+    if adjective is not None:
+        participle = _remove(adjective, PARTICIPLE)
+        return adjective if participle is None else participle
+    for endings in (VERB, NOUN):
+        stripped = _remove(rv, endings)
+        if stripped is not None:
+            return stripped
+    return rv
+
+
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    for i, letter in enumerate(word):
+        if letter in VOWELS:
+            break
+    else:
+        return word
+    prefix, rv = word[:i + 1], word[i + 1:]
+    r2 = _region_after_vowel_pair(word, _region_after_vowel_pair(word))
+
+    rv = _strip_ending(rv)
+    if rv.endswith('и'):
+        rv = rv[:-1]
+
+    for ending in DERIVATIONAL:
+        if rv.endswith(ending) and len(prefix) + len(rv) - len(ending) >= r2:
+            rv = rv[:-len(ending)]
+            break
+
+    superlative = _remove(rv, SUPERLATIVE)
+    if superlative is not None:
+        rv = superlative
+    if rv.endswith('нн'):
+        rv = rv[:-1]
+    elif superlative is None and rv.endswith('ь'):
+        rv = rv[:-1]
+    return prefix + rv
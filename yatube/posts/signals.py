@@ -0,0 +1,159 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import (post_delete, post_init, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from . import feed_cache, media, search, syndication, tasks, timeline
+from .cards import invalidate_cards
+from .counters import bump
+from .models import Comment, Follow, Group, Post, User, UserCounters
+
+
+@receiver(post_save, sender=User)
+def create_counters(sender, instance, created, raw=False, **kwargs):
+    # raw saves too: users of fixtures would be left without the row
+    if created:
+        UserCounters.objects.get_or_create(user=instance)
+
+
+def _author_name(user):
+    return tuple(
+        user.__dict__.get(field)
+        for field in ('username', 'first_name', 'last_name')
+    )
+
+
+@receiver(post_init, sender=User)
+def remember_author_name(sender, instance, **kwargs):
+    instance._saved_author_name = _author_name(instance)
+
+
+@receiver(post_save, sender=User)
+def drop_author_cards(sender, instance, created, **kwargs):
+    if created or instance._saved_author_name == _author_name(instance):
+        return
+    invalidate_cards(instance.posts.values_list('pk', flat=True))
+    feed_cache.bump(feed_cache.SITE)
+    instance._saved_author_name = _author_name(instance)
+
+
+@receiver(post_save, sender=Group)
+def drop_group_cards(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_cards(instance.posts.values_list('pk', flat=True))
+    feed_cache.bump(feed_cache.SITE)
+
+
+@receiver(pre_delete, sender=Group)
+def remember_group_posts(sender, instance, **kwargs):
+    # by post_delete the posts have already lost their group
+    instance._saved_post_ids = list(
+        instance.posts.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Group)
+def drop_group_feed(sender, instance, **kwargs):
+    post_ids = getattr(instance, '_saved_post_ids', [])
+    invalidate_cards(post_ids)
+    # a card rendered before the commit may show the group again
+    transaction.on_commit(partial(invalidate_cards, post_ids))
+    feed_cache.bump(feed_cache.SITE)
+
+
+@receiver(post_init, sender=Post)
+def remember_post_state(sender, instance, **kwargs):
+    instance._saved_group_id = instance.__dict__.get('group_id')
+    instance._saved_image = str(instance.__dict__.get('image') or '')
+
+
+def _add_to_syndication(post, before):
+    syndication.add_post(post, before, syndication.snapshot(post))
+
+
+def _bump_feeds(post, created):
+    group_ids = {post._saved_group_id, post.group_id}
+    if not created:
+        feed_cache.bump_post(post, group_ids)
+        return
+    before = syndication.snapshot(post)
+    feed_cache.bump_post(post, group_ids)
+    # after the bump feed_cache makes on commit
+    transaction.on_commit(partial(_add_to_syndication, post, before))
+
+
+@receiver(post_save, sender=Post)
+def deliver_post(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        bump(UserCounters, instance.author_id, 'posts_count', 1)
+        bump(Group, instance.group_id, 'posts_count', 1)
+        timeline.fan_out_post(instance)
+    else:
+        invalidate_cards([instance.pk])
+        if instance._saved_group_id != instance.group_id:
+            bump(Group, instance._saved_group_id, 'posts_count', -1)
+            bump(Group, instance.group_id, 'posts_count', 1)
+    search.index_post(instance)
+    _bump_feeds(instance, created)
+    saved_image = '' if created else instance._saved_image
+    if (instance.image.name or '') != saved_image:
+        media.acquire(instance.image.name)
+        media.release(saved_image)
+        if instance.image:
+            tasks.process_image.delay(instance.pk, instance.image.name)
+    instance._saved_group_id = instance.group_id
+    instance._saved_image = instance.image.name or ''
+
+
+@receiver(post_delete, sender=Post)
+def forget_post(sender, instance, **kwargs):
+    invalidate_cards([instance.pk])
+    search.remove_post(instance.pk)
+    media.release(instance.image.name)
+    bump(UserCounters, instance.author_id, 'posts_count', -1)
+    bump(Group, instance.group_id, 'posts_count', -1)
+    feed_cache.bump_post(instance)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        bump(Post, instance.post_id, 'comments_count', 1)
+    feed_cache.bump(f'post:{instance.post_id}')
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    bump(Post, instance.post_id, 'comments_count', -1)
+    feed_cache.bump(f'post:{instance.post_id}')
+
+
+def _bump_follow_feeds(follow):
+    feed_cache.bump(
+        f'author:{follow.author.username}',
+        f'author:{follow.user.username}',
+        f'follow:{follow.user_id}'
+    )
+
+
+@receiver(post_save, sender=Follow)
+def fill_timeline(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        bump(UserCounters, instance.author_id, 'followers_count', 1)
+        bump(UserCounters, instance.user_id, 'following_count', 1)
+        timeline.backfill(instance.user_id, instance.author_id)
+        _bump_follow_feeds(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def clean_timeline(sender, instance, **kwargs):
+    bump(UserCounters, instance.author_id, 'followers_count', -1)
+    bump(UserCounters, instance.user_id, 'following_count', -1)
+    timeline.evict(instance.user_id, instance.author_id)
+    timeline.lost_follower(instance.author_id)
+    _bump_follow_feeds(instance)
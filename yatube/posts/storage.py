@@ -0,0 +1,57 @@
+"""
+Content-addressed file storage.
+
+A file is stored under the SHA-256 of its content, sharded into nested
+directories by the leading hex digits::
+
+    posts/3f/a2/3fa2...e9.jpg
+
+so uploading the same picture twice stores it once and no directory gets
+more than a few hundred entries. Whether a file is still in use is tracked
+by ``MediaFile`` reference counts (see ``posts.media``), not by the storage.
+"""
+import hashlib
+import os
+import posixpath
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def __init__(self, *args, shard_depth=2, shard_width=2, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.shard_depth = shard_depth
+        self.shard_width = shard_width
+
+    @staticmethod
+    def digest(content):
+        sha = hashlib.sha256()
+        for chunk in content.chunks():
+            sha.update(chunk)
+        return sha.hexdigest()
+
+    def content_name(self, name, digest):
+        """``<dir of name>/<shards>/<digest><ext of name>``."""
+        directory, basename = posixpath.split(name.replace('\\', '/'))
+        extension = os.path.splitext(basename)[1].lower()
+        shards = [
+            digest[i * self.shard_width:(i + 1) * self.shard_width]
+            for i in range(self.shard_depth)
+        ]
+        return posixpath.join(directory, *shards, digest + extension)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.content_name(name, self.digest(content))
+        if self.exists(name):
+            # same bytes are already there; refresh the mtime so that a
+            # concurrent garbage collection treats the file as fresh
+            os.utime(self.path(name))
+            return name
+        return super().save(name, content, max_length)
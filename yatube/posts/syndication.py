@@ -0,0 +1,108 @@
+"""
+Entry lists of the Atom feeds, kept in the cache.
+
+A feed is the newest ``SYNDICATION_ENTRIES`` posts of the site, a group
+or an author. Its list is stored with the feed cache generations of the
+feed's scopes and is good while they are current. A new post is put on
+top of the lists of its feeds once committed, so the feeds do not go
+back to the database. Any other change bumps a scope and lets the next
+reader rebuild the list.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from core.db.router import use_primary
+
+from .feed_cache import POSTS, SITE, generations
+
+# seconds a writer may hold the list of a feed
+LOCK_TIMEOUT = 5
+
+
+def index_scopes():
+    return (POSTS, SITE)
+
+
+def group_scopes(slug):
+    return (SITE, f'group:{slug}')
+
+
+def author_scopes(username):
+    return (SITE, f'author:{username}')
+
+
+def feeds_of(post):
+    """Scopes of every feed showing ``post``."""
+    feeds = [index_scopes(), author_scopes(post.author.username)]
+    if post.group_id:
+        feeds.append(group_scopes(post.group.slug))
+    return feeds
+
+
+def _key(scopes):
+    return 'syndication:' + '.'.join(scopes)
+
+
+def entry(post):
+    return {
+        'id': post.pk,
+        'text': post.text,
+        'pub_date': post.pub_date,
+        'author': post.author.username,
+        'author_name': post.author.get_full_name() or post.author.username,
+        'group': post.group.slug if post.group_id else None,
+    }
+
+
+def entries(scopes, queryset):
+    """The entries of a feed, rebuilt from ``queryset`` when stale."""
+    current = generations(scopes)
+    found = cache.get(_key(scopes))
+    if found is not None and found['generations'] == current:
+        return found['entries']
+    with use_primary():
+        items = [
+            entry(post)
+            for post in queryset[:settings.SYNDICATION_ENTRIES]
+        ]
+    cache.set(_key(scopes), {'generations': current, 'entries': items},
+              settings.FEED_CACHE_TIMEOUT)
+    return items
+
+
+def snapshot(post):
+    """``{scopes: generations}`` of the feeds of ``post``."""
+    return {scopes: generations(scopes) for scopes in feeds_of(post)}
+
+
+def add_post(post, before, after):
+    """
+    Put a new post on top of the lists of its feeds.
+
+    ``before`` and ``after`` are the snapshots around the bump of the
+    post: a list stamped with either one lacks nothing but this post.
+    """
+    new = entry(post)
+    for scopes, generation in after.items():
+        key = _key(scopes)
+        lock = key + ':lock'
+        if not cache.add(lock, 1, LOCK_TIMEOUT):
+            # another writer is on it, the next reader rebuilds the list
+            cache.delete(key)
+            continue
+        try:
+            found = cache.get(key)
+            if found is None or found['generations'] not in (
+                    before[scopes], generation):
+                continue
+            items = [item for item in found['entries']
+                     if item['id'] != post.pk]
+            items.append(new)
+            items.sort(key=lambda item: (item['pub_date'], item['id']),
+                       reverse=True)
+            cache.set(key, {
+                'generations': generation,
+                'entries': items[:settings.SYNDICATION_ENTRIES],
+            }, settings.FEED_CACHE_TIMEOUT)
+        finally:
+            cache.delete(lock)
@@ -0,0 +1,26 @@
+"""
+Background work of posts: the thumbnails of an uploaded image and the
+periodic media garbage collection (see ``core.tasks``).
+"""
+from django.conf import settings
+
+from core.tasks import task
+
+from . import media, thumbnails
+from .models import Post
+
+
+@task(retries=3)
+def process_image(post_id, name):
+    """
+    Render the thumbnails and variants of the image ``name`` a post was
+    saved with. Does nothing if the post has got another image in the
+    meantime: the job queued for that one renders it.
+    """
+    if Post.objects.filter(pk=post_id, image=name).exists():
+        thumbnails.pregenerate(post_id)
+
+
+@task(every=settings.MEDIA_GC_INTERVAL)
+def collect_media():
+    media.collect()
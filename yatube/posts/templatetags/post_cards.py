@@ -0,0 +1,56 @@
+from django import template
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+from ..cards import render_card
+from ..thumbnails import cached_thumbnail
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_card(post):
+    return render_card(post)
+
+
+@register.inclusion_tag('posts/includes/thumbnail.html')
+def post_thumbnail(post, alias='card'):
+    width, _, height = settings.THUMBNAIL_GEOMETRIES[alias][0].partition('x')
+    return {
+        'post': post,
+        'thumbnail': cached_thumbnail(post.image, alias),
+        'width': width,
+        'height': height,
+    }
+
+
+@register.inclusion_tag('posts/includes/picture.html')
+def post_picture(post):
+    """``<picture>`` with responsive variants, or the plain thumbnail."""
+    manifest = post.image_manifest
+    if manifest is None:
+        return post_thumbnail(post)
+    sources = [
+        {
+            'type': variant['type'],
+            'srcset': ', '.join(
+                f'{default_storage.url(name)} {width}w'
+                for name, width in variant['files']
+            ),
+        }
+        for variant in manifest['formats']
+    ]
+    card_width = int(settings.THUMBNAIL_GEOMETRIES['card'][0].split('x')[0])
+    name, width = min(
+        manifest['formats'][-1]['files'],
+        key=lambda file: abs(file[1] - card_width)
+    )
+    return {
+        'manifest': manifest,
+        'sources': sources[:-1],
+        'srcset': sources[-1]['srcset'],
+        'src': default_storage.url(name),
+        'width': width,
+        'height': round(width / manifest['ratio']),
+        'sizes': settings.IMAGE_VARIANT_SIZES,
+    }
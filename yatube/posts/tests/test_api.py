@@ -0,0 +1,143 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+from .utils import QueryBudgetMixin
+
+User = get_user_model()
+
+
+@override_settings(API_PAGE_SIZE=3)
+class ApiTest(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='leo', first_name='Лев', last_name='Толстой')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        for i in range(7):
+            Post.objects.create(text=f'Пост {i}', author=cls.author,
+                                group=cls.group)
+        cls.post = Post.objects.latest('pk')
+        for i in range(4):
+            Comment.objects.create(post=cls.post, author=cls.reader,
+                                   text=f'Комментарий {i}')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def walk(self, url, client=None):
+        client = client or self.client
+        results = []
+        while url is not None:
+            data = client.get(url).json()
+            results.extend(data['results'])
+            url = data['next']
+        return results
+
+    def test_post_lists(self):
+        """Тест для проверки списков постов по курсорам."""
+        expected = [f'Пост {i}' for i in reversed(range(7))]
+        for url in (reverse('api:post_list'),
+                    reverse('api:group_post_list', args=['group']),
+                    reverse('api:profile_post_list', args=['leo'])):
+            with self.subTest(url=url):
+                self.assertEqual(
+                    [post['text'] for post in self.walk(url)], expected)
+        post = self.client.get(reverse('api:post_list')).json()['results'][0]
+        self.assertEqual(post, {
+            'id': self.post.pk,
+            'text': 'Пост 6',
+            'pub_date': self.post.pub_date.isoformat(),
+            'author': 'leo',
+            'group': 'group',
+            'image': None,
+            'image_variants': [],
+            'comments_count': 4,
+        })
+
+    def test_follow_feed(self):
+        """Тест для проверки ленты подписок: только для вошедших."""
+        url = reverse('api:follow_feed')
+        self.assertEqual(self.client.get(url).status_code,
+                         HTTPStatus.UNAUTHORIZED)
+        self.assertEqual(len(self.walk(url, self.reader_client)), 7)
+
+    def test_details(self):
+        """Тест для проверки отдельных объектов API."""
+        profile = self.client.get(
+            reverse('api:profile_detail', args=['leo'])).json()
+        self.assertEqual(profile, {
+            'username': 'leo',
+            'full_name': 'Лев Толстой',
+            'posts_count': 7,
+            'followers_count': 1,
+            'following_count': 0,
+        })
+        group = self.client.get(
+            reverse('api:group_detail', args=['group'])).json()
+        self.assertEqual(group['posts_count'], 7)
+        self.assertEqual(
+            self.client.get(reverse('api:group_list')).json()['results'],
+            [group])
+        comments = self.walk(
+            reverse('api:comment_list', args=[self.post.pk]))
+        self.assertEqual([comment['text'] for comment in comments],
+                         [f'Комментарий {i}' for i in range(4)])
+        comment = self.client.get(reverse(
+            'api:comment_detail', args=[self.post.pk, comments[0]['id']]))
+        self.assertEqual(comment.json(), comments[0])
+        post = self.client.get(
+            reverse('api:post_detail', args=[self.post.pk])).json()
+        self.assertEqual(post['text'], 'Пост 6')
+
+    def test_sparse_fieldsets(self):
+        """Тест для проверки выбора полей параметром fields."""
+        response = self.client.get(reverse('api:post_list'),
+                                   {'fields': 'id,author'})
+        self.assertEqual(set(response.json()['results'][0]), {'id', 'author'})
+        response = self.client.get(reverse('api:post_list'),
+                                   {'fields': 'id,password'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertIn('password', response.json()['detail'])
+
+    def test_errors(self):
+        """Тест для проверки ошибок в формате JSON."""
+        response = self.client.get(reverse('api:post_detail', args=[999]))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        self.assertEqual(response.json(), {'detail': 'Не найдено'})
+        response = self.client.get(reverse('api:post_list'), {'limit': 0})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        response = self.reader_client.post(reverse('api:post_list'))
+        self.assertEqual(response.status_code, HTTPStatus.METHOD_NOT_ALLOWED)
+
+    def test_conditional_get(self):
+        """Тест для проверки ответа 304 в API."""
+        url = reverse('api:post_detail', args=[self.post.pk])
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code,
+            HTTPStatus.NOT_MODIFIED)
+        Comment.objects.create(post=self.post, author=self.author,
+                               text='Ещё комментарий')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.json()['comments_count'], 5)
+
+    def test_query_budget(self):
+        """Тест для проверки, что число запросов не зависит от размера
+        страницы."""
+        with override_settings(API_PAGE_SIZE=50):
+            self.assertViewsWithinBudget(self.client, {
+                reverse('api:post_list'): 1,
+                reverse('api:group_post_list', args=['group']): 2,
+                reverse('api:profile_post_list', args=['leo']): 2,
+                reverse('api:comment_list', args=[self.post.pk]): 2,
+            })
@@ -0,0 +1,52 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from .. import counters
+from ..benchmark import DatasetConfig, run, seed
+from ..models import Comment, Follow, Group, Post, TimelineEntry, User
+
+
+class BenchmarkTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.config = DatasetConfig(users=20, groups=3, posts=100,
+                                   follows_per_user=3, comments=50)
+        cls.dataset = seed(cls.config)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_seeded_dataset(self):
+        """Тест для проверки объёма и согласованности синтетических
+        данных."""
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 100)
+        self.assertEqual(Follow.objects.count(), 20 * 3)
+        self.assertEqual(Comment.objects.count(), 50)
+        self.assertTrue(TimelineEntry.objects.exists())
+        self.assertFalse(any(counters.rebuild(check_only=True).values()))
+        # авторы распределены неравномерно
+        self.assertGreater(self.dataset.author.posts.count(),
+                           100 // 20 * 2)
+
+    def test_report_covers_every_route(self):
+        """Тест для проверки отчёта по всем адресам posts."""
+        report = run(self.dataset, iterations=2, warmup=0,
+                     allocation_iterations=1)
+        self.assertEqual(report['meta']['dataset']['posts'], 100)
+        for name, result in report['routes'].items():
+            with self.subTest(route=name):
+                self.assertIn(result['status'], (200, 302))
+                self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+                self.assertGreaterEqual(result['alloc_peak_kb'], 0)
+        self.assertIn('search', report['routes'])
+        self.assertEqual(report['routes']['post_edit']['status'], 200)
+
+    def test_session_query_floor(self):
+        """Тест для проверки, что тёплая сессия не делает запросов к БД."""
+        report = run(self.dataset, iterations=1, warmup=0,
+                     allocation_iterations=1, only=['index'])
+        self.assertEqual(report['session_queries'],
+                         {'uncached': 2, 'cold': 2, 'warm': 0})
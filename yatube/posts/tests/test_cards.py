@@ -0,0 +1,69 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+
+from ..cards import render_card
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class PostCardCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='leo',
+                                            first_name='Лев')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый пост',
+            author=cls.user,
+            group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def card(self):
+        return render_card(
+            Post.objects.for_page('feed').get(pk=self.post.pk)
+        )
+
+    def test_card_is_served_from_cache(self):
+        """Тест для проверки повторной отдачи карточки из кэша."""
+        self.assertIn('Тестовый пост', self.card())
+        Post.objects.filter(pk=self.post.pk).update(text='Новый текст')
+        self.assertIn('Тестовый пост', self.card())
+
+    def test_card_is_dropped_on_post_save(self):
+        """Тест для проверки сброса карточки при изменении поста."""
+        self.card()
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Новый текст'
+        post.save()
+        self.assertIn('Новый текст', self.card())
+
+    def test_card_is_dropped_on_group_save(self):
+        """Тест для проверки сброса карточки при изменении группы."""
+        self.card()
+        self.group.title = 'Новая группа'
+        self.group.save()
+        self.assertIn('Новая группа', self.card())
+
+    def test_card_is_dropped_on_group_delete(self):
+        """Тест для проверки сброса карточки при удалении группы."""
+        self.assertIn('Тестовая группа', self.card())
+        Group.objects.get(pk=self.group.pk).delete()
+        self.assertNotIn('Тестовая группа', self.card())
+
+    def test_card_is_dropped_on_author_rename(self):
+        """Тест для проверки сброса карточки при смене имени автора."""
+        self.card()
+        author = User.objects.get(pk=self.user.pk)
+        author.first_name = 'Лео'
+        author.save()
+        self.assertIn('Лео', self.card())
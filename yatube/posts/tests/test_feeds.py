@@ -0,0 +1,86 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class AtomFeedTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='leo', first_name='Лев', last_name='Толстой')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.post = Post.objects.create(
+            text='Пост в группе', author=cls.author, group=cls.group)
+        Post.objects.create(text='Пост без группы', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feeds(self):
+        """Тест для проверки Atom-лент сайта, группы и автора."""
+        feeds = {
+            reverse('posts:index_feed'): 2,
+            reverse('posts:group_feed', args=['group']): 1,
+            reverse('posts:author_feed', args=['leo']): 2,
+        }
+        for url, count in feeds.items():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response['Content-Type'],
+                                 'application/atom+xml; charset=utf-8')
+                self.assertEqual(response.content.count(b'<entry>'), count)
+                self.assertContains(response, 'Пост в группе')
+                self.assertContains(response, '<name>Лев Толстой</name>')
+        self.assertEqual(
+            self.client.get(reverse('posts:group_feed', args=['none']))
+            .status_code, HTTPStatus.NOT_FOUND)
+
+    def test_conditional_get(self):
+        """Тест для проверки ответа 304 читателю ленты."""
+        url = reverse('posts:group_feed', args=['group'])
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        self.post.text = 'Исправленный пост'
+        self.post.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Исправленный пост')
+
+    def test_pages_link_feeds(self):
+        """Тест для проверки ссылок на ленты со страниц."""
+        response = self.client.get(reverse('posts:profile', args=['leo']))
+        self.assertContains(
+            response, reverse('posts:author_feed', args=['leo']))
+
+
+class IncrementalFeedTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='leo')
+        Post.objects.create(text='Первый пост', author=self.author)
+
+    def test_new_post_is_added_without_queries(self):
+        """Тест для проверки, что новый пост дописывается в ленту без
+        запросов к базе."""
+        urls = [reverse('posts:index_feed'),
+                reverse('posts:author_feed', args=['leo'])]
+        for url in urls:
+            self.client.get(url)
+        Post.objects.create(text='Второй пост', author=self.author)
+        with self.assertNumQueries(1):
+            # автор ленты, сами записи берутся из кэша
+            response = self.client.get(urls[1])
+        self.assertContains(response, 'Второй пост')
+        with self.assertNumQueries(0):
+            response = self.client.get(urls[0])
+        self.assertLess(response.content.index('Второй пост'.encode()),
+                        response.content.index('Первый пост'.encode()))
@@ -0,0 +1,115 @@
+import os
+import re
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from core.tasks.worker import drain
+
+from .. import thumbnails
+from ..models import MediaFile, Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def upload(color):
+    buffer = BytesIO()
+    Image.new('RGB', (40, 20), color).save(buffer, 'PNG')
+    return SimpleUploadedFile('picture.png', buffer.getvalue(),
+                              content_type='image/png')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedMediaTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='leo')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def create_post(self, color):
+        post = Post.objects.create(text='Пост', author=self.user,
+                                   image=upload(color))
+        drain()
+        return Post.objects.get(pk=post.pk)
+
+    def refcount(self, name):
+        return MediaFile.objects.get(name=name).refcount
+
+    def test_identical_uploads_are_stored_once(self):
+        """Тест для проверки хранения одинаковых файлов в одном экземпляре."""
+        first = self.create_post('red')
+        second = self.create_post('red')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(first.image.name,
+                         r'^posts/([0-9a-f]{2})/([0-9a-f]{2})/\1\2[0-9a-f]{60}'
+                         r'\.png$')
+        directory = os.path.dirname(first.image.path)
+        self.assertEqual(len(os.listdir(directory)), 1)
+        self.assertEqual(self.refcount(first.image.name), 2)
+        second.delete()
+        self.assertEqual(self.refcount(first.image.name), 1)
+
+    def gc(self, *args):
+        out = StringIO()
+        call_command('gc_media', '--grace=0', *args, stdout=out)
+        return dict(re.findall(r'^(\w+): (\d+)$', out.getvalue(), re.M))
+
+    def test_gc_removes_replaced_images(self):
+        """Тест для проверки удаления заменённой картинки и её копий."""
+        post = self.create_post('red')
+        old = post.image.name
+        old_thumbnail = thumbnails.cached_thumbnail(post.image, 'card')
+        old_variants = post.image_manifest['formats'][0]['files']
+        post.image = upload('blue')
+        post.save()
+        drain()
+        post.refresh_from_db()
+        self.assertEqual(self.refcount(old), 0)
+
+        self.assertEqual(self.gc('--dry-run')['images'], '1')
+        self.assertTrue(default_storage.exists(old))
+        self.assertEqual(self.gc()['images'], '1')
+        self.assertFalse(default_storage.exists(old))
+        self.assertFalse(default_storage.exists(old_thumbnail.name))
+        for name, width in old_variants:
+            self.assertFalse(default_storage.exists(name))
+        self.assertFalse(MediaFile.objects.filter(name=old).exists())
+
+        self.assertTrue(default_storage.exists(post.image.name))
+        thumbnail = thumbnails.cached_thumbnail(post.image, 'card')
+        self.assertTrue(default_storage.exists(thumbnail.name))
+
+    def test_gc_removes_orphans(self):
+        """Тест для проверки удаления файлов, о которых никто не знает."""
+        post = self.create_post('red')
+        stray = default_storage.save('posts/stray.png', ContentFile(b'x'))
+        stray_thumbnail = default_storage.save('cache/00/00/stray.jpg',
+                                               ContentFile(b'x'))
+        report = self.gc()
+        self.assertEqual(report['orphans'], '1')
+        self.assertEqual(report['thumbnails'], '1')
+        self.assertFalse(default_storage.exists(stray))
+        self.assertFalse(default_storage.exists(stray_thumbnail))
+        self.assertTrue(default_storage.exists(post.image.name))
+        self.assertEqual(self.gc(), {'images': '0', 'orphans': '0',
+                                     'thumbnails': '0', 'variants': '0'})
@@ -1,7 +1,18 @@
+from http import HTTPStatus
+from io import StringIO
+from unittest import mock
+
 from django.contrib.auth import get_user_model
+from django.core import serializers
+from django.core.management import CommandError, call_command
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
 
-from ..models import Group, Post
+from ..counters import rebuild
+from ..models import Comment, Follow, Group, Post, UserCounters
+from ..timeline import follow_feed
+from ..utilites import CursorPaginator
 
 User = get_user_model()
 
@@ -29,3 +40,161 @@ class PostModelTest(TestCase):
                          'Тест метода str для post не пройден')
         self.assertEqual(group.title, str(group),
                          'Тест метода str для group не пройден')
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other-slug',
+            description='Тестовое описание',
+        )
+
+    def counters(self, user):
+        return UserCounters.objects.get(user=user)
+
+    def test_post_counters(self):
+        """Тест для проверки счетчиков постов автора и группы."""
+        post = Post.objects.create(author=self.user, text='Тестовый пост',
+                                   group=self.group)
+        self.assertEqual(self.counters(self.user).posts_count, 1)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+        post.group = self.other_group
+        post.save()
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.other_group.posts_count, 1)
+        post.delete()
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.counters(self.user).posts_count, 0)
+        self.assertEqual(self.other_group.posts_count, 0)
+
+    def test_comment_and_follow_counters(self):
+        """Тест для проверки счетчиков комментариев и подписок."""
+        post = Post.objects.create(author=self.user, text='Тестовый пост')
+        comment = Comment.objects.create(post=post, author=self.reader,
+                                         text='Комментарий')
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        Follow.objects.create(user=self.reader, author=self.user)
+        self.assertEqual(self.counters(self.user).followers_count, 1)
+        self.assertEqual(self.counters(self.reader).following_count, 1)
+        Follow.objects.filter(user=self.reader).delete()
+        self.assertEqual(self.counters(self.user).followers_count, 0)
+        self.assertEqual(self.counters(self.reader).following_count, 0)
+
+    def test_missing_counters_row(self):
+        """Тест для проверки страниц и счетчиков пользователя без строки
+        счетчиков."""
+        post = Post.objects.create(author=self.user, text='Тестовый пост')
+        UserCounters.objects.filter(user=self.user).delete()
+        pages = (
+            reverse('posts:post_detail', args=[post.pk]),
+            reverse('posts:profile', args=[self.user.username]),
+            reverse('api:profile_detail', args=[self.user.username]),
+        )
+        for url in pages:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code,
+                                 HTTPStatus.OK)
+        self.assertEqual(
+            self.client.get(pages[2]).json()['posts_count'], 0)
+        # первое же увеличение создаёт строку по настоящим числам
+        Post.objects.create(author=self.user, text='Ещё пост')
+        self.assertEqual(self.counters(self.user).posts_count, 2)
+
+    def test_loaded_user_gets_counters(self):
+        """Тест для проверки строки счетчиков у загруженного из фикстуры
+        пользователя."""
+        data = serializers.serialize('json', [User(pk=100, username='new')])
+        for loaded in serializers.deserialize('json', data):
+            loaded.save()
+        self.assertEqual(self.counters(User.objects.get(pk=100)).posts_count,
+                         0)
+
+    def test_rebuild_counters_command(self):
+        """Тест для проверки команды пересчета счетчиков."""
+        Post.objects.bulk_create(
+            Post(author=self.user, text='Тестовый пост', group=self.group)
+            for _ in range(3)
+        )
+        with self.assertRaises(CommandError):
+            call_command('rebuild_counters', '--check', stdout=StringIO())
+        call_command('rebuild_counters', stdout=StringIO())
+        call_command('rebuild_counters', '--check', stdout=StringIO())
+        self.group.refresh_from_db()
+        self.assertEqual(self.counters(self.user).posts_count, 3)
+        self.assertEqual(self.group.posts_count, 3)
+
+    def test_check_counts_broken_rows(self):
+        """Тест для проверки, что проверка лишь считает неверные строки."""
+        Post.objects.bulk_create(
+            Post(author=author, text='Тестовый пост')
+            for author in (self.user, self.reader)
+        )
+        with mock.patch('django.db.models.QuerySet.bulk_update') as update:
+            report = rebuild(check_only=True, batch_size=1)
+        update.assert_not_called()
+        self.assertEqual(report[UserCounters], 2)
+        self.assertEqual(self.counters(self.user).posts_count, 0)
+
+
+class IndexUsageTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+
+    def plan(self, queryset):
+        return queryset[:10].explain()
+
+    def assertUsesIndex(self, queryset, index):
+        plan = self.plan(queryset)
+        self.assertIn(f'USING INDEX {index}', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_feeds_use_indexes(self):
+        """Тест для проверки, что ленты читаются по индексу без
+        сортировки."""
+        feeds = {
+            'post_date_idx': Post.objects.for_page('feed'),
+            'post_group_date_idx': self.group.posts.for_page('group'),
+            'post_author_date_idx': self.user.posts.for_page('profile'),
+        }
+        for index, queryset in feeds.items():
+            with self.subTest(index=index):
+                self.assertUsesIndex(queryset, index)
+                # порядок курсорной пагинации с продолжением страницы
+                paginator = CursorPaginator(queryset, 10)
+                last = Post(pk=5, pub_date=timezone.now())
+                position, _ = paginator.decode_cursor(
+                    paginator.encode_cursor(last))
+                self.assertUsesIndex(
+                    paginator.object_list.filter(
+                        paginator._seek(position, False)), index)
+
+    def test_comments_and_follows_use_indexes(self):
+        """Тест для проверки индексов комментариев и подписок."""
+        self.assertUsesIndex(
+            Comment.objects.filter(post_id=1).order_by('created'),
+            'comment_post_created_idx')
+        self.assertIn(
+            'USING COVERING INDEX follow_author_user_idx',
+            self.plan(Follow.objects.filter(author=self.user).values('user')))
+        plan = self.plan(follow_feed(self.user))
+        self.assertNotIn('SCAN posts_post', plan)
+        self.assertIn('counters_followers_idx', plan)
@@ -0,0 +1,122 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Post
+from ..search import get_backend, rebuild, search_ids, search_posts
+from ..search.stemmer import stem
+
+User = get_user_model()
+
+
+class StemmerTest(TestCase):
+    def test_word_forms_share_stem(self):
+        """Тест для проверки приведения словоформ к одной основе."""
+        for words in (('книга', 'книги', 'книгой'),
+                      ('бегать', 'бегали', 'бегающий')):
+            with self.subTest(words=words):
+                self.assertEqual(len({stem(word) for word in words}), 1)
+        self.assertEqual(stem('Python'), 'python')
+
+
+@override_settings(SEARCH_BACKEND='fts5', COUNT_OF_POSTS=2)
+class Fts5SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='leo')
+        cls.best = Post.objects.create(
+            text='Книги, книги и ещё раз книги', author=cls.user)
+        cls.good = Post.objects.create(
+            text='Новая книга о путешествиях и книгах', author=cls.user)
+        cls.weak = Post.objects.create(
+            text='Длинный рассказ о горах, морях, лесах и полях, '
+                 'в конце которого упомянута книга', author=cls.user)
+        Post.objects.create(text='Пост о погоде', author=cls.user)
+
+    def ids(self, page):
+        return [post.pk for post in page]
+
+    def test_results_are_ranked_and_paginated(self):
+        """Тест для проверки ранжирования и постраничной выдачи."""
+        first = search_posts('книгами')
+        self.assertEqual(self.ids(first), [self.best.pk, self.good.pk])
+        self.assertTrue(first.has_next())
+        second = search_posts('книгами', first.next_cursor)
+        self.assertEqual(self.ids(second), [self.weak.pk])
+        self.assertFalse(second.has_next())
+
+    def test_all_terms_must_match(self):
+        """Тест для проверки поиска по нескольким словам."""
+        self.assertEqual(self.ids(search_posts('книги путешествие')),
+                         [self.good.pk])
+        self.assertEqual(self.ids(search_posts('книги погода')), [])
+        self.assertEqual(self.ids(search_posts('!!!')), [])
+
+    def test_index_follows_post_changes(self):
+        """Тест для проверки обновления индекса при правке и удалении."""
+        post = Post.objects.get(pk=self.good.pk)
+        post.text = 'Пост о погоде в горах'
+        post.save()
+        self.assertNotIn(post.pk, self.ids(search_posts('книга')))
+        self.assertIn(post.pk, self.ids(search_posts('горы')))
+        Post.objects.get(pk=self.best.pk).delete()
+        self.assertNotIn(self.best.pk, self.ids(search_posts('книга')))
+
+    def test_rebuild(self):
+        """Тест для проверки полной перестройки индекса."""
+        get_backend().clear()
+        self.assertEqual(self.ids(search_posts('книга')), [])
+        self.assertEqual(rebuild(), Post.objects.count())
+        self.assertEqual(len(search_posts('книга')), 2)
+
+    def test_search_page(self):
+        """Тест для проверки страницы поиска."""
+        response = self.client.get(reverse('posts:search'), {'q': 'книга'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.ids(response.context['page_obj']),
+                         [self.best.pk, self.good.pk])
+        self.assertContains(response, 'q=%D0%BA%D0%BD%D0%B8%D0%B3%D0%B0'
+                                      '&amp;cursor=')
+        response = self.client.get(reverse('posts:search'))
+        self.assertIsNone(response.context['page_obj'])
+
+
+@override_settings(SEARCH_BACKEND='inverted')
+class InvertedIndexSearchTest(Fts5SearchTest):
+    """Те же проверки для переносимого индекса без FTS5."""
+
+
+class AdminSearchTest(TestCase):
+    def test_admin_uses_search_index(self):
+        """Тест для проверки поиска постов в админке."""
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        post = Post.objects.create(text='Книги о море', author=admin)
+        Post.objects.create(text='Пост о погоде', author=admin)
+        self.client.force_login(admin)
+        response = self.client.get('/admin/posts/post/', {'q': 'книга'})
+        self.assertEqual(
+            [item.pk for item in response.context['cl'].result_list],
+            [post.pk]
+        )
+
+    def test_admin_keeps_rank_order(self):
+        """Тест для проверки порядка результатов поиска в админке."""
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        best = Post.objects.create(text='Море, море, снова море',
+                                   author=admin)
+        other = Post.objects.create(text='Пост о море и горах', author=admin)
+        self.assertEqual(search_ids('море', 10), [best.pk, other.pk])
+        self.client.force_login(admin)
+        response = self.client.get('/admin/posts/post/', {'q': 'море'})
+        self.assertEqual(
+            [item.pk for item in response.context['cl'].result_list],
+            [best.pk, other.pk]
+        )
+        # сортировка по столбцу важнее ранга
+        response = self.client.get('/admin/posts/post/',
+                                   {'q': 'море', 'o': '-1'})
+        self.assertEqual(
+            [item.pk for item in response.context['cl'].result_list],
+            [other.pk, best.pk]
+        )
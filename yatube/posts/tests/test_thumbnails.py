@@ -0,0 +1,123 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from core.models import Job
+from core.tasks.worker import drain
+
+from .. import tasks, thumbnails, variants
+from ..models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailPregenerationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='leo')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def create_post(self):
+        self.client.post(reverse('posts:post_create'), {
+            'text': 'Пост с картинкой',
+            'image': SimpleUploadedFile('small.gif', SMALL_GIF,
+                                        content_type='image/gif'),
+        })
+        return Post.objects.get(text='Пост с картинкой')
+
+    def test_placeholder_until_thumbnail_is_ready(self):
+        """Тест для проверки заглушки вместо неготовой миниатюры."""
+        post = self.create_post()
+        self.assertIsNone(thumbnails.cached_thumbnail(post.image, 'card'))
+        with mock.patch('sorl.thumbnail.default.engine.get_image') as resize:
+            response = self.client.get(reverse('posts:index'))
+        resize.assert_not_called()
+        self.assertContains(response, 'Изображение обрабатывается')
+
+        drain()
+        thumbnail = thumbnails.cached_thumbnail(post.image, 'card')
+        self.assertEqual((thumbnail.width, thumbnail.height), (720, 300))
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, '<picture>')
+        self.assertNotContains(response, 'Изображение обрабатывается')
+
+    def test_new_image_is_queued(self):
+        """Тест для проверки постановки картинки в очередь на обработку."""
+        post = self.create_post()
+        job = Job.objects.get()
+        self.assertEqual(job.name, tasks.process_image.name)
+        self.assertEqual(job.arguments,
+                         f'[[{post.pk}, "{post.image.name}"], {{}}]')
+        self.assertEqual(drain(), 1)
+        self.assertIsNotNone(thumbnails.cached_thumbnail(post.image, 'card'))
+
+        with mock.patch.object(tasks.process_image, 'delay') as delay:
+            self.client.post(
+                reverse('posts:post_edit', args=[post.pk]),
+                {'text': 'Новый текст'}
+            )
+        delay.assert_not_called()
+
+    def test_responsive_variants(self):
+        """Тест для проверки адаптивных копий картинки в разметке."""
+        buffer = BytesIO()
+        Image.new('RGB', (1600, 900), 'red').save(buffer, 'JPEG')
+        post = Post.objects.create(
+            text='Большая картинка',
+            author=self.user,
+            image=SimpleUploadedFile('big.jpg', buffer.getvalue(),
+                                     content_type='image/jpeg'),
+        )
+        self.assertIsNone(post.image_manifest)
+        drain()
+        post.refresh_from_db()
+        manifest = post.image_manifest
+        self.assertEqual(
+            [variant['format'] for variant in manifest['formats']],
+            variants.supported_formats()
+        )
+        jpeg = manifest['formats'][-1]
+        self.assertEqual([width for name, width in jpeg['files']],
+                         [360, 720, 1080, 1440])
+        name, width = jpeg['files'][0]
+        with Image.open(post.image.storage.open(name)) as image:
+            self.assertEqual(image.size, (360, 150))
+
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, '<picture>')
+        self.assertContains(response, f'{post.image.storage.url(name)} 360w')
+
+        post.image = SimpleUploadedFile('other.gif', SMALL_GIF,
+                                        content_type='image/gif')
+        post.save()
+        self.assertIsNone(post.image_manifest)
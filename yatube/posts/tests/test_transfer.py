@@ -0,0 +1,133 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.utils import timezone
+
+from .. import search, transfer
+from ..cards import card_key
+from ..models import (Comment, Follow, Group, MediaFile, Post,
+                      TimelineEntry, UserCounters)
+
+User = get_user_model()
+
+
+class TransferTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='leo', first_name='Лев', password='secret')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Море и горы',
+            image='posts/ab/cd/abcd.png')
+        cls.other = Post.objects.create(author=cls.reader, text='Без группы')
+        cls.pub_date = timezone.now() - timedelta(days=30)
+        Post.objects.filter(pk=cls.post.pk).update(pub_date=cls.pub_date)
+        Comment.objects.create(post=cls.post, author=cls.reader,
+                               text='Комментарий, с "кавычками"\nи строкой')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def snapshot(self):
+        return {
+            name: list(transfer.rows(name)) for name in transfer.MODELS
+        }
+
+    def wipe(self):
+        for model in (Follow, Comment, Post, Group, User, MediaFile):
+            model.objects.all().delete()
+
+    def round_trip(self, export_to, import_args):
+        before = self.snapshot()
+        out = StringIO()
+        call_command('export_posts', export_to, *import_args, stdout=out)
+        self.assertIn('Выгружено записей: 7', out.getvalue())
+        self.wipe()
+        out = StringIO()
+        call_command('import_posts', export_to, *import_args,
+                     '--batch-size', '1', '--commit-every', '2', stdout=out)
+        self.assertIn('Загружено записей: 7', out.getvalue())
+        self.assertEqual(self.snapshot(), before)
+
+    def check_derived_data(self):
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(post.pub_date, self.pub_date)
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(Group.objects.get().posts_count, 1)
+        counters = UserCounters.objects.get(user=self.author)
+        self.assertEqual(
+            (counters.posts_count, counters.followers_count), (1, 1))
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=self.post).exists())
+        self.assertEqual(MediaFile.objects.get(name=post.image.name).refcount,
+                         1)
+        self.assertEqual(search.search_ids('море', 10), [self.post.pk])
+        self.assertTrue(
+            User.objects.get(username='leo').check_password('secret'))
+        # новые строки получают ключи после загруженных
+        self.assertGreater(
+            Post.objects.create(author=self.author, text='Новый').pk,
+            self.other.pk)
+
+    def test_ndjson_round_trip(self):
+        """Тест для проверки выгрузки и загрузки NDJSON."""
+        path = os.path.join(self.directory, 'dump.ndjson')
+        self.round_trip(path, [])
+        self.check_derived_data()
+        with open(path, encoding='utf-8') as file:
+            records = [json.loads(line) for line in file]
+        self.assertEqual([record['model'] for record in records],
+                         ['user', 'user', 'group', 'post', 'post',
+                          'comment', 'follow'])
+
+    def test_csv_round_trip(self):
+        """Тест для проверки выгрузки и загрузки CSV."""
+        self.round_trip(self.directory, ['--format', 'csv'])
+        self.check_derived_data()
+        self.assertEqual(
+            sorted(os.listdir(self.directory)),
+            sorted(f'{name}.csv' for name in transfer.MODELS))
+
+    def test_conflicts(self):
+        """Тест для проверки загрузки поверх уже существующих записей."""
+        path = os.path.join(self.directory, 'dump.ndjson')
+        call_command('export_posts', path, stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command('import_posts', path, stdout=StringIO())
+        call_command('import_posts', path, '--ignore-conflicts',
+                     stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 2)
+
+    def test_import_drops_cached_cards(self):
+        """Тест для проверки сброса карточек постов после загрузки."""
+        path = os.path.join(self.directory, 'dump.ndjson')
+        call_command('export_posts', path, stdout=StringIO())
+        self.wipe()
+        # карточка другого поста с тем же ключом, например из другой базы
+        cache.set(card_key(self.post.pk), 'Чужая карточка')
+        call_command('import_posts', path, stdout=StringIO())
+        self.assertIsNone(cache.get(card_key(self.post.pk)))
+
+    def test_broken_input(self):
+        """Тест для проверки сообщения о повреждённом файле."""
+        path = os.path.join(self.directory, 'dump.ndjson')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write('{"model": "group", "pk": 5, "fields": {}}\n{oops\n')
+        with self.assertRaisesMessage(CommandError, 'Строка 2'):
+            call_command('import_posts', path, stdout=StringIO())
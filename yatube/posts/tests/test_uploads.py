@@ -0,0 +1,123 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from core.tasks.worker import drain
+
+from ..models import MediaFile, Post
+from ..uploads import NeedMoreData, UnknownFormat, sniff
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def image_bytes(size, image_format, **options):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+class SniffTest(TestCase):
+    def test_dimensions_from_header(self):
+        """Тест для проверки чтения размеров из заголовка файла."""
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        for image_format, options in (('JPEG', {'exif': exif.tobytes()}),
+                                      ('PNG', {}), ('GIF', {})):
+            with self.subTest(image_format=image_format):
+                data = image_bytes((300, 200), image_format, **options)
+                self.assertEqual(sniff(data), (image_format, 300, 200))
+                with self.assertRaises(NeedMoreData):
+                    sniff(data[:10])
+
+    def test_unknown_format(self):
+        """Тест для проверки отказа для файлов, не являющихся картинками."""
+        with self.assertRaises(UnknownFormat):
+            sniff(b'%PDF-1.4 not an image at all')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageUploadTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='leo')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def upload(self, data, name='image.jpg'):
+        return self.client.post(reverse('posts:post_create'), {
+            'text': 'Пост с картинкой',
+            'image': SimpleUploadedFile(name, data),
+        })
+
+    def test_rejects_before_decoding(self):
+        """Тест для проверки отказа по заголовку, без декодирования."""
+        cases = {
+            'IMAGE_UPLOAD_MAX_PIXELS': 100 * 100,
+            'IMAGE_UPLOAD_MAX_BYTES': 1024,
+        }
+        data = image_bytes((400, 300), 'PNG')
+        for setting, value in cases.items():
+            with self.subTest(setting=setting), \
+                    self.settings(**{setting: value}):
+                response = self.upload(data, 'image.png')
+                self.assertFalse(response.context['form'].is_valid())
+                self.assertIn('слишком большое'
+                              if setting == 'IMAGE_UPLOAD_MAX_PIXELS'
+                              else 'слишком большой',
+                              response.context['form'].errors['image'][0])
+        response = self.upload(b'GIF89 broken' * 10, 'image.gif')
+        self.assertIn('JPEG, PNG, GIF или WebP',
+                      response.context['form'].errors['image'][0])
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(IMAGE_UPLOAD_MAX_SIDE=200)
+    def test_strips_exif_and_downscales(self):
+        """Тест для проверки удаления EXIF и уменьшения при загрузке."""
+        exif = Image.Exif()
+        exif[0x0112] = 6  # повернуть на 90° по часовой
+        self.upload(image_bytes((800, 400), 'JPEG', exif=exif.tobytes()))
+        # ещё до фоновой задачи хранится только очищенная картинка
+        post = Post.objects.get()
+        self.assertEqual(MediaFile.objects.get(name=post.image.name).refcount,
+                         1)
+        with Image.open(post.image) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (100, 200))
+            self.assertNotIn('exif', image.info)
+        api_post = self.client.get(
+            reverse('api:post_detail', args=[post.pk])).json()
+        self.assertEqual(api_post['image'], post.image.url)
+        self.assertEqual(api_post['image_variants'], [])
+
+        drain()
+        post.refresh_from_db()
+        api_post = self.client.get(
+            reverse('api:post_detail', args=[post.pk])).json()
+        jpeg = post.image_manifest['formats'][-1]
+        self.assertIn({'url': default_storage.url(jpeg['files'][0][0]),
+                       'width': jpeg['files'][0][1], 'type': 'image/jpeg'},
+                      api_post['image_variants'])
+
+    def test_small_images_are_kept(self):
+        """Тест для проверки сохранения небольших картинок без изменений."""
+        data = image_bytes((100, 50), 'PNG')
+        self.upload(data, 'image.png')
+        with Post.objects.get().image.open('rb') as image:
+            self.assertEqual(image.read(), data)
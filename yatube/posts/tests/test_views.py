@@ -2,15 +2,25 @@
 import shutil
 import tempfile
 from http import HTTPStatus
+from unittest import mock
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase, override_settings
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.test import (Client, RequestFactory, TestCase,
+                         TransactionTestCase, override_settings)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from ..models import Comment, Follow, Group, Post
+from core.db import router
+
+from .. import feed_cache
+from ..models import Comment, Follow, Group, Post, TimelineEntry
+from .utils import QueryBudgetMixin
 
 User = get_user_model()
 
@@ -162,6 +172,7 @@ class ContextTest(TestCase):
         while context_pages:
             context_keys, pages = context_pages.popitem()
             for page in pages:
+                cache.clear()
                 posts = self.authorized_client.get(page).context[context_keys]
                 if isinstance(posts, Post):
                     self.assertIsNotNone(posts.image)
@@ -376,15 +387,59 @@ class TestCacheIndexPage(TestCase):
     def test_cache_for_index_page(self):
         """Тест для проверки кеширования записей на странице index"""
         response_1 = self.authorized_client.get(reverse('posts:index'))
+        with self.assertNumQueries(2):
+            response_2 = self.authorized_client.get(reverse('posts:index'))
+        self.assertEqual(response_1.content, response_2.content)
         self.post_1 = Post.objects.create(
             text='Test text 1',
             author=self.user
         )
-        response_2 = self.authorized_client.get(reverse('posts:index'))
-        self.assertEqual(response_1.content, response_2.content)
-        cache.clear()
         response_3 = self.authorized_client.get(reverse('posts:index'))
         self.assertNotEqual(response_2.content, response_3.content)
+        self.assertContains(response_3, 'Test text 1')
+
+    def test_cache_is_dropped_on_group_change(self):
+        """Тест для проверки сброса кеша ленты группы при новом посте"""
+        group = Group.objects.create(
+            title='Test group',
+            slug='test-slug',
+            description='Test description'
+        )
+        url = reverse('posts:group_posts', kwargs={'slug': group.slug})
+        self.authorized_client.get(url)
+        Post.objects.create(text='Test text 2', author=self.user,
+                            group=group)
+        self.assertContains(self.authorized_client.get(url), 'Test text 2')
+
+    def test_concurrent_miss_waits_for_single_render(self):
+        """Тест для проверки, что при занятой блокировке страница не
+        рендерится повторно"""
+        url = reverse('posts:index')
+        self.authorized_client.get(url)
+        cache.clear()
+        with mock.patch.object(feed_cache.cache, 'add', return_value=False):
+            with mock.patch.object(feed_cache, '_wait_for',
+                                   return_value=None) as wait:
+                self.authorized_client.get(url)
+        wait.assert_called_once()
+
+
+class FeedBumpOnCommitTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='leo')
+
+    def test_bump_is_repeated_on_commit(self):
+        """Тест для проверки, что страница, собранная до фиксации
+        транзакции, не остаётся под новым поколением ленты"""
+        with transaction.atomic():
+            Post.objects.create(text='Новый пост', author=self.user)
+            # здесь другой запрос ещё видит старые строки
+            inside = feed_cache.generations([feed_cache.POSTS])
+        self.assertNotEqual(feed_cache.generations([feed_cache.POSTS]),
+                            inside)
+        self.assertContains(self.client.get(reverse('posts:index')),
+                            'Новый пост')
 
 
 class FollowsTest(TestCase):
@@ -458,3 +513,307 @@ class FollowsTest(TestCase):
             reverse('posts:follow_index')
         )
         self.assertEqual(len(response_2.context['page_obj']), 0)
+
+
+class QueryBudgetTest(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Test group',
+            slug='test-slug',
+            description='Test description'
+        )
+        for i in range(3):
+            author = User.objects.create_user(username=f'author_{i}')
+            Follow.objects.create(user=cls.user, author=author)
+            for j in range(5):
+                post = Post.objects.create(text=f'Тестовый текст {j}',
+                                           author=author, group=cls.group)
+                Comment.objects.create(post=post, author=author,
+                                       text='Комментарий')
+        cls.post = post
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_feed_views_stay_within_query_budget(self):
+        """Тест для проверки, что число запросов страниц не зависит от
+        числа постов и комментариев."""
+        self.assertViewsWithinBudget(self.authorized_client, {
+            reverse('posts:index'): 4,
+            reverse('posts:group_posts',
+                    kwargs={'slug': self.group.slug}): 5,
+            reverse('posts:profile',
+                    kwargs={'username': self.post.author}): 6,
+            reverse('posts:follow_index'): 4,
+            # автор поста для ETag, пока его нет в кэше
+            reverse('posts:post_detail',
+                    kwargs={'post_id': self.post.pk}): 5,
+        })
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='subscriber')
+        cls.author_user = User.objects.create_user(username='author')
+
+    def setUp(self):
+        self.authorized_subscriber = Client()
+        self.authorized_subscriber.force_login(self.user)
+
+    def feed(self):
+        response = self.authorized_subscriber.get(
+            reverse('posts:follow_index')
+        )
+        return [post.pk for post in response.context['page_obj']]
+
+    def test_new_post_is_written_to_follower_timeline(self):
+        """Тест для проверки рассылки нового поста в ленты подписчиков."""
+        Follow.objects.create(user=self.user, author=self.author_user)
+        post = Post.objects.create(text='Тестовый текст',
+                                   author=self.author_user)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.user, post=post).exists())
+        self.assertEqual(self.feed(), [post.pk])
+
+    def test_follow_and_unfollow_update_timeline(self):
+        """Тест для проверки заполнения и очистки ленты при подписке."""
+        post = Post.objects.create(text='Тестовый текст',
+                                   author=self.author_user)
+        self.authorized_subscriber.get(
+            reverse('posts:profile_follow', args=[self.author_user])
+        )
+        self.assertEqual(self.feed(), [post.pk])
+        self.authorized_subscriber.get(
+            reverse('posts:profile_unfollow', args=[self.author_user])
+        )
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user).exists())
+        self.assertEqual(self.feed(), [])
+
+    @override_settings(TIMELINE_FANOUT_THRESHOLD=0)
+    def test_popular_author_is_read_on_request(self):
+        """Тест для проверки чтения постов популярного автора без
+        рассылки."""
+        Follow.objects.create(user=self.user, author=self.author_user)
+        post = Post.objects.create(text='Тестовый текст',
+                                   author=self.author_user)
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.feed(), [post.pk])
+
+    @override_settings(TIMELINE_FANOUT_THRESHOLD=1)
+    def test_author_back_under_threshold_keeps_posts(self):
+        """Тест для проверки, что посты автора, бывшего популярным, не
+        пропадают из ленты после отписки других читателей."""
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=self.user, author=self.author_user)
+        Follow.objects.create(user=other, author=self.author_user)
+        post = Post.objects.create(text='Тестовый текст',
+                                   author=self.author_user)
+        self.assertFalse(TimelineEntry.objects.exists())
+        Follow.objects.get(user=other).delete()
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.user, post=post).exists())
+        self.assertEqual(self.feed(), [post.pk])
+
+
+@override_settings(PAGINATION_MODE='keyset')
+class CursorPaginationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='leo')
+        Post.objects.bulk_create(
+            Post(text=f'Тестовый текст {i}', author=cls.user)
+            for i in range(25)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def walk(self, url):
+        seen = []
+        cursor = ''
+        while cursor is not None:
+            page_obj = self.client.get(
+                url + f'?cursor={cursor}'
+            ).context['page_obj']
+            seen.extend(post.pk for post in page_obj)
+            cursor = page_obj.next_cursor
+        return seen
+
+    def test_cursor_pages_cover_feed(self):
+        """Тест для проверки обхода ленты по курсорам без пропусков."""
+        expected = list(
+            Post.objects.order_by('-pub_date', '-id').values_list(
+                'pk', flat=True)
+        )
+        self.assertEqual(self.walk(reverse('posts:index')), expected)
+        self.assertEqual(
+            self.walk(reverse('posts:profile',
+                              kwargs={'username': self.user.username})),
+            expected
+        )
+
+    def test_previous_cursor_returns_previous_page(self):
+        """Тест для проверки перехода на предыдущую страницу по курсору."""
+        url = reverse('posts:index')
+        first = self.client.get(url).context['page_obj']
+        second = self.client.get(
+            url + f'?cursor={first.next_cursor}'
+        ).context['page_obj']
+        cache.clear()
+        back = self.client.get(
+            url + f'?cursor={second.previous_cursor}'
+        ).context['page_obj']
+        self.assertEqual([post.pk for post in back],
+                         [post.pk for post in first])
+        self.assertFalse(first.has_previous())
+        self.assertTrue(back.has_next())
+
+    def test_deep_page_costs_same_as_first(self):
+        """Тест для проверки, что дальние страницы не требуют COUNT/OFFSET."""
+        url = reverse('posts:index')
+        first = self.client.get(url).context['page_obj']
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url + f'?cursor={first.next_cursor}')
+        for query in queries.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'])
+            self.assertNotIn('OFFSET', query['sql'])
+
+    def test_broken_cursor_shows_first_page(self):
+        """Тест для проверки, что испорченный курсор ведет на первую
+        страницу."""
+        response = self.client.get(reverse('posts:index') + '?cursor=@@@')
+        self.assertEqual(len(response.context['page_obj']),
+                         settings.COUNT_OF_POSTS)
+
+
+@override_settings(COMMENTS_PER_PAGE=4)
+class CommentPaginationTest(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='leo')
+        cls.post = Post.objects.create(text='Тестовый пост', author=cls.user)
+        for i in range(10):
+            author = User.objects.create_user(username=f'reader_{i}')
+            Comment.objects.create(post=cls.post, author=author,
+                                   text=f'Комментарий {i}')
+
+    def test_comments_are_loaded_page_by_page(self):
+        """Тест для проверки, что комментарии идут по порядку: первая
+        страница на странице поста, следующие - по курсору во фрагменте."""
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}))
+        page_obj = response.context['comments']
+        texts = [comment.text for comment in page_obj]
+        url = reverse('posts:post_comments', kwargs={'post_id': self.post.pk})
+        self.assertContains(response, f'{url}?cursor={page_obj.next_cursor}')
+        while page_obj.has_next():
+            response = self.client.get(
+                url, {'cursor': page_obj.next_cursor})
+            self.assertTemplateUsed(response, 'posts/includes/comments.html')
+            self.assertNotContains(response, '<html')
+            page_obj = response.context['comments']
+            texts.extend(comment.text for comment in page_obj)
+        self.assertEqual(texts, [f'Комментарий {i}' for i in range(10)])
+        self.assertNotContains(response, 'data-fragment')
+
+    def test_fragment_query_budget(self):
+        """Тест для проверки, что фрагмент не запрашивает авторов по
+        одному."""
+        self.assertViewsWithinBudget(self.client, {
+            reverse('posts:post_comments',
+                    kwargs={'post_id': self.post.pk}): 1,
+        })
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='leo')
+        cls.post = Post.objects.create(text='Тестовый пост', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def assertNotModified(self, url, **headers):
+        with self.assertNumQueries(0):
+            response = self.client.get(url, **headers)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+        return response
+
+    def test_feed_validators(self):
+        """Тест для проверки ответа 304 для неизменившейся ленты."""
+        url = reverse('posts:index')
+        response = self.client.get(url)
+        self.assertIn('no-cache', response['Cache-Control'])
+        etag = response['ETag']
+        self.assertEqual(
+            self.assertNotModified(url, HTTP_IF_NONE_MATCH=etag)['ETag'],
+            etag)
+        self.assertNotModified(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        # другая страница - другой валидатор
+        self.assertNotEqual(self.client.get(url + '?page=2')['ETag'], etag)
+
+        Post.objects.create(text='Новый пост', author=self.user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Новый пост')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_post_detail_validators(self):
+        """Тест для проверки ответа 304 для неизменившейся страницы
+        поста."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        etag = self.client.get(url)['ETag']
+        self.assertNotModified(url, HTTP_IF_NONE_MATCH=etag)
+
+        Comment.objects.create(post=self.post, author=self.user,
+                               text='Комментарий')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Комментарий')
+        etag = response['ETag']
+        # число постов автора тоже есть на странице
+        Post.objects.create(text='Ещё пост', author=self.user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+        missing = reverse('posts:post_detail', kwargs={'post_id': 999})
+        self.assertEqual(self.client.get(missing).status_code,
+                         HTTPStatus.NOT_FOUND)
+
+    def test_validators_are_personal(self):
+        """Тест для проверки, что страницы разных пользователей имеют
+        разные валидаторы."""
+        url = reverse('posts:index')
+        etag = self.client.get(url)['ETag']
+        client = Client()
+        client.force_login(self.user)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_view_reads_primary(self):
+        """Тест для проверки, что страница с валидаторами читается из
+        основной базы."""
+        pinned = []
+
+        @feed_cache.condition(feed_cache.POSTS)
+        def view(request):
+            pinned.append(router.is_pinned())
+            return HttpResponse('Страница')
+
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        response = view(request)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(pinned, [True])
+        self.assertFalse(router.is_pinned())
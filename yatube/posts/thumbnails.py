@@ -0,0 +1,72 @@
+"""
+Background pre-generation of post thumbnails.
+
+Templates never resize images themselves: ``{% post_thumbnail %}`` only
+looks the thumbnail up in the sorl-thumbnail key-value store and shows a
+placeholder while it is missing. The geometries templates may ask for are
+listed in ``settings.THUMBNAIL_GEOMETRIES``; when a post gets a new image
+all of them are rendered by ``pregenerate`` in the ``process_image``
+background task, then the cached cards and feed pages of the post are
+dropped so the next request picks the thumbnail up.
+"""
+from django.conf import settings
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.shortcuts import get_thumbnail
+
+from core import instrumentation
+from core.instrumentation.metrics import THUMBNAIL_SECONDS
+
+from . import feed_cache, variants
+from .cards import invalidate_cards
+from .models import Post
+
+
+def _options(source, options):
+    """Options completed the way ``ThumbnailBackend.get_thumbnail`` does."""
+    backend = default.backend
+    options = dict(options)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    return options
+
+
+def thumbnail_name(source, alias):
+    """Storage name of the ``alias`` thumbnail of a sorl ``ImageFile``."""
+    geometry, options = settings.THUMBNAIL_GEOMETRIES[alias]
+    return default.backend._get_thumbnail_filename(
+        source, geometry, _options(source, options)
+    )
+
+
+def cached_thumbnail(image, alias):
+    """
+    Thumbnail of ``image`` for a geometry alias if it has been generated,
+    ``None`` otherwise. Never touches the storage or the image itself.
+    """
+    if not image:
+        return None
+    name = thumbnail_name(ImageFile(image), alias)
+    return default.kvstore.get(ImageFile(name, default.storage))
+
+
+def pregenerate(post_id):
+    """Render every configured thumbnail and variant of the post's image."""
+    post = (Post.objects.select_related('author')
+            .filter(pk=post_id).first())
+    if post is None or not post.image:
+        return
+    with instrumentation.timed('thumbnail', THUMBNAIL_SECONDS):
+        for geometry, options in settings.THUMBNAIL_GEOMETRIES.values():
+            get_thumbnail(post.image, geometry, **options)
+        variants.build(post)
+    invalidate_cards([post.pk])
+    feed_cache.bump_post(post)
@@ -0,0 +1,120 @@
+"""
+Per-user follow timeline.
+
+Posts are pushed into ``TimelineEntry`` rows of every follower when they
+are written (fan-out-on-write). Authors with more followers than
+``settings.TIMELINE_FANOUT_THRESHOLD`` are skipped on write and merged in
+on read instead (fan-out-on-read), so one post never turns into
+millions of inserts. An author who loses followers down to the threshold
+is fanned out on write again, so the posts written meanwhile are copied
+into the timelines of the followers at that moment.
+"""
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+
+from .models import Follow, Post, TimelineEntry, UserCounters
+
+
+def popular_authors():
+    """Authors whose posts are not fanned out on write."""
+    return UserCounters.objects.filter(
+        followers_count__gt=settings.TIMELINE_FANOUT_THRESHOLD
+    ).values('user')
+
+
+def is_popular(author_id):
+    return popular_authors().filter(user=author_id).exists()
+
+
+def fan_out_post(post):
+    """Deliver a new post to the timelines of the author's followers."""
+    if is_popular(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post=post) for user_id in followers),
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill(user_id, author_id):
+    """Copy the posts of a newly followed author into the timeline."""
+    if is_popular(author_id):
+        return
+    posts = Post.objects.filter(
+        author_id=author_id
+    ).values_list('pk', flat=True)
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post_id=post_id)
+         for post_id in posts.iterator()),
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def rebuild(author_id=None):
+    """
+    Fill in the missing entries of every timeline, or of the followers of
+    one author; used after rows were loaded past the signals. A single
+    ``INSERT ... SELECT`` over the join of follows and posts, the rows
+    never leave the database.
+    """
+    pairs = Follow.objects.exclude(
+        author__in=popular_authors()
+    ).filter(author__posts__isnull=False)
+    if author_id is not None:
+        pairs = pairs.filter(author_id=author_id)
+    pairs = pairs.values_list('user_id', 'author__posts').order_by()
+    select, params = pairs.query.sql_with_params()
+    ops = connection.ops
+    columns = ', '.join(
+        ops.quote_name(TimelineEntry._meta.get_field(name).column)
+        for name in ('user', 'post')
+    )
+    statement = ' '.join((
+        ops.insert_statement(ignore_conflicts=True),
+        ops.quote_name(TimelineEntry._meta.db_table),
+        f'({columns})',
+        select,
+        ops.ignore_conflicts_suffix_sql(ignore_conflicts=True),
+    ))
+    with connection.cursor() as cursor:
+        cursor.execute(statement, params)
+        return cursor.rowcount
+
+
+def lost_follower(author_id):
+    """
+    Called once an author has lost a follower: an author who is back at
+    the threshold gets the posts read on request until now materialized,
+    or they would drop out of the followers' timelines.
+    """
+    if UserCounters.objects.filter(
+        user=author_id,
+        followers_count=settings.TIMELINE_FANOUT_THRESHOLD
+    ).exists():
+        rebuild(author_id)
+
+
+def evict(user_id, author_id):
+    """Drop the posts of an unfollowed author from the timeline."""
+    TimelineEntry.objects.filter(
+        user_id=user_id,
+        post__author_id=author_id
+    ).delete()
+
+
+def follow_feed(user):
+    """Posts of the followed authors, read from the materialized timeline."""
+    followed_popular = Follow.objects.filter(
+        user=user,
+        author__in=popular_authors()
+    ).values('author')
+    return Post.objects.filter(
+        Q(pk__in=TimelineEntry.objects.filter(user=user).values('post'))
+        | Q(author__in=followed_popular)
+    )
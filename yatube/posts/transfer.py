@@ -0,0 +1,257 @@
+"""
+Streaming export and import of users, groups, posts, comments and follows.
+
+Two formats are understood:
+
+* ``ndjson``: one file, one JSON object per line,
+  ``{"model": "post", "pk": 1, "fields": {...}}``, models in dependency
+  order;
+* ``csv``: a directory with one ``<model>.csv`` per model, ``pk`` and the
+  fields as columns.
+
+Export walks every table with a server-side ``iterator()`` and writes rows
+as they come, import reads records one by one and inserts them with
+``bulk_create`` in batches, committing every ``commit_every`` records, so
+neither keeps more than a batch in memory. Primary keys are kept, which
+keeps the references between the rows. Counters, timelines, the search
+index and media reference counts are derived data: they are not
+transferred but rebuilt once the rows are in, and the cached cards of the
+posts are dropped.
+"""
+import csv
+import json
+import os
+import time
+from contextlib import contextmanager
+from itertools import chain, groupby, islice
+
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+from . import counters, feed_cache, media, search, timeline
+from .cards import invalidate_cards
+from .models import Comment, Follow, Group, Post, User
+
+# export order satisfies every foreign key
+MODELS = {
+    'user': (User, ('username', 'password', 'first_name', 'last_name',
+                    'email', 'is_active', 'is_staff', 'is_superuser',
+                    'last_login', 'date_joined')),
+    'group': (Group, ('title', 'slug', 'description')),
+    'post': (Post, ('text', 'pub_date', 'author', 'group', 'image')),
+    'comment': (Comment, ('post', 'author', 'text', 'created')),
+    'follow': (Follow, ('user', 'author')),
+}
+FORMATS = ('ndjson', 'csv')
+
+
+class TransferError(Exception):
+    pass
+
+
+def _fields(name):
+    model, names = MODELS[name]
+    return [model._meta.get_field(field) for field in names]
+
+
+def rows(name, batch_size=1000):
+    """``(pk, {field: value})`` of every row of a model, by primary key."""
+    model, names = MODELS[name]
+    attnames = [field.attname for field in _fields(name)]
+    queryset = model.objects.order_by('pk').values_list('pk', *attnames)
+    for pk, *values in queryset.iterator(chunk_size=batch_size):
+        yield pk, dict(zip(names, values))
+
+
+def _json_value(value):
+    # DjangoJSONEncoder would cut datetimes down to milliseconds
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def export_ndjson(file, names=None, batch_size=1000, progress=None):
+    """Write the models to a text file; returns ``{model: rows}``."""
+    encoder = json.JSONEncoder(ensure_ascii=False, default=_json_value)
+    report = {}
+    for name in names or MODELS:
+        total = 0
+        for pk, fields in rows(name, batch_size):
+            file.write(encoder.encode(
+                {'model': name, 'pk': pk, 'fields': fields}) + '\n')
+            total += 1
+            if progress:
+                progress(name, total)
+        report[name] = total
+    return report
+
+
+def export_csv(directory, names=None, batch_size=1000, progress=None):
+    """Write ``<model>.csv`` files into a directory."""
+    os.makedirs(directory, exist_ok=True)
+    report = {}
+    for name in names or MODELS:
+        total = 0
+        path = os.path.join(directory, f'{name}.csv')
+        with open(path, 'w', encoding='utf-8', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(['pk', *MODELS[name][1]])
+            for pk, fields in rows(name, batch_size):
+                writer.writerow(
+                    [pk, *(_csv_value(value) for value in fields.values())])
+                total += 1
+                if progress:
+                    progress(name, total)
+        report[name] = total
+    return report
+
+
+def read_ndjson(file):
+    """``(model, pk, fields)`` records of an NDJSON file."""
+    for number, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            yield record['model'], record['pk'], record['fields']
+        except (ValueError, KeyError, TypeError) as error:
+            raise TransferError(f'Строка {number}: {error}') from error
+
+
+def read_csv(directory, names=None):
+    """``(model, pk, fields)`` records of the CSV files of a directory."""
+    for name in names or MODELS:
+        path = os.path.join(directory, f'{name}.csv')
+        if not os.path.exists(path):
+            continue
+        with open(path, encoding='utf-8', newline='') as file:
+            for row in csv.DictReader(file):
+                pk = row.pop('pk')
+                yield name, pk, row
+
+
+def _instance(name, pk, fields):
+    model, names = MODELS[name]
+    values = {'pk': model._meta.pk.to_python(pk)}
+    for field in _fields(name):
+        value = fields.get(field.name)
+        # CSV has no NULL, an empty cell stands for it
+        if value == '' and field.null:
+            value = None
+        try:
+            values[field.attname] = field.to_python(value)
+        except Exception as error:
+            raise TransferError(
+                f'{name} {pk}: {field.name}: {error}') from error
+    return model(**values)
+
+
+@contextmanager
+def keeping_dates():
+    """Let ``bulk_create`` keep imported ``auto_now_add`` dates."""
+    fields = [
+        field for model, _ in MODELS.values()
+        for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now_add', False)
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def load(records, batch_size=1000, commit_every=50000, progress=None,
+         ignore_conflicts=False):
+    """
+    Insert ``(model, pk, fields)`` records. Every ``commit_every`` of them
+    are one transaction, inserted ``batch_size`` rows per statement.
+    Returns ``{model: records}``.
+    """
+    report = dict.fromkeys(MODELS, 0)
+    records = iter(records)
+    with keeping_dates():
+        for first in records:
+            chunk = chain([first], islice(records, commit_every - 1))
+            with transaction.atomic():
+                for name, group in groupby(chunk, key=lambda r: r[0]):
+                    if name not in MODELS:
+                        raise TransferError(f'Неизвестная модель: {name}')
+                    for batch in _chunks(group, batch_size):
+                        MODELS[name][0].objects.bulk_create(
+                            [_instance(*record) for record in batch],
+                            ignore_conflicts=ignore_conflicts,
+                        )
+                        report[name] += len(batch)
+                        if progress:
+                            progress(name, report[name])
+    return report
+
+
+def finish(batch_size=1000):
+    """Rebuild everything the imported rows imply."""
+    statements = connection.ops.sequence_reset_sql(
+        no_style(), [model for model, _ in MODELS.values()])
+    if statements:
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+    counters.rebuild(batch_size=batch_size)
+    timeline.rebuild()
+    media.recount()
+    search.rebuild(batch_size=batch_size)
+    # cards cached before the import may show other rows under the same
+    # keys, or groups and names the import has changed
+    post_ids = Post.objects.values_list('pk', flat=True)
+    for chunk in _chunks(post_ids.iterator(chunk_size=batch_size),
+                         batch_size):
+        invalidate_cards(chunk)
+    feed_cache.bump(feed_cache.SITE, feed_cache.POSTS)
+
+
+class Progress:
+    """Prints the number of rows per model at most every ``interval`` s."""
+    def __init__(self, write, interval=1.0):
+        self.write = write
+        self.interval = interval
+        self.started = self.shown = time.monotonic()
+        self.model = None
+        self.count = 0
+
+    def __call__(self, name, count):
+        if name != self.model:
+            self.flush()
+            self.model = name
+        self.count = count
+        now = time.monotonic()
+        if now - self.shown >= self.interval:
+            self.show(now)
+
+    def show(self, now):
+        self.shown = now
+        rate = self.count / max(now - self.started, 1e-9)
+        self.write(f'{self.model}: {self.count} ({rate:.0f} в секунду)')
+
+    def flush(self):
+        if self.model is not None:
+            self.show(time.monotonic())
+        self.started = time.monotonic()
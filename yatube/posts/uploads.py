@@ -0,0 +1,235 @@
+"""
+Streaming intake of post images.
+
+``ImageUploadHandler`` looks at the first bytes of every upload in
+``settings.IMAGE_UPLOAD_FIELDS`` and reads the format and dimensions
+straight from the file header, so uploads that are not images, are too
+large or have too many pixels are turned down before any of them is
+decoded; the rest of a rejected body is read and thrown away, not kept.
+Accepted images are then decoded exactly once by ``ingest``, still in the
+request, so what gets stored and served never carries the uploader's
+metadata: it bakes the EXIF orientation in, drops the rest of it and
+downscales the picture to ``settings.IMAGE_UPLOAD_MAX_SIDE``. Thumbnails
+and variants are left to the ``process_image`` task.
+"""
+import struct
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import InMemoryUploadedFile, UploadedFile
+from django.core.files.uploadhandler import (FileUploadHandler,
+                                             StopFutureHandlers)
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps
+
+FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+
+# SOFn markers carrying the frame size; DHT, JPG and DAC share the range
+JPEG_FRAME_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# markers without a length field
+JPEG_STANDALONE_MARKERS = {0x01, *range(0xD0, 0xD9)}
+
+SAVE_OPTIONS = {
+    'JPEG': {'optimize': True},
+    'PNG': {'optimize': True},
+    'WEBP': {},
+    'GIF': {},
+}
+
+
+class NeedMoreData(Exception):
+    pass
+
+
+class UnknownFormat(Exception):
+    pass
+
+
+def _jpeg_size(header):
+    position = 2
+    while True:
+        if position + 4 > len(header):
+            raise NeedMoreData
+        if header[position] != 0xFF:
+            raise UnknownFormat
+        marker = header[position + 1]
+        if marker == 0xFF:
+            position += 1
+            continue
+        if marker in JPEG_STANDALONE_MARKERS:
+            position += 2
+            continue
+        if marker in JPEG_FRAME_MARKERS:
+            if position + 9 > len(header):
+                raise NeedMoreData
+            height, width = struct.unpack_from('>HH', header, position + 5)
+            return width, height
+        length, = struct.unpack_from('>H', header, position + 2)
+        position += 2 + length
+
+
+def _webp_size(header):
+    if len(header) < 30:
+        raise NeedMoreData
+    chunk = header[12:16]
+    if chunk == b'VP8 ':
+        width, height = struct.unpack_from('<HH', header, 26)
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b'VP8L':
+        b0, b1, b2, b3 = header[21:25]
+        width = 1 + (((b1 & 0x3F) << 8) | b0)
+        height = 1 + (((b3 & 0x0F) << 10) | (b2 << 2) | ((b1 & 0xC0) >> 6))
+        return width, height
+    if chunk == b'VP8X':
+        width = int.from_bytes(header[24:27], 'little') + 1
+        height = int.from_bytes(header[27:30], 'little') + 1
+        return width, height
+    raise UnknownFormat
+
+
+def sniff(header):
+    """
+    ``(format, width, height)`` of the image starting with ``header``.
+
+    Raises ``NeedMoreData`` when the header is not complete yet and
+    ``UnknownFormat`` when the bytes are not one of ``FORMATS``.
+    """
+    if len(header) < 12:
+        raise NeedMoreData
+    if header.startswith(b'\xFF\xD8'):
+        return ('JPEG', *_jpeg_size(header))
+    if header.startswith(b'\x89PNG\r\n\x1a\n'):
+        if len(header) < 24:
+            raise NeedMoreData
+        return ('PNG', *struct.unpack_from('>II', header, 16))
+    if header[:6] in (b'GIF87a', b'GIF89a'):
+        return ('GIF', *struct.unpack_from('<HH', header, 6))
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return ('WEBP', *_webp_size(header))
+    raise UnknownFormat
+
+
+class RejectedUpload(UploadedFile):
+    """Stand-in for an upload the handler refused, with the reason."""
+    def __init__(self, name, content_type, error):
+        super().__init__(BytesIO(), name, content_type, 0)
+        self.upload_error = error
+
+
+class ImageUploadHandler(FileUploadHandler):
+    """
+    Takes over image fields from the default handlers: checks the header
+    as it streams in and spools the data to a temporary file.
+    """
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.active = field_name in settings.IMAGE_UPLOAD_FIELDS
+        if not self.active:
+            return
+        self.header = b''
+        self.image_info = None
+        self.error = None
+        self.size = 0
+        self.file = tempfile.SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE,
+            dir=settings.FILE_UPLOAD_TEMP_DIR,
+        )
+        if (self.content_length or 0) > settings.IMAGE_UPLOAD_MAX_BYTES:
+            self._reject_size()
+        raise StopFutureHandlers()
+
+    def _reject(self, error):
+        self.error = error
+        self.file.close()
+
+    def _reject_size(self):
+        self._reject(
+            'Файл слишком большой, можно не больше %s.'
+            % filesizeformat(settings.IMAGE_UPLOAD_MAX_BYTES)
+        )
+
+    def _check_header(self):
+        try:
+            self.image_info = sniff(self.header)
+        except NeedMoreData:
+            if len(self.header) > settings.IMAGE_UPLOAD_HEADER_BYTES:
+                self._reject('Не удалось прочитать размер изображения.')
+            return
+        except UnknownFormat:
+            self._reject('Загрузите изображение в формате '
+                         'JPEG, PNG, GIF или WebP.')
+            return
+        self.header = b''
+        image_format, width, height = self.image_info
+        if width * height > settings.IMAGE_UPLOAD_MAX_PIXELS:
+            self._reject(
+                f'Изображение {width}×{height} слишком большое, можно не '
+                f'больше {settings.IMAGE_UPLOAD_MAX_PIXELS // 10 ** 6} Мп.'
+            )
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.active:
+            return raw_data
+        if self.error:
+            return None
+        self.size += len(raw_data)
+        if self.size > settings.IMAGE_UPLOAD_MAX_BYTES:
+            self._reject_size()
+            return None
+        if self.image_info is None:
+            self.header += raw_data
+            self._check_header()
+            if self.error:
+                return None
+        self.file.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        if not self.active:
+            return None
+        if not self.error and self.image_info is None:
+            self._reject('Не удалось прочитать размер изображения.')
+        if self.error:
+            return RejectedUpload(self.file_name, self.content_type,
+                                  self.error)
+        self.file.seek(0)
+        upload = UploadedFile(
+            self.file, self.file_name, self.content_type, file_size,
+            self.charset, self.content_type_extra
+        )
+        upload.image_info = self.image_info
+        return upload
+
+
+def ingest(upload):
+    """
+    Decode an accepted image once: apply and drop EXIF, fit it into
+    ``IMAGE_UPLOAD_MAX_SIDE``. Small images without metadata are kept
+    as they are, so are animated GIFs.
+    """
+    max_side = settings.IMAGE_UPLOAD_MAX_SIDE
+    upload.seek(0)
+    image = Image.open(upload)
+    image_format = image.format
+    if image_format not in FORMATS or getattr(image, 'is_animated', False):
+        return upload
+    if 'exif' not in image.info and max(image.size) <= max_side:
+        return upload
+    if image_format == 'JPEG':
+        # let libjpeg decode straight at 1/2, 1/4 or 1/8 of the size
+        image.draft('RGB', (max_side, max_side))
+    icc_profile = image.info.get('icc_profile')
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+    options = dict(SAVE_OPTIONS[image_format])
+    if image_format in ('JPEG', 'WEBP'):
+        options['quality'] = settings.IMAGE_UPLOAD_QUALITY
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    if icc_profile:
+        options['icc_profile'] = icc_profile
+    buffer = BytesIO()
+    image.save(buffer, image_format, **options)
+    return InMemoryUploadedFile(buffer, None, upload.name,
+                                Image.MIME[image_format], buffer.tell(), None)
@@ -1,8 +1,178 @@
+import base64
+import binascii
+import hashlib
+import json
+
 from django.conf import settings
-from django.core.paginator import Paginator
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_position(position, backwards=False):
+    """Pack a keyset position into an opaque URL-safe token."""
+    payload = json.dumps({'p': position, 'r': backwards},
+                         separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_position(cursor):
+    """Inverse of ``encode_position``: return ``(position, backwards)``."""
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(cursor + padding))
+        return list(payload['p']), bool(payload.get('r'))
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise InvalidCursor(cursor)
+
+
+class CursorPage(Page):
+    """ Page of a keyset paginated list, navigated by opaque cursors """
+    # extra GET parameters the navigation links must keep, e.g. ``q=..``
+    query_string = ''
+
+    def __init__(self, object_list, paginator,
+                 next_cursor=None, previous_cursor=None):
+        super().__init__(object_list, None, paginator)
+        self.is_cursor = True
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<Cursor page of %s items>' % len(self.object_list)
+
+    @property
+    def query_prefix(self):
+        return f'?{self.query_string}&' if self.query_string else '?'
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+class CursorPaginator(Paginator):
+    """
+    Keyset (seek) paginator.
+
+    Pages are selected with ``WHERE (pub_date, id) < (..)`` instead of
+    ``OFFSET``, so every page costs the same as the first one, and no
+    ``COUNT(*)`` runs unless an approximate total is asked for.
+    """
+    def __init__(self, object_list, per_page,
+                 ordering=('-pub_date', '-id'), approximate_total=False):
+        self.ordering = tuple(ordering)
+        self.approximate_total = approximate_total
+        super().__init__(object_list.order_by(*self.ordering), per_page)
+
+    @cached_property
+    def count(self):
+        """Total number of objects, cached for a while when approximate."""
+        if not self.approximate_total:
+            return super().count
+        query = str(self.object_list.query).encode()
+        key = 'paginator_total:' + hashlib.md5(query).hexdigest()
+        return cache.get_or_set(
+            key,
+            self.object_list.count,
+            settings.PAGINATION_TOTAL_TIMEOUT
+        )
+
+    def _fields(self):
+        model = self.object_list.model
+        return [
+            model._meta.get_field(name.lstrip('-')) for name in self.ordering
+        ]
+
+    def encode_cursor(self, obj, backwards=False):
+        position = []
+        for field in self._fields():
+            value = field.value_from_object(obj)
+            if not isinstance(value, (int, str, type(None))):
+                value = field.value_to_string(obj)
+            position.append(value)
+        return encode_position(position, backwards)
+
+    def decode_cursor(self, cursor):
+        raw, backwards = decode_position(cursor)
+        fields = self._fields()
+        if len(raw) != len(fields):
+            raise InvalidCursor(cursor)
+        try:
+            position = [
+                field.to_python(value) for field, value in zip(fields, raw)
+            ]
+        except ValidationError:
+            raise InvalidCursor(cursor)
+        return position, backwards
+
+    def _seek(self, position, backwards):
+        """Build ``(a, b) < (x, y)`` as ``a < x OR (a = x AND b < y)``."""
+        condition = Q()
+        equal = {}
+        for name, value in zip(self.ordering, position):
+            descending = name.startswith('-')
+            field = name.lstrip('-')
+            lookup = 'lt' if descending != backwards else 'gt'
+            condition |= Q(**equal, **{f'{field}__{lookup}': value})
+            equal[field] = value
+        return condition
+
+    def _reversed_ordering(self):
+        return tuple(
+            name[1:] if name.startswith('-') else '-' + name
+            for name in self.ordering
+        )
+
+    def get_page(self, cursor=None):
+        """
+        Return the page after (or before, for backward cursors) the
+        position encoded in ``cursor``. Broken cursors give the first page.
+        """
+        position, backwards = None, False
+        if cursor:
+            try:
+                position, backwards = self.decode_cursor(cursor)
+            except InvalidCursor:
+                pass
+        queryset = self.object_list
+        if position is not None:
+            queryset = queryset.filter(self._seek(position, backwards))
+        if backwards:
+            queryset = queryset.order_by(*self._reversed_ordering())
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            if not rows:
+                return self.get_page()
+            rows.reverse()
+            next_cursor = self.encode_cursor(rows[-1])
+            previous_cursor = (self.encode_cursor(rows[0], backwards=True)
+                               if has_more else None)
+        else:
+            next_cursor = (self.encode_cursor(rows[-1])
+                           if has_more else None)
+            previous_cursor = (self.encode_cursor(rows[0], backwards=True)
+                               if position is not None and rows else None)
+        return CursorPage(rows, self, next_cursor, previous_cursor)
 
 
 def use_paginator(request, post_list):
+    if settings.PAGINATION_MODE == 'keyset' or 'cursor' in request.GET:
+        paginator = CursorPaginator(
+            post_list,
+            settings.COUNT_OF_POSTS,
+            approximate_total=settings.PAGINATION_APPROXIMATE_TOTAL
+        )
+        return paginator.get_page(request.GET.get('cursor'))
     paginator = Paginator(post_list, settings.COUNT_OF_POSTS)
     page_number = request.GET.get('page')
     return paginator.get_page(page_number)
@@ -0,0 +1,120 @@
+"""
+Responsive variants of post images.
+
+Every image is cropped to the card's aspect ratio and saved at each width
+of ``settings.IMAGE_VARIANT_WIDTHS`` in each format of
+``settings.IMAGE_VARIANT_FORMATS`` the installed Pillow can write; JPEG is
+always added as the fallback. The resulting manifest is stored on the post,
+so ``{% post_picture %}`` builds its ``srcset`` without touching the
+storage.
+"""
+import json
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from .models import Post
+
+MIME_TYPES = {
+    'AVIF': 'image/avif',
+    'WEBP': 'image/webp',
+    'JPEG': 'image/jpeg',
+}
+
+EXTENSIONS = {
+    'AVIF': 'avif',
+    'WEBP': 'webp',
+    'JPEG': 'jpg',
+}
+
+
+def supported_formats():
+    """Configured formats Pillow can save, best first, JPEG last."""
+    Image.init()
+    formats = [
+        name for name in settings.IMAGE_VARIANT_FORMATS
+        if name != 'JPEG' and name in Image.SAVE
+    ]
+    return formats + ['JPEG']
+
+
+def _aspect_ratio():
+    geometry = settings.THUMBNAIL_GEOMETRIES['card'][0]
+    width, height = (int(side) for side in geometry.split('x'))
+    return width / height
+
+
+def _widths(source_width):
+    """Configured widths not larger than the source, at least one."""
+    widths = [
+        width for width in sorted(settings.IMAGE_VARIANT_WIDTHS)
+        if width <= source_width
+    ]
+    return widths or [min(settings.IMAGE_VARIANT_WIDTHS)]
+
+
+def variant_name(image_name, width, image_format):
+    stem = os.path.splitext(os.path.basename(image_name))[0]
+    return (f'variants/{stem}/{width}w.'
+            f'{EXTENSIONS[image_format]}')
+
+
+def _encode(image, image_format):
+    buffer = BytesIO()
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    image.save(buffer, image_format,
+               quality=settings.IMAGE_VARIANT_QUALITY, optimize=True)
+    return buffer.getvalue()
+
+
+def _save(name, content):
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    return default_storage.save(name, ContentFile(content))
+
+
+def build_manifest(image):
+    """Write every variant of ``image`` and describe them."""
+    with image.open('rb') as file:
+        source = Image.open(file)
+        source = ImageOps.exif_transpose(source)
+        if source.mode not in ('RGB', 'RGBA'):
+            source = source.convert('RGBA' if 'A' in source.getbands()
+                                    else 'RGB')
+        ratio = _aspect_ratio()
+        width = min(source.width, round(source.height * ratio))
+        cropped = ImageOps.fit(source, (width, round(width / ratio)),
+                               method=Image.LANCZOS)
+    widths = _widths(cropped.width)
+    manifest = {'source': image.name, 'ratio': ratio, 'formats': []}
+    for image_format in supported_formats():
+        files = []
+        for width in widths:
+            resized = cropped.resize((width, round(width / ratio)),
+                                     Image.LANCZOS)
+            name = _save(variant_name(image.name, width, image_format),
+                         _encode(resized, image_format))
+            files.append([name, width])
+        manifest['formats'].append({
+            'format': image_format,
+            'type': MIME_TYPES[image_format],
+            'files': files,
+        })
+    return manifest
+
+
+def build(post):
+    """Build and store the variant manifest of ``post``."""
+    if not post.image:
+        return None
+    manifest = build_manifest(post.image)
+    post.image_variants = json.dumps(manifest)
+    Post.objects.filter(pk=post.pk, image=post.image.name).update(
+        image_variants=post.image_variants
+    )
+    return manifest
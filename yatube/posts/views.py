@@ -1,15 +1,20 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.core.cache import cache
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
 
+from . import search as post_search
+from .counters import user_counters
+from .feed_cache import POSTS, SITE, cache_feed, condition
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
-from .utilites import use_paginator
+from .models import Comment, Follow, Group, Post, User
+from .timeline import follow_feed
+from .utilites import CursorPaginator, use_paginator
 
 
-@cache_page(20, key_prefix='index_page')
+@cache_feed(POSTS, SITE)
 def index(request):
-    post_list = Post.objects.all()
+    post_list = Post.objects.for_page('feed')
     page_obj = use_paginator(request, post_list)
     context = {
         'page_obj': page_obj,
@@ -17,9 +22,10 @@ def index(request):
     return render(request, 'posts/index.html', context)
 
 
+@cache_feed(SITE, 'group:{slug}')
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
+    post_list = group.posts.for_page('group')
     page_obj = use_paginator(request, post_list)
     context = {
         'group': group,
@@ -28,6 +34,18 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = None
+    if query:
+        page_obj = post_search.search_posts(query, request.GET.get('cursor'))
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(request.POST or None,
@@ -65,18 +83,52 @@ def post_edit(request, post_id):
     return render(request, 'posts/create_post.html', context)
 
 
+def _comments_page(request, post_id):
+    paginator = CursorPaginator(
+        Comment.objects.filter(post_id=post_id).for_page('detail'),
+        settings.COMMENTS_PER_PAGE,
+        ordering=('created', 'id'),
+    )
+    return paginator.get_page(request.GET.get('cursor'))
+
+
+def _post_author(post_id):
+    # a post never changes its author
+    key = f'post_author:{post_id}'
+    author_id = cache.get(key)
+    if author_id is None:
+        author_id = Post.objects.filter(pk=post_id).values_list(
+            'author_id', flat=True).first()
+        if author_id is None:
+            return None
+        cache.set(key, author_id, settings.FEED_CACHE_TIMEOUT)
+    return {'author_id': author_id}
+
+
+@condition(SITE, 'post:{post_id}', 'posts_of:{author_id}',
+           lookup=_post_author)
 def post_detail(request, post_id: int):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(Post.objects.for_page('detail'), pk=post_id)
     form = CommentForm()
-    comments = post.comments.all()
+    comments = _comments_page(request, post.pk)
     context = {
         'post': post,
+        'post_count': user_counters(post.author).posts_count,
         'comments': comments,
         'form': form
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def post_comments(request, post_id):
+    """The next page of comments, appended to ``post_detail`` by a script."""
+    context = {
+        'post_id': post_id,
+        'comments': _comments_page(request, post_id),
+    }
+    return render(request, 'posts/includes/comments.html', context)
+
+
 @login_required()
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
@@ -89,18 +141,22 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id)
 
 
+@cache_feed(SITE, 'author:{username}')
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
+    author = get_object_or_404(
+        User.objects.select_related('counters'),
+        username=username
+    )
+    post_list = author.posts.for_page('profile')
     page_obj = use_paginator(request, post_list)
     following = request.user.is_authenticated and Follow.objects.filter(
         user=request.user,
         author=author
     ).exists()
     context = {
-        'posts': post_list,
         'page_obj': page_obj,
         'author': author,
+        'counters': user_counters(author),
         'following': following,
         'user': request.user
     }
@@ -108,11 +164,10 @@ def profile(request, username):
 
 
 @login_required
+@cache_feed(POSTS, SITE, 'follow:{user}')
 def follow_index(request):
-    user = get_object_or_404(User, username=request.user)
-    post_list = Post.objects.filter(
-        author__following__user=user
-    ).select_related('author', 'group')
+    user = request.user
+    post_list = follow_feed(user).for_page('feed')
     page_obj = use_paginator(request, post_list)
     context = {
         'page_obj': page_obj,
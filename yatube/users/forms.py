@@ -1,5 +1,9 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.forms import UserCreationForm
+from django.contrib.auth.forms import \
+    PasswordResetForm as BasePasswordResetForm
+
+from .tasks import send_password_reset
 
 User = get_user_model()
 
@@ -8,3 +12,16 @@ class CreationForm(UserCreationForm):
     class Meta:
         model = User
         fields = ('first_name', 'last_name', 'username', 'email')
+
+
+class PasswordResetForm(BasePasswordResetForm):
+    """Queues the reset letter; the worker renders it with a fresh token."""
+    def send_mail(self, subject_template_name, email_template_name,
+                  context, from_email, to_email,
+                  html_email_template_name=None):
+        # the link and the token stay out of the job's arguments
+        public = {key: value for key, value in context.items()
+                  if key not in ('user', 'uid', 'token')}
+        send_password_reset.delay(
+            context['user'].pk, public, subject_template_name,
+            email_template_name, from_email, html_email_template_name)
@@ -0,0 +1,30 @@
+"""Mail of the users app, sent by a task worker instead of the request."""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.forms import PasswordResetForm
+from django.contrib.auth.tokens import default_token_generator
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from core.tasks import task
+
+User = get_user_model()
+
+
+@task(retries=5, backoff=60)
+def send_password_reset(user_id, context, subject_template_name,
+                        email_template_name, from_email,
+                        html_email_template_name=None):
+    """
+    Render and send the password reset letter of a user. The link and its
+    token are made here, so the queue never holds a live one; a user who
+    can no longer reset the password by the time the job runs gets none.
+    """
+    user = User.objects.filter(pk=user_id, is_active=True).first()
+    if user is None or not user.has_usable_password():
+        return
+    context = dict(context, user=user,
+                   uid=urlsafe_base64_encode(force_bytes(user.pk)),
+                   token=default_token_generator.make_token(user))
+    PasswordResetForm().send_mail(
+        subject_template_name, email_template_name, context, from_email,
+        context['email'], html_email_template_name)
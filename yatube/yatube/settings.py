@@ -12,6 +12,9 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 
 import os
 
+from core.cache.config import cache_settings, is_shared
+from core.db.config import database_settings
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -40,12 +43,20 @@ LOGIN_REDIRECT_URL = 'posts:index'
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 # указываем директорию, в которую будут складываться файлы писем
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
-# подключен кэш
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
-}
+# подключен кэш: общий для всех воркеров бэкенд задается URL
+# (locmem://, file:///path, memcached://host:port, redis://host:port/db),
+# перед ним - небольшой кэш в памяти процесса
+CACHE_URL = os.environ.get('YATUBE_CACHE_URL', 'locmem://')
+CACHES = cache_settings(
+    CACHE_URL,
+    l1_timeout=float(os.environ.get('YATUBE_CACHE_L1_TIMEOUT', 2)),
+)
+# locmem:// у каждого процесса свой: сброс, сделанный одним воркером,
+# другие не видят, поэтому всё, что в нём держится до сброса, живёт
+# лишь несколько секунд
+CACHE_IS_SHARED = is_shared(CACHE_URL)
+# sorl-thumbnail хранит сведения о миниатюрах в том же кэше
+THUMBNAIL_CACHE = 'default'
 
 # Application definition
 
@@ -64,6 +75,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.instrumentation.middleware.InstrumentationMiddleware',
+    'core.instrumentation.queries.QueryDetectorMiddleware',
+    'core.db.router.PrimaryPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -73,6 +87,24 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# с общим для всех процессов кэшем сессии читаются из него и лишь при
+# промахе из базы, пользователь сессии тоже (см. core.auth); L1 тут нет,
+# чтобы выход из аккаунта и смена пароля действовали сразу. С кэшем в
+# памяти процесса сброс не дошёл бы до других воркеров, и всё остаётся
+# в базе. Подписанные cookie
+# ('django.contrib.sessions.backends.signed_cookies') обходятся без обоих
+if CACHE_IS_SHARED:
+    DEFAULT_SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+    AUTHENTICATION_BACKENDS = ['core.auth.CachedModelBackend']
+else:
+    DEFAULT_SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+    AUTHENTICATION_BACKENDS = ['django.contrib.auth.backends.ModelBackend']
+SESSION_ENGINE = os.environ.get('YATUBE_SESSION_ENGINE',
+                                DEFAULT_SESSION_ENGINE)
+SESSION_CACHE_ALIAS = 'shared'
+USER_CACHE_ALIAS = 'shared'
+USER_CACHE_TIMEOUT = 15 * 60
+
 ROOT_URLCONF = 'yatube.urls'
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
@@ -83,7 +115,8 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.instrumentation.templates.DjangoTemplates',
+        'NAME': 'django',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -104,12 +137,25 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
-}
+# профиль 'production' включает WAL, mmap и другие настройки SQLite
+# и держит соединения между запросами, 'default' - настройки Django
+DATABASES = database_settings(
+    os.path.join(BASE_DIR, 'db.sqlite3'),
+    os.environ.get('YATUBE_DB_PROFILE', 'production'),
+    # файлы реплик через os.pathsep; чтения идут в них, записи - в default
+    [path for path in os.environ.get('YATUBE_DB_REPLICAS', '').split(
+        os.pathsep) if path],
+)
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['core.db.router.ReplicaRouter']
+# после записи пользователь столько секунд читает из основной базы, чтобы
+# увидеть свои изменения, пока реплики их догоняют
+REPLICA_PIN_SECONDS = 10
+REPLICA_PIN_COOKIE = 'pin_primary'
+# записи каких моделей пользователь ждёт увидеть сразу; сессии, фоновые
+# задачи и прочие служебные записи к основной базе не привязывают
+REPLICA_PIN_MODELS = ('auth.User', 'posts.Group', 'posts.Post',
+                      'posts.Comment', 'posts.Follow')
 
 
 # Password validation
@@ -152,3 +198,93 @@ USE_TZ = True
 STATIC_URL = '/static/'
 
 COUNT_OF_POSTS = 10
+# комментарии под постом показываются страницами, следующие подгружаются
+# по кнопке
+COMMENTS_PER_PAGE = 20
+# объектов на странице списков JSON API (/api/v1/) и наибольший ?limit=
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 100
+# 'offset' - постраничная навигация ?page=, 'keyset' - курсоры ?cursor=
+PAGINATION_MODE = 'offset'
+# показывать ли в режиме курсоров приблизительное число записей
+PAGINATION_APPROXIMATE_TOTAL = False
+PAGINATION_TOTAL_TIMEOUT = 60
+# авторы с большим числом подписчиков не рассылаются в ленты при записи,
+# а подмешиваются в ленту подписок при чтении
+TIMELINE_FANOUT_THRESHOLD = 1000
+TIMELINE_BATCH_SIZE = 500
+# HTML карточек постов кэшируется до изменения поста, группы или автора;
+# версию нужно поднимать при правке шаблона карточки
+POST_CARD_VERSION = 1
+POST_CARD_TIMEOUT = 60 * 60 * 24
+# страницы лент сбрасываются сигналами, TTL - лишь страховка; с кэшем
+# в памяти процесса поколения лент тоже истекают, раз сигналы других
+# воркеров до них не доходят
+FEED_CACHE_TIMEOUT = 60 * 60 if CACHE_IS_SHARED else 20
+FEED_GENERATION_TIMEOUT = None if CACHE_IS_SHARED else 20
+# насколько рано (в долях времени рендера) обновлять страницу до истечения
+FEED_CACHE_BETA = 1.0
+# сколько секунд ждать страницу, которую уже рендерит другой запрос
+FEED_CACHE_LOCK_WAIT = 5
+# сколько последних постов отдают Atom-ленты сайта, групп и авторов
+SYNDICATION_ENTRIES = 20
+# 'fts5' - полнотекстовый индекс SQLite, 'inverted' - переносимый индекс
+# в таблице SearchTerm, 'auto' - FTS5, если он есть в сборке SQLite
+SEARCH_BACKEND = 'auto'
+# сколько лучших совпадений поиск в админке отдаёт в список
+SEARCH_ADMIN_LIMIT = 1000
+# размеры миниатюр, которые запрашивают шаблоны: их готовит фоновая
+# задача после сохранения картинки, шаблоны лишь читают их из хранилища
+THUMBNAIL_GEOMETRIES = {
+    'card': ('720x300', {'crop': 'center', 'upscale': True}),
+}
+# адаптивные копии картинок постов: ширины, форматы по убыванию
+# предпочтения (неподдерживаемые Pillow пропускаются, JPEG есть всегда)
+IMAGE_VARIANT_WIDTHS = (360, 720, 1080, 1440)
+IMAGE_VARIANT_FORMATS = ('AVIF', 'WEBP', 'JPEG')
+IMAGE_VARIANT_QUALITY = 80
+IMAGE_VARIANT_SIZES = '(max-width: 768px) 100vw, 720px'
+# картинки постов проверяются по заголовку ещё во время загрузки
+FILE_UPLOAD_HANDLERS = [
+    'posts.uploads.ImageUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+IMAGE_UPLOAD_FIELDS = ('image',)
+IMAGE_UPLOAD_MAX_BYTES = 10 * 1024 * 1024
+IMAGE_UPLOAD_MAX_PIXELS = 40 * 10 ** 6
+# сколько байт начала файла читать в поисках размеров изображения
+IMAGE_UPLOAD_HEADER_BYTES = 256 * 1024
+# картинки больше этого размера по длинной стороне уменьшаются при загрузке
+IMAGE_UPLOAD_MAX_SIDE = 2560
+IMAGE_UPLOAD_QUALITY = 90
+# фоновые задачи core.tasks выполняет manage.py run_worker: сколько
+# задач одновременно и раз во сколько секунд проверять очередь
+TASKS_CONCURRENCY = 4
+TASKS_POLL_INTERVAL = 1.0
+# через сколько секунд задачу пропавшего воркера отдать другому
+TASKS_LEASE = 10 * 60
+# пауза перед первым повтором упавшей задачи, дальше она удваивается
+TASKS_RETRY_BACKOFF = 30
+# сколько секунд хранить выполненные задачи
+TASKS_KEEP_DONE = 24 * 60 * 60
+# выполнять задачи сразу при постановке в очередь, без воркера
+# (для тестов и отладки)
+TASKS_EAGER = os.environ.get('YATUBE_TASKS_EAGER') == '1'
+# как часто фоновая задача убирает неиспользуемые картинки, секунд
+MEDIA_GC_INTERVAL = 24 * 60 * 60
+# gc_media не трогает файлы моложе этого числа секунд: их пост
+# может быть ещё не сохранён
+MEDIA_GC_GRACE = 60 * 60
+# доля запросов, для которых считаются запросы к БД, обращения к кэшу и
+# время рендера шаблонов (заголовок Server-Timing, журнал yatube.requests,
+# гистограммы /metrics); длительность видна для всех запросов
+INSTRUMENTATION_SAMPLE_RATE = 0.1
+# с каких адресов можно читать /metrics, None - с любых
+METRICS_ALLOWED_IPS = ('127.0.0.1', '::1')
+# журналировать (логгер yatube.queries) повторяющиеся запросы - больше
+# QUERY_DETECTOR_REPEAT_THRESHOLD одинаковых за запрос - и запросы дольше
+# QUERY_DETECTOR_SLOW_MS миллисекунд
+QUERY_DETECTOR_ENABLED = DEBUG
+QUERY_DETECTOR_REPEAT_THRESHOLD = 5
+QUERY_DETECTOR_SLOW_MS = 100